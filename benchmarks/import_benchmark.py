@@ -0,0 +1,58 @@
+"""Check pylawson cold import time against a budget and that heavy dependencies are imported lazily.
+
+Usage: python benchmarks/import_benchmark.py [--runs 7] [--budget-ms pylawson=20] [--budget-ms pylawson.client=60]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # imports run from the checkout
+DEFAULT_BUDGETS_MS = {'pylawson': 20.0, 'pylawson.client': 60.0}
+# Modules that must not be loaded by `import pylawson, pylawson.client`.
+LAZY_MODULES = ('bs4', 'requests', 'clr', 'numpy', 'aiohttp', 'pylawson.client.ms_samlpr')
+
+
+def import_time_ms(module: str) -> float:
+    """Cumulative import time of module in a fresh interpreter, from -X importtime."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import {}'.format(module)], cwd=ROOT,
+                            stderr=subprocess.PIPE, universal_newlines=True, check=True)
+    for line in result.stderr.splitlines():
+        fields = [field.strip() for field in line.split('|')]
+        if len(fields) == 3 and fields[2] == module:
+            return int(fields[1]) / 1000
+    raise RuntimeError('No import time reported for {}.'.format(module))
+
+
+def loaded_lazy_modules() -> list:
+    code = 'import sys, pylawson, pylawson.client; print(" ".join(m for m in {!r} if m in sys.modules))'.format(
+        LAZY_MODULES)
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, stdout=subprocess.PIPE, universal_newlines=True,
+                            check=True)
+    return result.stdout.split()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=7)
+    parser.add_argument('--budget-ms', action='append', default=[], metavar='MODULE=MS')
+    args = parser.parse_args(argv)
+    budgets = dict(DEFAULT_BUDGETS_MS)
+    budgets.update((module, float(ms)) for module, ms in (item.split('=') for item in args.budget_ms))
+
+    failed = False
+    for module, budget in budgets.items():
+        median = statistics.median(import_time_ms(module) for _ in range(args.runs))
+        over = median > budget
+        failed |= over
+        print('{:<20} {:>8.1f} ms (budget {:.1f} ms){}'.format(module, median, budget, ' OVER BUDGET' if over else ''))
+    loaded = loaded_lazy_modules()
+    if loaded:
+        failed = True
+        print('Imported eagerly: {}'.format(', '.join(loaded)))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
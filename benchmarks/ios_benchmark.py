@@ -0,0 +1,142 @@
+"""Benchmark IosSession methods against the local stand-in server.
+
+Reports login time, and for each IosSession method calls/sec, p50/p99 latency, parse time and peak memory.
+Save results with --json and compare a later run with --baseline to fail on regressions.
+
+Usage: python benchmarks/ios_benchmark.py [--rows 10000] [--calls 200] [--threads 4] [--latency 0.0]
+                                          [--json results.json] [--baseline results.json] [--tolerance 0.2]
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # run from a checkout
+from pylawson.client import SamlSession
+from pylawson.stand_in import StandInServer
+
+METHODS = {
+    'tokens': {'systemCode': 'GL'},
+    'attachments': {'fileName': 'GLTRANS'},
+    'data': {'FILE': 'GLTRANS', 'INDEX': 'GLTSET3', 'OUT': 'XML', 'NEXT': 'FALSE', 'keyUsage': 'PARAM'},
+    'drill': {'_TYP': 'SL', '_FILE': 'GLTRANS'},
+    'transaction': {'_TKN': 'GL40.1', '_EVT': 'ADD', '_RTN': 'DATA', '_OUT': 'XML', '_EOT': 'TRUE'},
+    'what': {'_JAR': 'IOS.jar'},
+}
+
+
+def percentile(values: list, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def parse(session: SamlSession, method: str, xml: str) -> int:
+    if method == 'data':
+        return sum(1 for _ in session.parser.data_page(xml))
+    session.parser.error(xml)
+    return 0
+
+
+def bench_login(server: StandInServer, logins: int) -> dict:
+    times = []
+    for _ in range(logins):
+        start = time.perf_counter()
+        SamlSession(**server.session_params).close()
+        times.append(time.perf_counter() - start)
+    return {'login_seconds': statistics.median(times)}
+
+
+def bench_method(session: SamlSession, method: str, calls: int, threads: int) -> dict:
+    session.single_flight = None  # every call must reach the server, not share an identical one in flight
+    call = getattr(session, method)
+    params = METHODS[method]
+
+    def timed(_):
+        start = time.perf_counter()
+        call(dict(params))
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        start = time.perf_counter()
+        latencies = list(executor.map(timed, range(calls)))
+        elapsed = time.perf_counter() - start
+
+    xml = call(dict(params))
+    start = time.perf_counter()
+    records = parse(session, method, xml)
+    parse_seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    parse(session, method, call(dict(params)))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        'calls_per_second': calls / elapsed,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'parse_ms': parse_seconds * 1000,
+        'records': records,
+        'response_bytes': len(xml),
+        'peak_mib': peak / 2 ** 20,
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Return messages for methods whose throughput dropped or p99 latency rose by more than tolerance."""
+    regressions = []
+    for method, result in results['methods'].items():
+        before = baseline.get('methods', {}).get(method)
+        if not before:
+            continue
+        if result['calls_per_second'] < before['calls_per_second'] * (1 - tolerance):
+            regressions.append('{}: calls/sec {:.1f} -> {:.1f}'.format(
+                method, before['calls_per_second'], result['calls_per_second']))
+        if result['p99_ms'] > before['p99_ms'] * (1 + tolerance):
+            regressions.append('{}: p99 {:.1f}ms -> {:.1f}ms'.format(method, before['p99_ms'], result['p99_ms']))
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000, help='records per Data response')
+    parser.add_argument('--calls', type=int, default=200, help='calls per method')
+    parser.add_argument('--threads', type=int, default=4, help='concurrent callers')
+    parser.add_argument('--latency', type=float, default=0.0, help='stand-in server latency in seconds')
+    parser.add_argument('--logins', type=int, default=5, help='logins to time')
+    parser.add_argument('--json', help='write results to this file')
+    parser.add_argument('--baseline', help='compare with results previously written by --json')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed relative regression')
+    args = parser.parse_args(argv)
+
+    with StandInServer(rows=args.rows, latency=args.latency) as server:
+        results = bench_login(server, args.logins)
+        results['methods'] = {}
+        with SamlSession(pool_size=args.threads, **server.session_params) as session:
+            for method in METHODS:
+                results['methods'][method] = bench_method(session, method, args.calls, args.threads)
+
+    print('login: {:.1f} ms'.format(results['login_seconds'] * 1000))
+    print('{:<12} {:>10} {:>9} {:>9} {:>10} {:>9} {:>12} {:>9}'.format(
+        'method', 'calls/s', 'p50 ms', 'p99 ms', 'parse ms', 'records', 'bytes', 'peak MiB'))
+    for method, result in results['methods'].items():
+        print('{:<12} {calls_per_second:>10.1f} {p50_ms:>9.2f} {p99_ms:>9.2f} {parse_ms:>10.2f} {records:>9} '
+              '{response_bytes:>12,} {peak_mib:>9.2f}'.format(method, **result))
+
+    if args.json:
+        with open(args.json, 'w') as fp:
+            json.dump(results, fp, indent=2)
+    if args.baseline:
+        with open(args.baseline) as fp:
+            regressions = compare(results, json.load(fp), args.tolerance)
+        for message in regressions:
+            print('REGRESSION', message)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
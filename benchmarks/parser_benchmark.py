@@ -0,0 +1,40 @@
+"""Compare the EventParser and SoupParser engines on large synthetic Data servlet responses.
+
+Usage: python benchmarks/parser_benchmark.py [rows ...]
+"""
+import os
+import sys
+import time
+import tracemalloc
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # run from a checkout
+from pylawson.parser import EventParser, SoupParser
+from pylawson.stand_in import synthetic_data
+
+
+def measure(parser, xml: str) -> tuple:
+    tracemalloc.start()
+    start = time.perf_counter()
+    page = parser.data_page(xml)
+    count = sum(1 for _ in page)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return count, elapsed, peak
+
+
+def main(sizes):
+    warnings.simplefilter('ignore')
+    print('{:>8} {:>6} {:>10} {:>12} {:>12}'.format('rows', 'engine', 'seconds', 'records/s', 'peak MiB'))
+    for rows in sizes:
+        xml = synthetic_data(rows)
+        for parser in (EventParser(), SoupParser()):
+            count, elapsed, peak = measure(parser, xml)
+            assert count == rows, (parser, count)
+            print('{:>8} {:>6} {:>10.3f} {:>12,.0f} {:>12.1f}'.format(
+                rows, parser.name, elapsed, count / elapsed, peak / 2 ** 20))
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [1000, 10000, 50000])
@@ -1,2 +1,20 @@
-from .exceptions import IosError, IosConnectionError, IosDataError, IosAuthenticationError
-from .pylawson import LawsonBase, Account, Activity, Journal, JournalLine, InterfaceLine
+from importlib import import_module
+from .exceptions import (IosError, IosConnectionError, IosDataError, IosAuthenticationError, IosValidationError,
+                         IosDrillError)
+
+# Data objects are imported on first access, so `import pylawson` stays cheap for short-lived processes.
+_LAZY = {name: '.pylawson' for name in ('LawsonBase', 'Account', 'Activity', 'Journal', 'JournalLine',
+                                         'InterfaceLine')}
+
+
+def __getattr__(name: str):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
@@ -0,0 +1,154 @@
+"""Bulk GL40 journal upload with bounded concurrency and per-line error collection."""
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from logging import getLogger
+from typing import Iterable, List, Optional, Sequence, Tuple
+from .client import IosSession as Session
+from .exceptions import IosDataError
+from .pylawson import Journal, JournalLine
+
+logger = getLogger(__name__)
+
+
+# Line outcomes: sent and accepted; rejected by Infor or not sent; sent but the reply was lost (it may have posted).
+OK = 'ok'
+FAILED = 'failed'
+UNKNOWN = 'unknown'
+
+
+class LineResult:
+    """Outcome of one uploaded journal line; ``error`` is the error message, or None on success.
+
+    ``outcome`` is OK, FAILED (rejected by Infor, or never sent) or UNKNOWN (the call failed in transit, so
+    the line may or may not have been posted; check before re-sending it).
+    """
+    __slots__ = ('index', 'journal', 'params', 'error', 'outcome')
+
+    def __init__(self, index: int, journal: tuple, params: dict, error: Optional[str] = None,
+                 outcome: str = None):
+        self.index = index
+        self.journal = journal
+        self.params = params
+        self.error = error
+        self.outcome = outcome or (OK if error is None else FAILED)
+
+    def __repr__(self):
+        return '{}(index={}, journal={}, outcome={}, error={!r})'.format(
+            self.__class__.__name__, self.index, self.journal, self.outcome, self.error)
+
+    @property
+    def ok(self) -> bool:
+        return self.outcome == OK
+
+
+class UploadReport:
+    """Structured result of a bulk upload: header errors per journal and a result per line, in input order."""
+    def __init__(self):
+        self.journals = OrderedDict()  # journal key -> header error message, or None
+        self.lines = []  # type: List[LineResult]
+
+    def __repr__(self):
+        return '{}(journals={}, lines={}, errors={})'.format(
+            self.__class__.__name__, len(self.journals), len(self.lines), len(self.errors))
+
+    def __bool__(self):
+        return not self.errors
+
+    @property
+    def succeeded(self) -> List[LineResult]:
+        return [result for result in self.lines if result.ok]
+
+    @property
+    def errors(self) -> List[LineResult]:
+        """Lines that failed or whose outcome is unknown."""
+        return [result for result in self.lines if not result.ok]
+
+    @property
+    def unknown(self) -> List[LineResult]:
+        return [result for result in self.lines if result.outcome == UNKNOWN]
+
+    def summary(self) -> str:
+        failed_journals = sum(1 for error in self.journals.values() if error is not None)
+        return '{} journals ({} failed), {} lines: {} uploaded, {} errors ({} unknown).'.format(
+            len(self.journals), failed_journals, len(self.lines), len(self.succeeded), len(self.errors),
+            len(self.unknown))
+
+
+class BulkJournalUpload:
+    """Upload GL40.1 journal lines grouped under GL40.2 journal headers.
+
+    Lines are grouped by the values of ``header_fields``. Headers are sent first; once a journal's header is
+    accepted its lines are sent, with up to ``max_workers`` calls in flight across all journals. Errors are
+    collected in the report rather than raised: a failed header marks all of its lines as failed without
+    sending them, and a line whose call failed in transit (connection error, HTTP error) is reported with an
+    UNKNOWN outcome, since it may have been posted.
+    """
+    def __init__(self, session: Session, header_fields: Sequence[str], max_workers: int = 4,
+                 create_headers: bool = True, header_params: dict = None):
+        self.session = session
+        self.header_fields = tuple(header_fields)
+        self.max_workers = max_workers
+        self.create_headers = create_headers
+        self.header_params = header_params or {}
+        self.session.set_pool_size(max_workers)
+
+    def __repr__(self):
+        return '{}(header_fields={}, max_workers={})'.format(self.__class__.__name__, self.header_fields,
+                                                             self.max_workers)
+
+    def _group(self, lines: Iterable[dict]) -> 'OrderedDict[tuple, list]':
+        journals = OrderedDict()
+        for index, params in enumerate(lines):
+            key = tuple(params.get(field) for field in self.header_fields)
+            journals.setdefault(key, []).append((index, params))
+        return journals
+
+    @staticmethod
+    def _send(upload) -> Tuple[Optional[str], str]:
+        """Run an upload; return (error message, outcome)."""
+        try:
+            upload()
+        except IosDataError as e:
+            return str(e), FAILED
+        except OSError as e:  # IosError, requests and socket errors: the reply was lost
+            logger.warning('Transaction outcome unknown: {}'.format(e))
+            return 'Outcome unknown: {}'.format(e), UNKNOWN
+        return None, OK
+
+    def _upload_header(self, key: tuple) -> Optional[str]:
+        params = dict(self.header_params)
+        params.update(zip(self.header_fields, key))
+        error, _ = self._send(Journal(self.session, **params).upload)
+        return error
+
+    def _upload_line(self, index: int, key: tuple, params: dict) -> LineResult:
+        error, outcome = self._send(JournalLine(self.session, **params).upload)
+        return LineResult(index, key, params, error, outcome)
+
+    def run(self, lines: Iterable[dict]) -> UploadReport:
+        """Upload all lines and return an UploadReport."""
+        journals = self._group(lines)
+        report = UploadReport()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            headers = OrderedDict((key, executor.submit(self._upload_header, key) if self.create_headers else None)
+                                  for key in journals)
+            futures = []
+            for key, header in headers.items():
+                error = header.result() if header is not None else None
+                report.journals[key] = error
+                if error is not None:
+                    report.lines.extend(LineResult(index, key, params, 'Journal header failed: ' + error)
+                                        for index, params in journals[key])
+                    continue
+                futures.extend(executor.submit(self._upload_line, index, key, params)
+                               for index, params in journals[key])
+            report.lines.extend(future.result() for future in futures)
+        report.lines.sort(key=lambda result: result.index)
+        logger.info(report.summary())
+        return report
+
+
+def upload_journals(session: Session, lines: Iterable[dict], header_fields: Sequence[str],
+                    max_workers: int = 4, **kwargs) -> UploadReport:
+    """Convenience wrapper for ``BulkJournalUpload(session, header_fields, max_workers, ...).run(lines)``."""
+    return BulkJournalUpload(session, header_fields=header_fields, max_workers=max_workers, **kwargs).run(lines)
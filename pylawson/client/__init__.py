@@ -1,7 +1,31 @@
+from importlib import import_module
 from .base_session import IosSession
-from .ms_samlpr import SamlSession
-try:
-    # Optional Windows module that requires the clr package.
-    from .sec_api import SecApiSession
-except ImportError:
-    pass
+
+# Session backends are imported on first access: requests and bs4 for SamlSession, the optional clr package
+# (Windows) for SecApiSession, and the optional aiohttp package for the asyncio sessions.
+_LAZY = {
+    'SamlSession': '.ms_samlpr',
+    'SecApiSession': '.sec_api',
+    'AsyncIosSession': '.async_session',
+    'AsyncSamlSession': '.async_session',
+    'SessionPool': '.pool',
+    'RecordingTransport': '.transport',
+    'ReplayTransport': '.transport',
+    'ReplaySession': '.transport',
+}
+
+
+def __getattr__(name: str):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+    try:
+        value = getattr(import_module(module, __name__), name)
+    except ImportError as e:
+        raise AttributeError('{} is unavailable: {}'.format(name, e)) from e
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
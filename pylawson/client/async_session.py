@@ -0,0 +1,260 @@
+"""asyncio IOS sessions using aiohttp.
+
+``AsyncIosSession`` keeps the ``IosSession`` call surface (``tokens``, ``attachments``, ``data``, ``drill``,
+``transaction``, ``what``) with each call returning an awaitable; ``AsyncSamlSession`` logs in with the same
+SAML steps as ``SamlSession``.
+"""
+import asyncio
+from collections import OrderedDict
+from http.cookies import SimpleCookie
+from io import IOBase
+from logging import getLogger
+import time
+from typing import Dict, Iterable, Optional, Union
+from urllib.parse import urlencode, urljoin
+# noinspection PyPackageRequirements
+import aiohttp
+from pylawson import IosConnectionError
+from pylawson.client import IosSession
+from pylawson.parser import Xml
+from .base_session import call_target, endpoint_name
+from .drill import DrillLines, raise_failures, unique_requests
+from .metrics import body_size
+from .ms_samlpr import SERVER_BUSY_STATUS, SamlAuthFlow
+from .response import IosResponse
+from .response_cache import ResponseCache
+
+logger = getLogger(__name__)
+
+
+class AsyncResponse:
+    """Fully read aiohttp response exposing the attributes used by the SAML login steps."""
+    def __init__(self, response: aiohttp.ClientResponse, content: bytes):
+        self.status_code = response.status
+        self.headers = response.headers
+        self.cookies = response.cookies
+        self.url = str(response.url)
+        self.body = IosResponse(content, encoding=response.charset, status_code=response.status, url=self.url)
+
+    @property
+    def text(self) -> str:
+        return self.body.text
+
+    def __repr__(self):
+        return '<{} [{}]>'.format(self.__class__.__name__, self.status_code)
+
+
+class AsyncIosSession(IosSession):
+    """Base class for an asyncio Infor Lawson Connection session object.
+
+    Use ``await Session.create(...)`` or ``async with Session(...)`` to log in; every call must be awaited.
+    """
+    def __init__(self, json_file: Union[str, IOBase] = None, lawson_server: str = None, ident_server: str = None,
+                 username: str = None, password: str = None, limit: int = 100):
+        super().__init__(json_file=json_file, lawson_server=lawson_server, ident_server=ident_server,
+                         username=username, password=password)
+        self._limit = limit
+        self._authenticated = False
+        self.session = None  # type: aiohttp.ClientSession
+
+    def __bool__(self):
+        """Authentication state as of the last login or ping (use ``await ping()`` to check the server)."""
+        return self._authenticated
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    @classmethod
+    async def create(cls, *args, **kwargs) -> 'AsyncIosSession':
+        """Instantiate and log in."""
+        instance = cls(*args, **kwargs)
+        await instance.open()
+        return instance
+
+    async def open(self):
+        """Create the aiohttp session and log in."""
+        if self.session is None:
+            # unsafe=True keeps cookies for IP address hosts, e.g. a local stand-in server.
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self._limit), cookie_jar=aiohttp.CookieJar(unsafe=True))
+        await self._auth()
+
+    async def request(self, method: str, url: str, **kwargs) -> AsyncResponse:
+        """Send a request and read the full response (any status; login steps expect redirects)."""
+        try:
+            async with self.session.request(method, url, **kwargs) as response:
+                if response.status in SERVER_BUSY_STATUS:
+                    raise IosConnectionError('Server busy: HTTP {} from {}.'.format(response.status, url),
+                                             status=response.status)
+                return AsyncResponse(response, await response.read())
+        except aiohttp.ClientError as e:
+            msg = 'Request to {} failed: {}'.format(url, e)
+            logger.error(msg=msg)
+            raise IosConnectionError(msg) from e
+
+    async def _checked_request(self, method: str, url: str, **kwargs) -> AsyncResponse:
+        """Send an IOS call; any response other than 2xx raises IosConnectionError."""
+        url = urljoin(self._params['lawson_server'], url)
+        response = await self.request(method, url, **kwargs)
+        if not 200 <= response.status_code < 300:
+            msg = 'HTTP {} from {}.'.format(response.status_code, url)
+            logger.error(msg=msg)
+            raise IosConnectionError(msg, status=response.status_code)
+        return response
+
+    async def get(self, url: str) -> str:
+        return (await self._checked_request('GET', url)).text
+
+    async def post(self, url: str, data: dict) -> str:
+        return (await self._checked_request('POST', url, data=data)).text
+
+    async def get_response(self, url: str) -> IosResponse:
+        return (await self._checked_request('GET', url)).body
+
+    async def post_response(self, url: str, data: dict) -> IosResponse:
+        return (await self._checked_request('POST', url, data=data)).body
+
+    async def ping(self) -> bool:
+        raise NotImplementedError
+
+    async def _transmit(self, url: str, call_data: dict) -> Xml:
+        if self.raw_responses:
+            if not call_data:
+                return (await self.get_response(url=url)).release()
+            return (await self.post_response(url=url, data=call_data)).release()
+        if not call_data:
+            return await self.get(url=url)
+        return await self.post(url=url, data=call_data)
+
+    async def _transport_send(self, url: str, call_data: dict) -> Xml:
+        """Async counterpart of IosSession._transport_send."""
+        if self.transport is None:
+            return await self._transmit(url=url, call_data=call_data)
+        return await self.transport.send_async(url, call_data, lambda: self._transmit(url=url, call_data=call_data))
+
+    async def _send(self, url: str, call_data: dict) -> str:
+        """Async counterpart of IosSession._send."""
+        if self.throttle is None:
+            return await self._measured_send(url=url, call_data=call_data)
+        on_retry = None
+        if self.metrics is not None:
+            def on_retry():
+                self.metrics.record_retry(endpoint_name(url), call_target(call_data))
+        return await self.throttle.call_async(
+            endpoint_name(url), lambda: self._measured_send(url=url, call_data=call_data), on_retry=on_retry)
+
+    async def _measured_send(self, url: str, call_data: dict) -> str:
+        """Async counterpart of IosSession._measured_send."""
+        if self.metrics is None:
+            return await self._transport_send(url=url, call_data=call_data)
+        start = time.perf_counter()
+        try:
+            text = await self._transport_send(url=url, call_data=call_data)
+        except Exception:
+            self.metrics.record_call(endpoint_name(url), call_target(call_data), time.perf_counter() - start,
+                                     bytes_sent=len(urlencode(call_data)), error=True)
+            raise
+        self.metrics.record_call(endpoint_name(url), call_target(call_data), time.perf_counter() - start,
+                                 bytes_sent=len(urlencode(call_data)), bytes_received=body_size(text),
+                                 error=self.parser.error(text) is not None)
+        return text
+
+    async def _generic_call(self, url: str, data: dict, productline_key: Optional[str] = None,
+                            cacheable: bool = True) -> str:
+        """Async counterpart of IosSession._generic_call."""
+        call_data = self._call_data(data, productline_key)
+        if cacheable and self.single_flight is not None:
+            return await self.single_flight.do_async(ResponseCache.key(url, call_data),
+                                                     lambda: self._cached_send(url=url, call_data=call_data))
+        return await self._cached_send(url=url, call_data=call_data, cacheable=cacheable)
+
+    async def _cached_send(self, url: str, call_data: dict, cacheable: bool = True) -> str:
+        """Async counterpart of IosSession._cached_send."""
+        ttl = self.cache.ttl(endpoint_name(url), call_data) if self.cache is not None and cacheable else 0
+        if not ttl:
+            return await self._send(url=url, call_data=call_data)
+        key = self.cache.key(url, call_data)
+        text = self.cache.get(key)
+        if text is None:
+            text = await self._send(url=url, call_data=call_data)
+            if self.parser.error(text) is None:
+                self.cache.put(key, text, ttl)
+        return text
+
+    async def drill_many(self, requests: Iterable[dict], max_workers: int = 8) -> Dict[tuple, DrillLines]:
+        """Async counterpart of IosSession.drill_many; at most max_workers drills are in flight."""
+        pending = unique_requests(requests)
+        results = OrderedDict((key, self.drill_memo.get(key)) for key in pending)
+        missing = [key for key, lines in results.items() if lines is None]
+        semaphore = asyncio.Semaphore(max(1, max_workers))
+
+        async def resolve(key: tuple) -> DrillLines:
+            async with semaphore:
+                xml = await self.drill(data=dict(pending[key]))
+            return self._drill_lines(key, xml)
+
+        errors = {}
+        outcomes = await asyncio.gather(*(resolve(key) for key in missing), return_exceptions=True)
+        for key, lines in zip(missing, outcomes):
+            if isinstance(lines, OSError):
+                errors[key] = lines
+            elif isinstance(lines, BaseException):
+                raise lines
+            else:
+                results[key] = lines
+        logger.debug('Resolved {} drills ({} sent, {} failed).'.format(len(results), len(missing), len(errors)))
+        raise_failures(results, errors)
+        return results
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+        self._authenticated = False
+        logger.info(msg='Closed session.')
+
+    async def _auth(self):
+        raise NotImplementedError
+
+
+class AsyncSamlSession(SamlAuthFlow, AsyncIosSession):
+    """asyncio counterpart of ``SamlSession``."""
+    def __init__(self, json_file: Union[str, IOBase] = None, lawson_server: str = None, ident_server: str = None,
+                 username: str = None, password: str = None, limit: int = 100):
+        super().__init__(json_file=json_file, lawson_server=lawson_server, ident_server=ident_server,
+                         username=username, password=password, limit=limit)
+        self._sso = None
+
+    async def ping(self) -> bool:
+        self._authenticated = self._ping_status(await self.get('?_action=PING'))
+        return self._authenticated
+
+    async def close(self):
+        if self.session is not None and await self.ping():
+            await self.get(url='?_action=LOGOUT')
+        await super().close()
+
+    async def _auth(self):
+        """Perform series of requests for SAML authentication."""
+        self.session.headers.update(self.headers)
+        ip_cookie = self._ip_cookie()
+        cookie = SimpleCookie()
+        cookie[ip_cookie.name] = ip_cookie.value
+        cookie[ip_cookie.name]['domain'] = ip_cookie.domain
+        cookie[ip_cookie.name]['path'] = ip_cookie.path
+        self.session.cookie_jar.update_cookies(cookie)
+
+        steps = self._auth_steps()
+        response = None
+        try:
+            while True:
+                method, url, kwargs = steps.send(response)
+                response = await self.request(method, url, **kwargs)
+        except StopIteration:
+            pass
+        self._authenticated = True
+        logger.debug('AsyncSamlSession login completed.')
@@ -1,6 +1,33 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from io import IOBase
 import json
-from typing import Union, Optional
+from logging import getLogger
+import time
+from typing import Dict, Iterable, Union, Optional
+from urllib.parse import urlencode, urlparse
+from pylawson.exceptions import IosDataError
+from pylawson.parser import EventParser, Parser, Xml
+from .drill import DrillLines, DrillMemo, raise_failures, unique_requests
+from .lifetime import SessionLifetime
+from .metrics import Metrics, body_size
+from .response import IosResponse
+from .response_cache import ResponseCache
+from .singleflight import SingleFlight
+from .throttle import Throttle
+
+logger = getLogger(__name__)
+
+
+def endpoint_name(url: str) -> str:
+    """Short name of an IOS endpoint, e.g. '/servlet/Router/Data/erp' -> 'Data'."""
+    parts = [part for part in urlparse(url).path.split('/') if part and part != 'erp']
+    return parts[-1] if parts else url
+
+
+def call_target(call_data: dict) -> Optional[str]:
+    """The FILE or _TKN a call is for, used to label metrics."""
+    return call_data.get('FILE') or call_data.get('_TKN') or call_data.get('_FILE')
 
 
 class Profile:
@@ -11,10 +38,23 @@ class Profile:
 
 class IosSession:
     """Base class for an Infor Lawson Connection session object."""
+    # Response parser engine; assign pylawson.parser.SoupParser() to use BeautifulSoup throughout.
+    parser = EventParser()  # type: Parser
+
     def __init__(self, json_file: Union[str, IOBase] = None, lawson_server: str = None, ident_server: str = None,
                  username: str = None, password: str = None):
         self._profile = Profile()
         self._xfer_url = None
+        self._lifetime = SessionLifetime()
+        self.cache = None  # type: Optional[ResponseCache]
+        self.metrics = None  # type: Optional[Metrics]
+        self.throttle = None  # type: Optional[Throttle]
+        self.drill_memo = DrillMemo()
+        self.single_flight = None  # type: Optional[SingleFlight]  # assign a SingleFlight to coalesce reads
+        self.validator = None  # pylawson.validate.Validator checking uploads before they are sent
+        # Return response bodies as the raw bytes of an IosResponse rather than decoded str (SAML sessions).
+        self.raw_responses = False
+        self.transport = None  # pylawson.client.transport.Transport that calls are sent through, e.g. to record them
         self._params = {
             'lawson_server': lawson_server,
             'ident_server': ident_server,
@@ -53,20 +93,95 @@ class IosSession:
     def post(self, url: str, data: dict):
         raise NotImplementedError
 
+    def get_response(self, url: str) -> IosResponse:
+        raise NotImplementedError
+
+    def post_response(self, url: str, data: dict) -> IosResponse:
+        raise NotImplementedError
+
     def close(self):
         raise NotImplementedError
 
-    def _generic_call(self, url: str, data: dict, productline_key: Optional[str]) -> str:
-        """Wraps self.post to send a specific action with product line."""
+    def set_pool_size(self, size: int):
+        """Size the connection pool for `size` concurrent calls (no-op for sessions without a pool)."""
+
+    def _call_data(self, data: dict, productline_key: Optional[str]) -> dict:
+        """Call parameters with the product line injected under productline_key."""
         call_data = dict()
         if productline_key:
             # noinspection PyUnresolvedReferences
             call_data[productline_key] = self.profile.productline
         call_data.update(data)
+        return call_data
+
+    def _transmit(self, url: str, call_data: dict) -> Xml:
+        if self.raw_responses:
+            response = self.get_response(url=url) if not call_data else self.post_response(url=url, data=call_data)
+            return response.release()
         if not call_data:
             return self.get(url=url)
         return self.post(url=url, data=call_data)
 
+    def _transport_send(self, url: str, call_data: dict) -> Xml:
+        """Send a call through self.transport when one is set, else straight to the server."""
+        if self.transport is None:
+            return self._transmit(url=url, call_data=call_data)
+        return self.transport.send(url, call_data, lambda: self._transmit(url=url, call_data=call_data))
+
+    def _send(self, url: str, call_data: dict) -> str:
+        """Send a call to the server, within self.throttle when enabled."""
+        if self.throttle is None:
+            return self._measured_send(url=url, call_data=call_data)
+        on_retry = None
+        if self.metrics is not None:
+            def on_retry():
+                self.metrics.record_retry(endpoint_name(url), call_target(call_data))
+        return self.throttle.call(endpoint_name(url), lambda: self._measured_send(url=url, call_data=call_data),
+                                  on_retry=on_retry)
+
+    def _measured_send(self, url: str, call_data: dict) -> str:
+        """Send a call to the server, recording it in self.metrics when enabled."""
+        if self.metrics is None:
+            return self._transport_send(url=url, call_data=call_data)
+        start = time.perf_counter()
+        try:
+            text = self._transport_send(url=url, call_data=call_data)
+        except Exception:
+            self.metrics.record_call(endpoint_name(url), call_target(call_data), time.perf_counter() - start,
+                                     bytes_sent=len(urlencode(call_data)), error=True)
+            raise
+        self.metrics.record_call(endpoint_name(url), call_target(call_data), time.perf_counter() - start,
+                                 bytes_sent=len(urlencode(call_data)), bytes_received=body_size(text),
+                                 error=self.parser.error(text) is not None)
+        return text
+
+    def _generic_call(self, url: str, data: dict, productline_key: Optional[str] = None,
+                      cacheable: bool = True) -> str:
+        """Wraps self.post to send a specific action with product line.
+
+        If a SingleFlight is assigned to self.single_flight, cacheable (read) calls identical to one already
+        in flight share its response, and if a ResponseCache is assigned to self.cache they are answered from
+        it within their TTL. Transactions are never cached or coalesced.
+        """
+        call_data = self._call_data(data, productline_key)
+        if cacheable and self.single_flight is not None:
+            return self.single_flight.do(ResponseCache.key(url, call_data),
+                                         lambda: self._cached_send(url=url, call_data=call_data))
+        return self._cached_send(url=url, call_data=call_data, cacheable=cacheable)
+
+    def _cached_send(self, url: str, call_data: dict, cacheable: bool = True) -> str:
+        """Send a call, consulting self.cache for cacheable calls."""
+        ttl = self.cache.ttl(endpoint_name(url), call_data) if self.cache is not None and cacheable else 0
+        if not ttl:
+            return self._send(url=url, call_data=call_data)
+        key = self.cache.key(url, call_data)
+        text = self.cache.get(key)
+        if text is None:
+            text = self._send(url=url, call_data=call_data)
+            if self.parser.error(text) is None:
+                self.cache.put(key, text, ttl)
+        return text
+
     def tokens(self, data: dict):
         """Lawson ListTokens Action."""
         url = '/lawson-ios/action/ListTokens'
@@ -91,11 +206,48 @@ class IosSession:
         productline_key = 'PROD'
         return self._generic_call(url=url, data=data, productline_key=productline_key)
 
+    def _drill_lines(self, key: tuple, xml: str) -> DrillLines:
+        """Parse a Drill response, memoizing it under key; Infor errors raise IosDataError and are not kept."""
+        error = self.parser.error(xml)
+        if error:
+            msg = 'Infor error: [{}] {}'.format(*error)
+            logger.error(msg=msg)
+            raise IosDataError(msg)
+        lines = tuple(tuple(line) for line in self.parser.drill_lines(xml))
+        self.drill_memo.put(key, lines)
+        return lines
+
+    def drill_many(self, requests: Iterable[dict], max_workers: int = 8) -> Dict[tuple, DrillLines]:
+        """Resolve many Drill requests: duplicates are sent once, concurrently, and results are memoized.
+
+        Returns an ordered dict of ``drill_key(request)`` -> tuple of the COL values of each LINE, in the
+        order the requests were first given. Requests already in ``self.drill_memo`` are not sent again.
+        If any request fails, the rest are still resolved, then IosDrillError is raised carrying them in
+        ``results`` and the failures in ``errors``.
+        """
+        pending = unique_requests(requests)
+        results = OrderedDict((key, self.drill_memo.get(key)) for key in pending)
+        missing = [key for key, lines in results.items() if lines is None]
+        errors = {}
+        if missing:
+            workers = max(1, min(max_workers, len(missing)))
+            self.set_pool_size(workers)
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [(key, executor.submit(self.drill, data=dict(pending[key]))) for key in missing]
+                for key, future in futures:
+                    try:
+                        results[key] = self._drill_lines(key, future.result())
+                    except OSError as e:  # Infor errors and failed calls alike
+                        errors[key] = e
+        logger.debug('Resolved {} drills ({} sent, {} failed).'.format(len(results), len(missing), len(errors)))
+        raise_failures(results, errors)
+        return results
+
     def transaction(self, data: dict):
         """Lawson Transaction call."""
         url = '/servlet/Router/Transaction/erp'
         productline_key = '_PDL'
-        return self._generic_call(url=url, data=data, productline_key=productline_key)
+        return self._generic_call(url=url, data=data, productline_key=productline_key, cacheable=False)
 
     def what(self, data: dict):
         """Lawson What call."""
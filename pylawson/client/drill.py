@@ -0,0 +1,73 @@
+"""Memoized Drill (IDA) results for batch drill-around resolution."""
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, Iterable, Optional, Tuple
+from pylawson.exceptions import IosDrillError
+
+# Parsed Drill response: the COL values of each LINE.
+DrillLines = Tuple[Tuple[str, ...], ...]
+
+
+def drill_key(data: dict) -> tuple:
+    """Hashable, order-independent key for a Drill request's parameters."""
+    return tuple(sorted((str(k), str(v)) for k, v in data.items()))
+
+
+def unique_requests(requests: Iterable[dict]) -> 'OrderedDict[tuple, dict]':
+    """Drill key -> request for each distinct request, in first-seen order."""
+    result = OrderedDict()
+    for data in requests:
+        result.setdefault(drill_key(data), data)
+    return result
+
+
+def raise_failures(results: 'OrderedDict[tuple, DrillLines]', errors: Dict[tuple, Exception]):
+    """Raise IosDrillError carrying the resolved results if any request of a batch failed."""
+    if not errors:
+        return
+    for key in errors:
+        results.pop(key, None)
+    first = next(iter(errors.values()))
+    raise IosDrillError('{} of {} drill requests failed; first error: {}'.format(
+        len(errors), len(errors) + len(results), first), results=results, errors=errors)
+
+
+class DrillMemo:
+    """Size-bounded LRU memo of parsed Drill results for one session.
+
+    Drill results do not expire; call ``clear()`` when the underlying master data may have changed.
+    """
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def __repr__(self):
+        return '{}(entries={}, hits={}, misses={})'.format(self.__class__.__name__, len(self), self.hits,
+                                                           self.misses)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: tuple) -> Optional[DrillLines]:
+        with self._lock:
+            lines = self._entries.get(key)
+            if lines is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return lines
+
+    def put(self, key: tuple, lines: DrillLines):
+        with self._lock:
+            self._entries[key] = lines
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
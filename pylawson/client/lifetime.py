@@ -0,0 +1,77 @@
+"""Session lifetime tracking, so authentication state does not need a server round trip per check."""
+from logging import getLogger
+from threading import Lock, Timer
+import time
+from typing import Callable, Optional
+
+logger = getLogger(__name__)
+
+
+class SessionLifetime:
+    """Tracks when a session expires and optionally refreshes it in the background before it does.
+
+    ``active`` is answered from the cached deadline; the session calls ``expires_in`` whenever it learns
+    the remaining time (login, PING, refresh) and ``expire`` when the server reports the session gone.
+    If ``refresh`` is given it is called on a daemon timer ``margin`` seconds before the deadline.
+    """
+    def __init__(self, refresh: Optional[Callable[[], None]] = None, margin: float = 60.0):
+        self.refresh = refresh
+        self.margin = margin
+        self.generation = 0  # incremented on every (re)authentication
+        self._deadline = 0.0
+        self._timer = None  # type: Optional[Timer]
+        self._lock = Lock()
+
+    def __repr__(self):
+        return '{}(active={}, remaining={:.0f}s)'.format(self.__class__.__name__, self.active, self.remaining)
+
+    def __bool__(self):
+        return self.active
+
+    @property
+    def active(self) -> bool:
+        return time.monotonic() < self._deadline
+
+    @property
+    def remaining(self) -> float:
+        """Seconds until the session expires (0 if it already has)."""
+        return max(self._deadline - time.monotonic(), 0.0)
+
+    def expires_in(self, seconds: float, authenticated: bool = False):
+        """Record the remaining session time; ``authenticated`` marks a new login."""
+        with self._lock:
+            self._deadline = time.monotonic() + seconds
+            if authenticated:
+                self.generation += 1
+            self._schedule()
+
+    def expire(self):
+        """Mark the session expired."""
+        with self._lock:
+            self._deadline = 0.0
+            self._cancel()
+
+    def stop(self):
+        """Stop background refreshes."""
+        with self._lock:
+            self._cancel()
+
+    def _cancel(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _schedule(self):
+        self._cancel()
+        if self.refresh is None or self.remaining <= 0:
+            return
+        self._timer = Timer(max(self.remaining - self.margin, 1.0), self._run_refresh)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _run_refresh(self):
+        logger.debug('Refreshing session, {:.0f}s remaining.'.format(self.remaining))
+        try:
+            self.refresh()
+        except Exception as e:
+            logger.warning('Background session refresh failed: {}'.format(e))
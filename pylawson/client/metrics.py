@@ -0,0 +1,153 @@
+"""Per-call metrics for IOS sessions, exportable as Prometheus text or a JSON snapshot.
+
+Assign ``Metrics()`` to ``session.metrics`` to enable; with the default of None nothing is recorded.
+"""
+from bisect import bisect_left
+import json
+from threading import Lock
+from typing import Callable, List, Optional, Union
+
+# Histogram bucket upper bounds in seconds.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+COUNTERS = ('requests', 'errors', 'retries', 'bytes_sent', 'bytes_received', 'records')
+
+
+def body_size(body: Union[str, bytes]) -> int:
+    """Size of a response body in bytes; decoded str bodies are measured as UTF-8."""
+    if isinstance(body, str) and not body.isascii():
+        return len(body.encode('utf-8'))
+    return len(body)
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram."""
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets: tuple = BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[tuple]:
+        """(upper bound, cumulative count) pairs, ending with ('+Inf', count)."""
+        result, total = [], 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def as_dict(self) -> dict:
+        return {'count': self.count, 'sum': self.sum, 'buckets': self.cumulative()}
+
+
+class Series:
+    """Metrics for one endpoint and FILE/_TKN target."""
+    __slots__ = ('request_seconds', 'parse_seconds') + COUNTERS
+
+    def __init__(self):
+        self.request_seconds = Histogram()
+        self.parse_seconds = Histogram()
+        for name in COUNTERS:
+            setattr(self, name, 0)
+
+    def as_dict(self) -> dict:
+        result = {name: getattr(self, name) for name in COUNTERS}
+        result['request_seconds'] = self.request_seconds.as_dict()
+        result['parse_seconds'] = self.parse_seconds.as_dict()
+        return result
+
+
+class Metrics:
+    """Thread-safe per-endpoint, per-target call metrics with optional event hooks.
+
+    Each hook is called with an event dict (``event`` is 'call', 'parse' or 'retry', plus ``endpoint``,
+    ``target`` and the recorded values) after it is aggregated.
+    """
+    def __init__(self, hooks: List[Callable[[dict], None]] = None):
+        self.hooks = list(hooks or [])
+        self._series = {}
+        self._lock = Lock()
+
+    def __repr__(self):
+        return '{}(series={})'.format(self.__class__.__name__, len(self._series))
+
+    def _get(self, endpoint: str, target: Optional[str]) -> Series:
+        key = (endpoint, target or '')
+        series = self._series.get(key)
+        if series is None:
+            series = self._series.setdefault(key, Series())
+        return series
+
+    def _emit(self, event: dict):
+        for hook in self.hooks:
+            hook(event)
+
+    def record_call(self, endpoint: str, target: Optional[str], seconds: float, bytes_sent: int = 0,
+                    bytes_received: int = 0, error: bool = False):
+        with self._lock:
+            series = self._get(endpoint, target)
+            series.request_seconds.observe(seconds)
+            series.requests += 1
+            series.errors += bool(error)
+            series.bytes_sent += bytes_sent
+            series.bytes_received += bytes_received
+        if self.hooks:
+            self._emit({'event': 'call', 'endpoint': endpoint, 'target': target, 'seconds': seconds,
+                        'bytes_sent': bytes_sent, 'bytes_received': bytes_received, 'error': error})
+
+    def record_parse(self, endpoint: str, target: Optional[str], seconds: float, records: int = 0):
+        with self._lock:
+            series = self._get(endpoint, target)
+            series.parse_seconds.observe(seconds)
+            series.records += records
+        if self.hooks:
+            self._emit({'event': 'parse', 'endpoint': endpoint, 'target': target, 'seconds': seconds,
+                        'records': records})
+
+    def record_retry(self, endpoint: str, target: Optional[str] = None):
+        with self._lock:
+            self._get(endpoint, target).retries += 1
+        if self.hooks:
+            self._emit({'event': 'retry', 'endpoint': endpoint, 'target': target})
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def snapshot(self) -> dict:
+        """Nested dict of endpoint -> target -> metrics."""
+        with self._lock:
+            result = {}
+            for (endpoint, target), series in sorted(self._series.items()):
+                result.setdefault(endpoint, {})[target] = series.as_dict()
+            return result
+
+    def to_json(self, **kwargs) -> str:
+        return json.dumps(self.snapshot(), **kwargs)
+
+    def to_prometheus(self, prefix: str = 'pylawson') -> str:
+        """Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            items = sorted(self._series.items())
+            for name in ('request_seconds', 'parse_seconds'):
+                lines.append('# TYPE {}_{} histogram'.format(prefix, name))
+                for (endpoint, target), series in items:
+                    histogram = getattr(series, name)
+                    labels = 'endpoint="{}",target="{}"'.format(endpoint, target)
+                    for bound, count in histogram.cumulative():
+                        lines.append('{}_{}_bucket{{{},le="{}"}} {}'.format(prefix, name, labels, bound, count))
+                    lines.append('{}_{}_sum{{{}}} {}'.format(prefix, name, labels, histogram.sum))
+                    lines.append('{}_{}_count{{{}}} {}'.format(prefix, name, labels, histogram.count))
+            for name in COUNTERS:
+                lines.append('# TYPE {}_{}_total counter'.format(prefix, name))
+                for (endpoint, target), series in items:
+                    lines.append('{}_{}_total{{endpoint="{}",target="{}"}} {}'.format(
+                        prefix, name, endpoint, target, getattr(series, name)))
+        return '\n'.join(lines) + '\n'
@@ -1,75 +1,72 @@
 from base64 import b64encode
 from io import IOBase
 from logging import getLogger
-from typing import Union
+from typing import Generator, Union
 # noinspection PyPackageRequirements
 from bs4 import BeautifulSoup
 from requests import Session
+from requests.adapters import HTTPAdapter
 from requests.compat import cookielib
+from requests.cookies import create_cookie
+from threading import Lock
 from urllib.parse import urljoin, urlparse
 from pylawson import IosAuthenticationError, IosConnectionError
 from pylawson.client import IosSession
+from .base_session import endpoint_name
+from .response import IosResponse
+from .session_cache import SessionCache
 
 logger = getLogger(__name__)
 
+# Gateway/overload responses raised as IosConnectionError so they can be throttled and retried.
+SERVER_BUSY_STATUS = frozenset([502, 503, 504])
 
-class SamlSession(IosSession):
-    def __init__(self, json_file: Union[str, IOBase] = None, lawson_server: str = None, ident_server: str = None,
-                 username: str = None, password: str = None):
-        super().__init__(json_file=json_file, lawson_server=lawson_server, ident_server=ident_server,
-                         username=username, password=password)
-        self._sso = None
-        headers = {
-            'Upgrade-Insecure-Requests': '1', 'Accept-Language': 'en-US,en',
-            'Accept': 'text/html,application/xhtml+xml,application/xml,image/webp,*/*',
-            'User-Agent': 'Mozilla/5.0 (Windows NT 6.1; WOW64) AppleWebKit/537.36 (KHTML, like Gecko) ' +
-                          'Chrome/53.0.2785.143 Safari/537.36'
-        }
+
+class SamlAuthFlow:
+    """SAML login steps shared by the blocking and asyncio SAML sessions."""
+    headers = {
+        'Upgrade-Insecure-Requests': '1', 'Accept-Language': 'en-US,en',
+        'Accept': 'text/html,application/xhtml+xml,application/xml,image/webp,*/*',
+        'User-Agent': 'Mozilla/5.0 (Windows NT 6.1; WOW64) AppleWebKit/537.36 (KHTML, like Gecko) ' +
+                      'Chrome/53.0.2785.143 Safari/537.36'
+    }
+
+    def _ip_cookie(self) -> cookielib.Cookie:
+        """Persistent Identity Provider selection cookie, so the IdP discovery form is skipped."""
         ip_host = self._params['ident_host'] or urlparse(self._params['lawson_server']).netloc
-        ip_cookie = cookielib.Cookie(
+        return cookielib.Cookie(
             version=0, name='MSISIPSelectionPersistent',
             value=b64encode(self._params['ident_server'].encode('utf-8')).decode('utf-8'),
             port=None, port_specified=False, domain=ip_host, domain_specified=False,
             domain_initial_dot=False, path='/adfs/ls', path_specified=True, secure=True,
             expires=cookielib.timegm(cookielib.time.localtime()) + 2500000, discard=False,
             comment=None, comment_url=None, rest={'HttpOnly': None}, rfc2109=False)
-        self.session = Session()
-        self.session.cookies.set_cookie(ip_cookie)
-        self.session.headers.update(headers)
-        logger.debug('Basic SamlSession instantiation completed.')
-        self._auth()
 
-    def __bool__(self):
-        soup = BeautifulSoup(self.get('?_action=PING'), 'html.parser')
-        if soup.find('sessionstatus').text == 'true':
-            status = 'Active as {}, '.format(soup.find('username').text)
-            milliseconds = self._sso[1] + int(soup.find('time_remaining').text)
+    def _ping_status(self, xml: str) -> bool:
+        """Read a PING response; log, update the session lifetime and return whether the session is active."""
+        ping = self.parser.fields(xml, 'SESSIONSTATUS', 'USERNAME', 'TIME_REMAINING')
+        if ping['SESSIONSTATUS'] == 'true':
+            status = 'Active as {}, '.format(ping['USERNAME'])
+            milliseconds = self._sso[1] + int(ping['TIME_REMAINING'])
             status += 'time remaining: {}'.format(
                 cookielib.datetime.timedelta(milliseconds=milliseconds).__str__()[:-5])
             logger.debug(msg=status)
+            self._lifetime.expires_in(milliseconds / 1000)
             return True
 
+        self._lifetime.expire()
         return False
 
-    def get(self, url: str) -> str:
-        url = urljoin(self._params['lawson_server'], url)
-        return self.session.get(url=url).text
-
-    def post(self, url: str, data: dict) -> str:
-        url = urljoin(self._params['lawson_server'], url)
-        return self.session.post(url=url, data=data).text
-
-    def close(self):
-        if self:
-            self.get(url='?_action=LOGOUT')
-            self.session.close()
-        logger.info(msg='Closed session.')
+    def _auth_steps(self) -> Generator[tuple, object, None]:
+        """Series of requests for SAML authentication.
 
-    def _auth(self):
-        """Perform series of requests for SAML authentication."""
+        Yields (method, url, keyword arguments) for each request and is sent back the response, which
+        needs ``status_code``, ``headers``, ``cookies``, ``text`` and ``url``, so that blocking and
+        asyncio sessions share the same login logic.
+        """
 
         # 1 - Request the target resource at service provider - status 302
-        response = self.session.get(url=self._params['lawson_server'], allow_redirects=False)
+        response = yield 'GET', self._params['lawson_server'], {'allow_redirects': False}
         logger.debug(msg='Auth #1 - request target resource')
         if 'wa=wsignin' not in response.headers.get('Location', '') or response.status_code != 302:
             msg = 'Unexpected response from initial Target Resource Request.'
@@ -77,13 +74,13 @@ class SamlSession(IosSession):
             raise IosConnectionError(msg)
 
         # 2 - Discover Identity Provider - form to select IdP (unless persistent cookie) - status 200
-        id_response = self.session.get(url=response.headers['Location'], allow_redirects=False)
+        id_response = yield 'GET', response.headers['Location'], {'allow_redirects': False}
         logger.debug(msg='Auth #2 - discover identity provider')
         if id_response.status_code == 200:
             url, data = self._form(id_response)
 
             # 3 - Redirect to SSO Service at IdP - status 302
-            response = self.session.post(url, allow_redirects=False, data=data)
+            response = yield 'POST', url, {'allow_redirects': False, 'data': data}
             logger.debug(msg='Auth #3 - redirect to SSO service')
             redirect = response.headers.get('Location')
             if response.cookies.get('MSISIPSelectionSession') is None:
@@ -98,7 +95,7 @@ class SamlSession(IosSession):
                 raise IosConnectionError(msg)
 
         # 4 - Request the SSO Service at IdP - provides sign in form - status 200
-        response = self.session.get(redirect, allow_redirects=False, headers={'Referer': id_response.url})
+        response = yield 'GET', redirect, {'allow_redirects': False, 'headers': {'Referer': id_response.url}}
         logger.debug(msg='Auth #4 - request SSO service (sign in form)')
         url, data = self._form(response)
         if 'wa=wsignin' not in url or response.status_code != 200:
@@ -107,7 +104,7 @@ class SamlSession(IosSession):
             raise IosConnectionError(msg)
 
         # 5 - Identify the user - sets auth cookies - status 302
-        response = self.session.post(url, allow_redirects=False, data=data, headers={'Referer': response.url})
+        response = yield 'POST', url, {'allow_redirects': False, 'data': data, 'headers': {'Referer': response.url}}
         logger.debug(msg='Auth #5 - identify the user')
         if response.cookies.get('MSISAuth') is None or response.status_code != 302:
             msg = 'Invalid username or password. (Is password expired?)'
@@ -115,9 +112,8 @@ class SamlSession(IosSession):
             raise IosAuthenticationError(msg)
 
         # 6 - Respond with XHTML form - status 200 (JS autosubmit script)
-        response = self.session.get(
-            response.headers['Location'], allow_redirects=False, headers={'Referer': response.url}
-        )
+        response = yield 'GET', response.headers['Location'], {
+            'allow_redirects': False, 'headers': {'Referer': response.url}}
         logger.debug(msg='Auth #6 - XHTML form')
         url, data = self._form(response)
         if response.cookies.get('MSISAuthenticated') is None or response.status_code != 200:
@@ -126,7 +122,7 @@ class SamlSession(IosSession):
             raise IosConnectionError(msg)
 
         # 7 - Request Assertion Consumer Service at Service Provider - status 200 (JS autosubmit script)
-        response = self.session.post(url, allow_redirects=False, data=data, headers={'Referer': response.url})
+        response = yield 'POST', url, {'allow_redirects': False, 'data': data, 'headers': {'Referer': response.url}}
         logger.debug(msg='Auth #7 - request assertion consumer service')
         url, data = self._form(response)
         if response.cookies.get('MSISSignOut') is None or response.status_code != 200:
@@ -135,7 +131,7 @@ class SamlSession(IosSession):
             raise IosConnectionError(msg)
 
         # 8 - Redirect to target resource - sets C.LWSN session cookie finally - status 302
-        response = self.session.post(url, allow_redirects=False, data=data, headers={'Referer': response.url})
+        response = yield 'POST', url, {'allow_redirects': False, 'data': data, 'headers': {'Referer': response.url}}
         logger.debug(msg='Auth #8 - redirect to target resource')
         self._sso = (
             response.headers.get('SSO_STATUS', 'NoStatusHeader'),  # LoginSuccessful
@@ -148,10 +144,8 @@ class SamlSession(IosSession):
             raise IosConnectionError(msg)
 
         # 9 - Request target resource again - status 200 - (JS redirects to LOGINCOMPLETE)
-        response = self.session.get(
-            response.headers['Location'], allow_redirects=False,
-            headers={'Referer': response.url}
-        )
+        response = yield 'GET', response.headers['Location'], {
+            'allow_redirects': False, 'headers': {'Referer': response.url}}
         logger.debug(msg='Auth #9 - request target resource again')
         if 'LOGINCOMPLETE' not in response.text:
             msg = 'Unexpected response from Target Resource.'
@@ -159,13 +153,13 @@ class SamlSession(IosSession):
             raise IosConnectionError(msg)
 
         # Get Transfer Session URL for session refresh later.
-        self._xfer_url = self.session.get(urljoin(self._params['lawson_server'], '?_action=GET_XFER_SESSION')).text
+        response = yield 'GET', urljoin(self._params['lawson_server'], '?_action=GET_XFER_SESSION'), {}
+        self._xfer_url = response.text
         logger.debug(msg='Auth complete; XFER_SESSION response: {}.'.format(self._xfer_url))
 
         # Get Profile attributes
-        soup = BeautifulSoup(self.get('/servlet/Profile?section=attributes'), 'html.parser')
-        self._profile.__dict__ = {element.attrs['name'].lower(): element.attrs['value'] for element in
-                                  soup.find_all('attr')}
+        response = yield 'GET', urljoin(self._params['lawson_server'], '/servlet/Profile?section=attributes'), {}
+        self._profile.__dict__ = self.parser.attributes(response.text)
         logger.debug('Populated profile.')
 
     def _form(self, response) -> (str, dict):
@@ -178,7 +172,7 @@ class SamlSession(IosSession):
             logger.error(msg=msg)
             raise IosConnectionError(msg)
         if select is not None and 'Provider' in select.get('name'):
-            data[select] = self._params['ident_server']
+            data[select.get('name')] = self._params['ident_server']
         for element in soup.find_all('input'):
             if element.has_attr('name') and element.has_attr('value'):
                 data[element['name']] = element['value']
@@ -188,3 +182,173 @@ class SamlSession(IosSession):
                 data[element['name']] = self._params['password']
         action = urljoin(response.url, soup.find('form').get('action'))
         return action, data
+
+
+class SamlSession(SamlAuthFlow, IosSession):
+    def __init__(self, json_file: Union[str, IOBase] = None, lawson_server: str = None, ident_server: str = None,
+                 username: str = None, password: str = None, pool_size: int = 10,
+                 session_cache: Union[str, SessionCache] = None, auto_refresh: bool = True):
+        super().__init__(json_file=json_file, lawson_server=lawson_server, ident_server=ident_server,
+                         username=username, password=password)
+        self._sso = None
+        self._pool_size = 0
+        self._auth_lock = Lock()
+        if auto_refresh:
+            self._lifetime.refresh = self.refresh
+        session_cache = session_cache or self._params.get('session_cache')
+        self._cache = SessionCache(session_cache) if isinstance(session_cache, str) else session_cache
+        self.session = Session()
+        self.session.cookies.set_cookie(self._ip_cookie())
+        self.session.headers.update(self.headers)
+        self.set_pool_size(pool_size)
+        logger.debug('Basic SamlSession instantiation completed.')
+        self._login()
+
+    def __bool__(self):
+        """Authentication state from the tracked session lifetime (see ``ping`` to ask the server)."""
+        return self._lifetime.active
+
+    def ping(self) -> bool:
+        """PING the server; updates the tracked session lifetime."""
+        return self._ping_status(self._request('GET', '?_action=PING', replay=False).text)
+
+    def refresh(self):
+        """Refresh the session through the transfer-session URL, re-authenticating if it has lapsed."""
+        generation = self._lifetime.generation
+        if self._xfer_url and '://' in self._xfer_url:
+            self.session.get(url=self._xfer_url)
+        if not self.ping():
+            self._reauthenticate(generation)
+
+    def get(self, url: str) -> str:
+        return self.get_response(url).text
+
+    def post(self, url: str, data: dict) -> str:
+        return self.post_response(url, data).text
+
+    def get_response(self, url: str) -> IosResponse:
+        return IosResponse.from_requests(self._request('GET', url, stream=True))
+
+    def post_response(self, url: str, data: dict) -> IosResponse:
+        return IosResponse.from_requests(self._request('POST', url, data=data, stream=True))
+
+    def _request(self, method: str, url: str, replay: bool = True, **kwargs):
+        """Send a request; if the session has expired, re-authenticate and replay it once."""
+        url = urljoin(self._params['lawson_server'], url)
+        generation = self._lifetime.generation
+        response = self.session.request(method, url, **kwargs)
+        if replay and self._is_expired(response):
+            logger.info('Session expired; re-authenticating and replaying {} {}.'.format(method, url))
+            if self.metrics is not None:
+                self.metrics.record_retry(endpoint_name(url))
+            response.close()
+            self._reauthenticate(generation)
+            response = self.session.request(method, url, **kwargs)
+        if response.status_code in SERVER_BUSY_STATUS:
+            response.close()
+            msg = 'Server busy: HTTP {} from {}.'.format(response.status_code, url)
+            logger.warning(msg=msg)
+            raise IosConnectionError(msg, status=response.status_code)
+        if not 200 <= response.status_code < 300:
+            response.close()
+            msg = 'HTTP {} from {}.'.format(response.status_code, url)
+            logger.error(msg=msg)
+            raise IosConnectionError(msg, status=response.status_code)
+        return response
+
+    @staticmethod
+    def _is_expired(response) -> bool:
+        """An expired session is redirected to the identity provider's sign in."""
+        if 'wa=wsignin' in response.url:
+            return True
+        return any('wa=wsignin' in redirect.headers.get('Location', '') for redirect in response.history)
+
+    def _reauthenticate(self, generation: int):
+        """Log in again unless another thread already has since `generation`."""
+        with self._auth_lock:
+            if self._lifetime.generation != generation:
+                return
+            self._lifetime.expire()
+            self.session.cookies.clear()
+            self.session.cookies.set_cookie(self._ip_cookie())
+            self._login()
+
+    def set_pool_size(self, size: int):
+        """Mount HTTP adapters whose connection pools allow `size` concurrent connections per host."""
+        size = max(size, 1)
+        if self._pool_size >= size:
+            return
+        self._pool_size = size
+        for prefix in ('https://', 'http://'):
+            previous = self.session.adapters.get(prefix)
+            self.session.mount(prefix, HTTPAdapter(pool_connections=size, pool_maxsize=size))
+            if previous is not None:
+                previous.close()  # release the smaller pool's connections
+        logger.debug('Connection pool size set to {}.'.format(size))
+
+    def close(self, logout: bool = None):
+        """Close the session; log out of Lawson unless the session is kept for reuse in a session cache."""
+        if logout is None:
+            logout = self._cache is None
+        self._lifetime.stop()
+        if logout and self:
+            self._request('GET', '?_action=LOGOUT', replay=False)
+            self._lifetime.expire()
+            if self._cache is not None:
+                with self._cache.lock():
+                    self._cache.clear(self._cache_key)
+        self.session.close()
+        logger.info(msg='Closed session.')
+
+    @property
+    def _cache_key(self) -> str:
+        return '{} {}'.format(self._params['lawson_server'], self._params['username'])
+
+    def _login(self):
+        """Reuse a cached session if it is still active, otherwise authenticate (and update the cache)."""
+        if self._cache is None:
+            self._auth()
+            return
+        with self._cache.lock():
+            if self._restore(self._cache.load(self._cache_key)):
+                return
+            self._auth()
+            state = {
+                'cookies': [{'name': cookie.name, 'value': cookie.value, 'domain': cookie.domain,
+                             'path': cookie.path, 'secure': cookie.secure, 'expires': cookie.expires,
+                             'rest': cookie._rest} for cookie in self.session.cookies],
+                'xfer_url': self._xfer_url,
+                'sso': self._sso,
+                'profile': self._profile.__dict__,
+            }
+            self._cache.save(self._cache_key, state, lifetime=self._sso[1] / 1000)
+
+    def _restore(self, state: dict) -> bool:
+        """Load cached session state and validate it with a single PING."""
+        if not state:
+            return False
+        for cookie in state['cookies']:
+            self.session.cookies.set_cookie(create_cookie(**cookie))
+        self._xfer_url = state['xfer_url']
+        self._sso = tuple(state['sso'])
+        self._profile.__dict__ = dict(state['profile'])
+        if self.ping():
+            logger.info('Reusing cached session from {}.'.format(self._cache.path))
+            self._lifetime.expires_in(self._lifetime.remaining, authenticated=True)
+            return True
+        logger.debug('Cached session is no longer active; authenticating.')
+        self.session.cookies.clear()
+        self.session.cookies.set_cookie(self._ip_cookie())
+        return False
+
+    def _auth(self):
+        """Perform series of requests for SAML authentication."""
+        steps = self._auth_steps()
+        response = None
+        try:
+            while True:
+                method, url, kwargs = steps.send(response)
+                response = self.session.request(method, url, **kwargs)
+        except StopIteration:
+            pass
+        self._lifetime.expires_in(self._sso[1] / 1000, authenticated=True)
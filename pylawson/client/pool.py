@@ -0,0 +1,268 @@
+"""Pool of logged-in IOS sessions, routed by product line with least-loaded balancing."""
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import inspect
+from io import IOBase, StringIO
+import json
+from logging import getLogger
+from threading import Event, Lock, Thread
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Type, Union
+from pylawson.exceptions import IosConnectionError, IosError
+from .base_session import IosSession
+from .throttle import is_transient
+
+logger = getLogger(__name__)
+
+# Session methods routed through the pool; transactions are never retried on another member.
+READ_METHODS = ('tokens', 'attachments', 'data', 'drill', 'what')
+# Config keys used by the pool itself rather than passed to the session.
+POOL_KEYS = ('sessions', 'productline')
+
+
+class PoolMember:
+    """One pooled session with its product line, in-flight call count and health."""
+    __slots__ = ('session', 'config', 'productline', 'in_flight', 'calls', 'healthy', 'retry_at')
+
+    def __init__(self, session: IosSession, config: dict):
+        self.session = session
+        self.config = config
+        self.productline = config.get('productline') or getattr(session.profile, 'productline', None)
+        self.in_flight = 0
+        self.calls = 0
+        self.healthy = True
+        self.retry_at = 0.0  # time.monotonic() after which an unhealthy member is tried again
+
+    def __repr__(self):
+        return '{}({}, productline={}, in_flight={}, healthy={})'.format(
+            self.__class__.__name__, self.config.get('lawson_server'), self.productline, self.in_flight, self.healthy)
+
+
+class _SessionSetting:
+    """A session attribute set through the pool on every member, e.g. ``pool.metrics = Metrics()``."""
+    def __set_name__(self, owner, name: str):
+        self.name = name
+
+    def __get__(self, pool, owner=None):
+        if pool is None:
+            return self
+        return getattr(pool.members[0].session, self.name) if pool.members else None
+
+    def __set__(self, pool, value):
+        for member in pool.members:
+            setattr(member.session, self.name, value)
+
+
+class SessionPool:
+    """Log in several sessions, possibly to different servers, users or product lines, and share calls among them.
+
+    Each config is a dict of session arguments as in the json_file ``lawson`` section, plus optional ``sessions``
+    (how many logins to open with it, default 1) and ``productline`` (to route by before the profile is read).
+    Calls go to the healthy member with the fewest calls in flight, among those for the requested product line.
+    A call that fails with a connection error or timeout marks its member unhealthy; reads are then retried once
+    on another member. After ``recovery_seconds`` an unhealthy member is given one read again (or any call, if
+    no member is healthy) and is restored if it succeeds; ``health_check()`` (or ``health_interval``) restores
+    members that answer a ping.
+
+    The pool can stand in for a session under the data layer (``JournalLine(pool).iter_records()``, bulk
+    uploads, extracts): ``parser``, ``metrics`` and ``cache`` are read from the members and, when assigned,
+    set on all of them, and ``validator`` checks uploads made through the pool.
+    """
+    parser = _SessionSetting()
+    metrics = _SessionSetting()
+    cache = _SessionSetting()
+
+    def __init__(self, configs: Iterable[dict] = None, json_file: Union[str, IOBase] = None,
+                 session_class: Type[IosSession] = None, health_interval: float = None, max_workers: int = 8,
+                 recovery_seconds: float = 30.0):
+        if session_class is None:
+            from .ms_samlpr import SamlSession as session_class
+        self.session_class = session_class
+        self.recovery_seconds = recovery_seconds
+        self.validator = None  # pylawson.validate.Validator checking uploads made through the pool
+        self.members = []  # type: List[PoolMember]
+        self._lock = Lock()
+        self._stop = Event()
+        self._health_thread = None
+        configs = list(configs or [])
+        if json_file:
+            configs.extend(self.read_configs(json_file))
+        if not configs:
+            raise ValueError('SessionPool needs at least one session config.')
+        expanded = [dict(config) for config in configs for _ in range(int(config.get('sessions', 1)))]
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(expanded)))) as executor:
+            futures = [executor.submit(self._open, config) for config in expanded]
+        errors = [future.exception() for future in futures if future.exception() is not None]
+        self.members = [future.result() for future in futures if future.exception() is None]
+        if errors:
+            logger.error('SessionPool failed to open {} of {} sessions.'.format(len(errors), len(expanded)))
+            self.close()
+            raise errors[0]
+        logger.info('SessionPool opened {} sessions for product lines {}.'.format(len(self.members),
+                                                                                  sorted(self.productlines)))
+        if health_interval:
+            self.start_health_checks(health_interval)
+
+    def __repr__(self):
+        return '{}(sessions={}, healthy={})'.format(self.__class__.__name__, len(self.members),
+                                                    sum(member.healthy for member in self.members))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return len(self.members)
+
+    @staticmethod
+    def read_configs(json_file: Union[str, IOBase]) -> List[dict]:
+        """Session configs from a json_file whose ``lawson`` section is one config or a list of them."""
+        if isinstance(json_file, IOBase):
+            section = json.load(fp=json_file).get('lawson', {})
+        else:
+            with open(json_file) as fp:
+                section = json.load(fp=fp).get('lawson', {})
+        return list(section) if isinstance(section, list) else [section]
+
+    def _open(self, config: dict) -> PoolMember:
+        """Log in one session: arguments of the session class are passed as such, other keys (e.g. ident_host)
+        as a json_file ``lawson`` section, as if the config had been read from one."""
+        arguments = inspect.signature(self.session_class).parameters
+        kwargs, section = {}, {}
+        for key, value in config.items():
+            if key not in POOL_KEYS:
+                (kwargs if key in arguments and key != 'json_file' else section)[key] = value
+        if section:
+            kwargs['json_file'] = StringIO(json.dumps({'lawson': section}))
+        return PoolMember(self.session_class(**kwargs), config)
+
+    @property
+    def productlines(self) -> set:
+        return {member.productline for member in self.members}
+
+    @property
+    def stats(self) -> List[dict]:
+        return [{'server': member.config.get('lawson_server'), 'productline': member.productline,
+                 'in_flight': member.in_flight, 'calls': member.calls, 'healthy': member.healthy}
+                for member in self.members]
+
+    def _select(self, productline: Optional[str], exclude: Iterable[PoolMember] = (),
+                probe: bool = False) -> PoolMember:
+        """Least-loaded healthy member; with ``probe``, an unhealthy member due for recovery goes first."""
+        now = time.monotonic()
+        with self._lock:
+            members = [member for member in self.members if member not in exclude
+                       and (productline is None or member.productline == productline)]
+            due = [member for member in members if not member.healthy and member.retry_at <= now]
+            candidates = [member for member in members if member.healthy]
+            if due and (probe or not candidates):
+                candidates = due
+            if not candidates:
+                msg = 'No healthy session for product line {}.'.format(productline)
+                logger.error(msg=msg)
+                raise IosConnectionError(msg)
+            member = min(candidates, key=lambda candidate: (candidate.in_flight, candidate.calls))
+            if not member.healthy:
+                member.retry_at = now + self.recovery_seconds  # one probe at a time
+            member.in_flight += 1
+            member.calls += 1
+            return member
+
+    @contextmanager
+    def lease(self, productline: str = None, exclude: Iterable[PoolMember] = (),
+              probe: bool = False) -> Iterator[PoolMember]:
+        """Borrow the least-loaded healthy member for a product line (any if None) for the duration of a block."""
+        member = self._select(productline, exclude, probe)
+        try:
+            yield member
+        finally:
+            with self._lock:
+                member.in_flight -= 1
+
+    def call(self, method: str, data: dict, productline: str = None):
+        """Call a session method (e.g. 'data') on a pooled session for the product line."""
+        tried = []
+        while True:
+            with self.lease(productline, exclude=tried, probe=method in READ_METHODS and not tried) as member:
+                try:
+                    result = getattr(member.session, method)(data=data)
+                except OSError as e:
+                    if not is_transient(e):
+                        raise
+                    self._mark_unhealthy(member)
+                    tried.append(member)
+                    if method not in READ_METHODS or len(tried) > 1:
+                        raise
+                    logger.warning('Session {} failed ({}); retrying on another session.'.format(member, e))
+                    continue
+                if not member.healthy:
+                    member.healthy = True
+                    logger.info('Session {} recovered.'.format(member))
+                return result
+
+    def _mark_unhealthy(self, member: PoolMember):
+        member.healthy = False
+        member.retry_at = time.monotonic() + self.recovery_seconds
+
+    def tokens(self, data: dict, productline: str = None):
+        return self.call('tokens', data, productline)
+
+    def attachments(self, data: dict, productline: str = None):
+        return self.call('attachments', data, productline)
+
+    def data(self, data: dict, productline: str = None):
+        return self.call('data', data, productline)
+
+    def drill(self, data: dict, productline: str = None):
+        return self.call('drill', data, productline)
+
+    def transaction(self, data: dict, productline: str = None):
+        return self.call('transaction', data, productline)
+
+    def what(self, data: dict, productline: str = None):
+        return self.call('what', data, productline)
+
+    def set_pool_size(self, size: int):
+        """Size every member's connection pool for ``size`` concurrent calls."""
+        for member in self.members:
+            member.session.set_pool_size(size)
+
+    def health_check(self) -> Dict[int, bool]:
+        """Ping every member, refreshing lapsed logins where the session supports it; return index -> healthy."""
+        for member in self.members:
+            session = member.session
+            try:
+                healthy = session.ping() if hasattr(session, 'ping') else bool(session)
+                if not healthy and hasattr(session, 'refresh'):
+                    session.refresh()
+                    healthy = bool(session)
+            except (IosError, OSError) as e:
+                logger.warning('Health check failed for {}: {}'.format(member, e))
+                healthy = False
+            if healthy != member.healthy:
+                logger.info('Session {} is now {}.'.format(member, 'healthy' if healthy else 'unhealthy'))
+            if healthy:
+                member.healthy = True
+            else:
+                self._mark_unhealthy(member)
+        return {index: member.healthy for index, member in enumerate(self.members)}
+
+    def start_health_checks(self, interval: float):
+        """Run health_check() every interval seconds on a daemon thread until close()."""
+        def run():
+            while not self._stop.wait(interval):
+                self.health_check()
+
+        self._health_thread = Thread(target=run, name='SessionPoolHealth', daemon=True)
+        self._health_thread.start()
+
+    def close(self):
+        self._stop.set()
+        for member in self.members:
+            try:
+                member.session.close()
+            except (IosError, OSError) as e:
+                logger.warning('Closing {} failed: {}'.format(member, e))
+        logger.info(msg='Closed session pool.')
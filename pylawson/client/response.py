@@ -0,0 +1,77 @@
+"""Raw IOS response bodies kept as bytes."""
+import re
+from typing import Optional
+from pylawson.parser import sniff_error
+
+_DECLARED_ENCODING = re.compile(rb'<\?xml[^>]*encoding=["\']([A-Za-z0-9._-]+)["\']')
+_CHARSET = re.compile(r'charset=["\']?([A-Za-z0-9._-]+)', re.I)
+
+
+class IosResponse:
+    """Response body kept as the bytes read from the socket, decoded only on request through ``text``.
+
+    ``content`` can be handed straight to the parsers (expat honours the XML declaration's encoding), the
+    response cache and worker processes; ``release()`` drops it once the needed values have been read.
+    """
+    __slots__ = ('_content', 'encoding', 'status_code', 'url')
+
+    def __init__(self, content: bytes, encoding: str = None, status_code: int = None, url: str = None):
+        self._content = content
+        self.encoding = encoding
+        self.status_code = status_code
+        self.url = url
+
+    @classmethod
+    def from_requests(cls, response) -> 'IosResponse':
+        """Read a streamed requests.Response in one piece, bypassing requests' content join and charset detection.
+
+        Reading the urllib3 response directly allocates the body once, where ``response.content`` (and joining
+        ``iter_content`` chunks) holds the chunks and the joined copy at the same time.
+        """
+        match = _CHARSET.search(response.headers.get('Content-Type', ''))
+        try:
+            content = response.raw.read(decode_content=True)
+        finally:
+            response.raw.release_conn()
+        return cls(content, encoding=match.group(1) if match else None, status_code=response.status_code,
+                   url=response.url)
+
+    def __repr__(self):
+        return '<{} [{}] {}>'.format(self.__class__.__name__, self.status_code,
+                                     'released' if self.released else '{} bytes'.format(len(self)))
+
+    def __len__(self):
+        return len(self.content)
+
+    @property
+    def released(self) -> bool:
+        return self._content is None
+
+    @property
+    def content(self) -> bytes:
+        if self._content is None:
+            raise ValueError('Response body has been released.')
+        return self._content
+
+    @property
+    def declared_encoding(self) -> str:
+        """Encoding from the XML declaration, else the Content-Type charset, else UTF-8."""
+        match = _DECLARED_ENCODING.search(self.content[:256])
+        if match:
+            return match.group(1).decode('ascii')
+        return self.encoding or 'utf-8'
+
+    @property
+    def text(self) -> str:
+        """The body decoded to str; a new copy on every access."""
+        return self.content.decode(self.declared_encoding, errors='replace')
+
+    @property
+    def is_error(self) -> bool:
+        """True if the root element is ERROR, sniffed without parsing."""
+        return sniff_error(self.content)
+
+    def release(self) -> Optional[bytes]:
+        """Drop the body, returning it to a caller that still holds the only other reference."""
+        content, self._content = self._content, None
+        return content
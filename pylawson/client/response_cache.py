@@ -0,0 +1,121 @@
+"""TTL/LRU cache of IOS responses for slow-changing reference data."""
+from collections import OrderedDict
+import json
+from logging import getLogger
+import os
+import tempfile
+from threading import Lock
+import time
+from typing import Optional, Union
+from urllib.parse import urlencode
+
+logger = getLogger(__name__)
+
+# Seconds to keep responses, by endpoint name or 'endpoint:FILE'; endpoints not listed are not cached.
+DEFAULT_TTLS = {
+    'ListTokens': 3600,
+    'What': 86400,
+    'Data:ACACTIVITY': 900,
+}
+
+
+class ResponseCache:
+    """Size-bounded LRU cache of response bodies (str, or bytes from raw responses) with per-endpoint time-to-live.
+
+    Keys are the URL plus sorted call parameters (which include the product line). Pass ``path`` to load
+    entries from and ``save()`` them to a JSON file, so reference data survives between jobs.
+    """
+    def __init__(self, ttls: dict = None, max_entries: int = 1024, path: str = None):
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.max_entries = max_entries
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (expires, text)
+        self._lock = Lock()
+        if path:
+            self.load()
+
+    def __repr__(self):
+        return '{}(entries={}, hits={}, misses={})'.format(self.__class__.__name__, len(self), self.hits,
+                                                           self.misses)
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def key(url: str, data: dict) -> str:
+        return '{}?{}'.format(url, urlencode(sorted((str(k), str(v)) for k, v in data.items())))
+
+    def ttl(self, endpoint: str, data: dict) -> float:
+        """Time-to-live in seconds for a call, 0 if it should not be cached."""
+        file = data.get('FILE')
+        if file is not None and '{}:{}'.format(endpoint, file) in self.ttls:
+            return self.ttls['{}:{}'.format(endpoint, file)]
+        return self.ttls.get(endpoint, 0)
+
+    def get(self, key: str) -> Optional[Union[str, bytes]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: str, text: Union[str, bytes], ttl: float):
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, text)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    @property
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {'entries': len(self), 'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'hit_ratio': self.hits / total if total else 0.0}
+
+    def load(self):
+        """Load unexpired entries from ``path``."""
+        try:
+            with open(self.path) as fp:
+                entries = json.load(fp)
+        except FileNotFoundError:
+            return
+        except ValueError:
+            logger.warning('Ignoring unreadable response cache {}.'.format(self.path))
+            return
+        now = time.time()
+        with self._lock:
+            for key, (expires, text) in entries:
+                if expires > now:
+                    if isinstance(text, dict):
+                        text = text['bytes'].encode('latin-1')
+                    self._entries[key] = (expires, text)
+        logger.debug('Loaded {} cached responses from {}.'.format(len(self), self.path))
+
+    def save(self):
+        """Write unexpired entries to ``path``, replacing it atomically."""
+        now = time.time()
+        with self._lock:
+            entries = [(key, (expires, text if isinstance(text, str) else {'bytes': text.decode('latin-1')}))
+                       for key, (expires, text) in self._entries.items() if expires > now]
+        fd, temp_path = tempfile.mkstemp(prefix='.pylawson-', dir=os.path.dirname(os.path.abspath(self.path)))
+        try:
+            with os.fdopen(fd, 'w') as fp:
+                json.dump(entries, fp)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        logger.debug('Saved {} cached responses to {}.'.format(len(entries), self.path))
@@ -4,8 +4,6 @@ from logging import getLogger
 import os
 from typing import Union
 from urllib.parse import urlencode, urljoin
-# noinspection PyPackageRequirements
-from bs4 import BeautifulSoup
 from pylawson import IosError, IosAuthenticationError, IosConnectionError
 from pylawson.client import IosSession
 
@@ -28,15 +26,20 @@ logger = getLogger(__name__)
 
 
 def authorized(func):
-    """Wrapper to ensure authorization session is current before making a data call."""
+    """Wrapper to ensure authorization session is current before making a data call.
+
+    IsAuthenticated() is only consulted once the tracked session lifetime has lapsed.
+    """
     def wrapper(*args):
         instance = args[0]
-        if not instance.server or not instance.connection.IsAuthenticated():
-            instance.login(login_string='Log in again to continue.')
+        if instance.server and not instance._lifetime.active and instance.connection.IsAuthenticated():
+            instance._lifetime.expires_in(instance.check_interval)
+        if not instance.server or not instance._lifetime.active:
+            instance.login(clientDisplayName='Log in again to continue.')
         try:
             assert instance.profile.productline is not None
         except (AttributeError, AssertionError):
-            instance.login(login_string='Log in again to continue.')
+            instance.login(clientDisplayName='Log in again to continue.')
         return func(*args)
 
     return wrapper
@@ -48,6 +51,9 @@ class SecApiSession(IosSession):
 
     The Infor sec-api library will pop up a login window; as such, this class does not accept username/password.
     """
+    # Seconds an IsAuthenticated() result is trusted before it is checked again.
+    check_interval = 300
+
     def __init__(self, json_file: Union[str, IOBase] = None, lawson_server: str = None, ident_server: str = None):
         super().__init__(json_file=json_file, lawson_server=lawson_server, ident_server=ident_server,
                          username=None, password=None)
@@ -101,6 +107,7 @@ class SecApiSession(IosSession):
         """Logout and remove connection."""
         self.connection.Logout()
         self.connection = None
+        self._lifetime.expire()
         logger.info(msg='Closed session.')
 
     # noinspection PyPep8Naming
@@ -114,12 +121,11 @@ class SecApiSession(IosSession):
         """
         self.connection = self.authenticator.DoActiveClientLogin(clientDisplayName)
         if self:
+            self._lifetime.expires_in(self.check_interval, authenticated=True)
             self._xfer_url = self.connection.GetTransferSessionToken()  # Transfer token for session persistence.
             self.server = self.connection.GetConnectedServerUrl()  # Lawson server which we have logged in to.
             # Profile Attributes for the logged-in user.
-            soup = BeautifulSoup(self._get('/servlet/Profile?section=attributes'), 'html.parser')
-            self._profile.__dict__ = {element.attrs['name'].lower(): element.attrs['value'] for element in
-                                      soup.find_all('attr')}
+            self._profile.__dict__ = self.parser.attributes(self._get('/servlet/Profile?section=attributes'))
             logger.debug('Populated profile.')
 
         else:
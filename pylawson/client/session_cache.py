@@ -0,0 +1,92 @@
+"""On-disk cache of authenticated IOS session state, shared between processes."""
+from contextlib import contextmanager
+import json
+from logging import getLogger
+import os
+import tempfile
+import time
+from typing import Optional
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+logger = getLogger(__name__)
+
+
+class SessionCache:
+    """JSON file of session state (cookies, transfer URL, SSO timeout and profile) per server and user.
+
+    The file is written with owner-only permissions and replaced atomically; ``lock()`` serializes
+    processes so only one of them performs a full login when the cached session has expired.
+    """
+    def __init__(self, path: str):
+        self.path = os.path.abspath(os.path.expanduser(path))
+
+    def __repr__(self):
+        return '{}({!r})'.format(self.__class__.__name__, self.path)
+
+    @contextmanager
+    def lock(self):
+        """Exclusive inter-process lock on the cache (a sibling .lock file)."""
+        fd = os.open(self.path + '.lock', os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            else:
+                msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+            yield self
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+            os.close(fd)
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path) as fp:
+                return json.load(fp)
+        except FileNotFoundError:
+            return {}
+        except ValueError:
+            logger.warning('Ignoring unreadable session cache {}.'.format(self.path))
+            return {}
+
+    def _write(self, entries: dict):
+        directory = os.path.dirname(self.path)
+        fd, temp_path = tempfile.mkstemp(prefix='.pylawson-', dir=directory)
+        try:
+            os.chmod(temp_path, 0o600)
+            with os.fdopen(fd, 'w') as fp:
+                json.dump(entries, fp)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def load(self, key: str) -> Optional[dict]:
+        """Return the cached state for key if it has not expired."""
+        state = self._read().get(key)
+        if state is None:
+            return None
+        if state.get('expires', 0) <= time.time():
+            logger.debug('Cached session for {} has expired.'.format(key))
+            return None
+        return state
+
+    def save(self, key: str, state: dict, lifetime: float):
+        """Store state for key, expiring after lifetime seconds."""
+        entries = self._read()
+        state = dict(state, expires=time.time() + lifetime)
+        entries[key] = state
+        self._write(entries)
+        logger.debug('Saved session for {} to {}.'.format(key, self.path))
+
+    def clear(self, key: str):
+        entries = self._read()
+        if entries.pop(key, None) is not None:
+            self._write(entries)
@@ -0,0 +1,88 @@
+"""Single-flight coalescing of identical concurrent calls."""
+from threading import Event, Lock
+from typing import Awaitable, Callable
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = Event()
+        self.result = None
+        self.error = None  # type: BaseException
+
+
+class SingleFlight:
+    """Share one in-flight call, and its result or exception, among concurrent callers with the same key.
+
+    Only calls that overlap are coalesced; nothing is kept once the call completes (see ``ResponseCache``).
+    Sessions do not coalesce by default; enable it with ``session.single_flight = SingleFlight()``.
+    """
+    def __init__(self):
+        self.sent = 0
+        self.shared = 0
+        self._calls = {}
+        self._futures = {}
+        self._lock = Lock()
+
+    def __repr__(self):
+        return '{}(in_flight={}, sent={}, shared={})'.format(self.__class__.__name__, self.in_flight, self.sent,
+                                                             self.shared)
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._calls) + len(self._futures)
+
+    @property
+    def stats(self) -> dict:
+        return {'in_flight': self.in_flight, 'sent': self.sent, 'shared': self.shared}
+
+    def do(self, key: str, call: Callable[[], str]) -> str:
+        """Run call() unless an identical call is in flight, in which case wait for and return its result."""
+        with self._lock:
+            pending = self._calls.get(key)
+            leader = pending is None
+            if leader:
+                pending = self._calls[key] = _Call()
+                self.sent += 1
+            else:
+                self.shared += 1
+        if not leader:
+            pending.done.wait()
+            if pending.error is not None:
+                raise pending.error
+            return pending.result
+        try:
+            pending.result = call()
+        except BaseException as e:
+            pending.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            pending.done.set()
+        return pending.result
+
+    async def do_async(self, key: str, call: Callable[[], Awaitable[str]]) -> str:
+        """Async counterpart of do() for tasks on one event loop."""
+        import asyncio  # imported on first use to keep `import pylawson.client` fast
+        future = self._futures.get(key)
+        if future is not None:
+            self.shared += 1
+            return await asyncio.shield(future)
+        future = self._futures[key] = asyncio.get_running_loop().create_future()
+        self.sent += 1
+        try:
+            result = await call()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved, so an unshared failure is not reported twice
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._futures[key]
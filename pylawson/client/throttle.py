@@ -0,0 +1,211 @@
+"""Adaptive concurrency limiting and retry with jittered backoff for IOS calls.
+
+Assign ``Throttle()`` to ``session.throttle`` to bound in-flight calls: reads (Data, Drill, ListTokens, ...)
+and writes (Transaction) each get an AIMD limiter that grows while calls succeed within the latency target
+and halves on transient failures or slow responses.
+"""
+from collections import deque
+from logging import getLogger
+import random
+from threading import Event, Lock
+import time
+from typing import Callable, Optional
+from pylawson.exceptions import IosAuthenticationError, IosDataError
+
+logger = getLogger(__name__)
+
+WRITE_ENDPOINTS = frozenset(['Transaction'])
+
+
+def is_transient(error: BaseException) -> bool:
+    """Connection errors, timeouts and HTTP 5xx or 429 responses.
+
+    Infor data errors, bad credentials and other HTTP client errors (404, 400, ...) are not transient: sending
+    the call again would fail the same way, and they say nothing about server load.
+    """
+    if not isinstance(error, OSError) or isinstance(error, (IosDataError, IosAuthenticationError)):
+        return False
+    status = getattr(error, 'status', None)
+    return status is None or status >= 500 or status == 429
+
+
+class AdaptiveLimiter:
+    """Additive-increase/multiplicative-decrease concurrency limit shared by threads and asyncio tasks."""
+    def __init__(self, initial: int = 4, minimum: int = 1, maximum: int = 64, increase: float = 1.0,
+                 decrease: float = 0.5, latency_target: Optional[float] = None):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_target = latency_target
+        self.limit = float(initial)
+        self.in_flight = 0
+        self.successes = 0
+        self.failures = 0
+        self.decreases = 0
+        self._decreased_at = float('-inf')  # time.perf_counter() of the last decrease
+        self._waiters = deque()
+        self._lock = Lock()
+
+    def __repr__(self):
+        return '{}(limit={}, in_flight={}, queue_depth={})'.format(
+            self.__class__.__name__, int(self.limit), self.in_flight, len(self._waiters))
+
+    @property
+    def stats(self) -> dict:
+        return {'limit': int(self.limit), 'in_flight': self.in_flight, 'queue_depth': len(self._waiters),
+                'successes': self.successes, 'failures': self.failures, 'decreases': self.decreases}
+
+    def _capacity(self) -> int:
+        return max(int(self.limit), self.minimum)
+
+    def _try_acquire(self) -> bool:
+        if self.in_flight < self._capacity() and not self._waiters:
+            self.in_flight += 1
+            return True
+        return False
+
+    def acquire(self):
+        """Block until a slot is free."""
+        with self._lock:
+            if self._try_acquire():
+                return
+            event = Event()
+            self._waiters.append(event.set)
+        event.wait()
+
+    async def acquire_async(self):
+        """Wait on the running event loop until a slot is free."""
+        import asyncio  # imported on first use to keep `import pylawson.client` fast
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._try_acquire():
+                return
+            future = loop.create_future()
+            self._waiters.append(lambda: loop.call_soon_threadsafe(self._grant, future))
+        await future
+
+    def _grant(self, future):
+        if future.cancelled():
+            self.release()
+        else:
+            future.set_result(None)
+
+    def release(self, latency: Optional[float] = None, overloaded: bool = False, started: Optional[float] = None):
+        """Free a slot and adapt the limit: grow on a timely success, shrink when overloaded or slow.
+
+        The limit shrinks at most once per round trip: a call ``started`` (time.perf_counter()) before the
+        last decrease was sent under the old limit, so its slow or busy response is part of the same signal.
+        """
+        now = time.perf_counter()
+        if started is None and latency is not None:
+            started = now - latency
+        with self._lock:
+            self.in_flight -= 1
+            if overloaded or (self.latency_target and latency is not None and latency > self.latency_target):
+                self.failures += overloaded
+                if started is None or started >= self._decreased_at:
+                    self.limit = max(self.minimum, self.limit * self.decrease)
+                    self.decreases += 1
+                    self._decreased_at = now
+            elif latency is not None:
+                self.successes += 1
+                self.limit = min(self.maximum, self.limit + self.increase / self.limit)
+            wake = []
+            while self._waiters and self.in_flight < self._capacity():
+                self.in_flight += 1
+                wake.append(self._waiters.popleft())
+        for waiter in wake:
+            waiter()
+
+
+class Throttle:
+    """Separate read and write limiters plus retry of transient failures with full-jitter backoff.
+
+    Writes are not retried unless ``retry_writes`` is set, since a Transaction may have been applied even
+    though its response was lost.
+    """
+    def __init__(self, read: AdaptiveLimiter = None, write: AdaptiveLimiter = None, retries: int = 3,
+                 backoff: float = 0.25, max_backoff: float = 10.0, retry_writes: bool = False):
+        self.read = read or AdaptiveLimiter(initial=4, maximum=32)
+        self.write = write or AdaptiveLimiter(initial=2, maximum=8)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retry_writes = retry_writes
+        self.retried = 0
+
+    def __repr__(self):
+        return '{}(read={}, write={})'.format(self.__class__.__name__, self.read, self.write)
+
+    @property
+    def stats(self) -> dict:
+        return {'read': self.read.stats, 'write': self.write.stats, 'retried': self.retried}
+
+    def limiter(self, endpoint: str) -> AdaptiveLimiter:
+        return self.write if endpoint in WRITE_ENDPOINTS else self.read
+
+    def delay(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def _should_retry(self, endpoint: str, attempt: int, error: BaseException) -> bool:
+        if attempt >= self.retries or not is_transient(error):
+            return False
+        return self.retry_writes or endpoint not in WRITE_ENDPOINTS
+
+    def call(self, endpoint: str, send: Callable[[], str], on_retry: Callable[[], None] = None) -> str:
+        """Run send() within the endpoint's limiter, retrying transient failures."""
+        limiter = self.limiter(endpoint)
+        attempt = 0
+        while True:
+            limiter.acquire()
+            start = time.perf_counter()
+            try:
+                result = send()
+            except Exception as e:
+                limiter.release(overloaded=is_transient(e), started=start)
+                if not self._should_retry(endpoint, attempt, e):
+                    raise
+                error = e
+            except BaseException:
+                limiter.release(started=start)
+                raise
+            else:
+                limiter.release(latency=time.perf_counter() - start)
+                return result
+            delay = self.delay(attempt)
+            attempt += 1
+            self.retried += 1
+            logger.warning('{} call failed ({}); retry {} in {:.2f}s.'.format(endpoint, error, attempt, delay))
+            if on_retry is not None:
+                on_retry()
+            time.sleep(delay)
+
+    async def call_async(self, endpoint: str, send: Callable, on_retry: Callable[[], None] = None) -> str:
+        """Async counterpart of call(); send() returns an awaitable."""
+        limiter = self.limiter(endpoint)
+        attempt = 0
+        while True:
+            await limiter.acquire_async()
+            start = time.perf_counter()
+            try:
+                result = await send()
+            except Exception as e:
+                limiter.release(overloaded=is_transient(e), started=start)
+                if not self._should_retry(endpoint, attempt, e):
+                    raise
+                error = e
+            except BaseException:
+                limiter.release(started=start)
+                raise
+            else:
+                limiter.release(latency=time.perf_counter() - start)
+                return result
+            delay = self.delay(attempt)
+            attempt += 1
+            self.retried += 1
+            logger.warning('{} call failed ({}); retry {} in {:.2f}s.'.format(endpoint, error, attempt, delay))
+            if on_retry is not None:
+                on_retry()
+            import asyncio
+            await asyncio.sleep(delay)
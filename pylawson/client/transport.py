@@ -0,0 +1,313 @@
+"""Pluggable transports under IosSession: record live IOS traffic and replay it offline.
+
+Assign a transport to ``session.transport`` and every call the session sends goes through it, below the
+cache, single-flight, throttle and metrics layers. ``RecordingTransport`` sends calls to the server and
+appends each request and response to an archive; ``ReplayTransport`` (or a ``ReplaySession``, which needs no
+server at all) answers calls from an archive at the recorded response times, optionally accelerated::
+
+    session.transport = RecordingTransport('month-end.plrec')
+    ...  # run the job
+    session.transport.close()
+
+    with ReplaySession('month-end.plrec', speed=10) as replay:
+        records = list(JournalLine(replay, KEY='100').iter_records())
+
+The archive holds zlib-compressed response bodies followed by a JSON index of the exchanges (scrubbed
+request parameters, start offset, response time, body location) and a fixed-size trailer, like the columnar
+export. Parameters whose names look like credentials are replaced by ``SCRUBBED`` before anything is written.
+"""
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+import json
+from logging import getLogger
+import mmap
+import re
+import struct
+from threading import BoundedSemaphore, Lock
+import time
+from typing import Callable, Dict, Iterator, List
+import zlib
+from pylawson.exceptions import IosDataError
+from pylawson.parser import Xml
+from .base_session import IosSession, endpoint_name
+from .response_cache import ResponseCache
+from .throttle import WRITE_ENDPOINTS
+
+logger = getLogger(__name__)
+
+MAGIC = b'PLREC1\x00\x00'
+_TRAILER = struct.Struct('<Q8s')  # index length, magic
+SCRUBBED = '***'
+# Parameter names treated as credentials; their values never reach the archive.
+SENSITIVE = re.compile(r'pass|pwd|secret|token|auth|cookie|session|user', re.I)
+PRODUCTLINE_KEYS = ('PROD', '_PDL', 'productLine', 'dataArea')
+# Session method sending each endpoint's calls, used when replaying an archive's load.
+METHODS = {'ListTokens': 'tokens', 'ListAttachments': 'attachments', 'Data': 'data', 'Drill': 'drill',
+           'Transaction': 'transaction', 'What': 'what'}
+
+
+def scrub(params: dict) -> dict:
+    """Parameters with the values of credential-like names replaced by SCRUBBED."""
+    return {key: SCRUBBED if SENSITIVE.search(str(key)) else value for key, value in params.items()}
+
+
+def exchange_key(url: str, call_data: dict) -> str:
+    """Archive lookup key of a call: its URL path and sorted, scrubbed parameters."""
+    return ResponseCache.key(url.split('?', 1)[0], scrub(call_data))
+
+
+class Transport:
+    """Sends a session's calls; the base class passes them straight to the session's own HTTP client."""
+    def send(self, url: str, call_data: dict, transmit: Callable[[], Xml]) -> Xml:
+        return transmit()
+
+    async def send_async(self, url: str, call_data: dict, transmit: Callable) -> Xml:
+        return await transmit()
+
+    def close(self):
+        pass
+
+
+class RecordingTransport(Transport):
+    """Send calls to the server and append each exchange to an archive; ``close()`` writes its index.
+
+    Failed calls are not recorded. An archive whose recording was not closed has no index and cannot be read.
+    """
+    def __init__(self, path: str, level: int = 6):
+        self.path = path
+        self.level = level
+        self.exchanges = []  # type: List[dict]
+        self.productline = None
+        self._lock = Lock()
+        self._started = time.perf_counter()
+        self._fp = open(path, 'wb')
+        self._fp.write(MAGIC)
+
+    def __repr__(self):
+        return '{}({}, exchanges={})'.format(self.__class__.__name__, self.path, len(self.exchanges))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def record(self, url: str, call_data: dict, body: Xml, start: float, elapsed: float):
+        """Append one exchange; ``start`` is a time.perf_counter() value."""
+        text = isinstance(body, str)
+        data = zlib.compress(body.encode('utf-8') if text else body, self.level)
+        params = scrub(call_data)
+        with self._lock:
+            if self._fp.closed:
+                return
+            if self.productline is None:
+                self.productline = next((params[key] for key in PRODUCTLINE_KEYS if key in params), None)
+            offset = self._fp.tell()
+            self._fp.write(data)
+            self.exchanges.append({'url': url.split('?', 1)[0], 'params': params, 'start': start - self._started,
+                                   'elapsed': elapsed, 'offset': offset, 'size': len(data), 'text': text})
+
+    def send(self, url: str, call_data: dict, transmit: Callable[[], Xml]) -> Xml:
+        start = time.perf_counter()
+        body = transmit()
+        self.record(url, call_data, body, start, time.perf_counter() - start)
+        return body
+
+    async def send_async(self, url: str, call_data: dict, transmit: Callable) -> Xml:
+        start = time.perf_counter()
+        body = await transmit()
+        self.record(url, call_data, body, start, time.perf_counter() - start)
+        return body
+
+    def close(self):
+        with self._lock:
+            if self._fp.closed:
+                return
+            index = json.dumps({'productline': self.productline, 'exchanges': self.exchanges}).encode('utf-8')
+            self._fp.write(index)
+            self._fp.write(_TRAILER.pack(len(index), MAGIC))
+            self._fp.close()
+        logger.info('Recorded {} exchanges to {}.'.format(len(self.exchanges), self.path))
+
+
+class Archive:
+    """Memory-mapped reader for archives written by ``RecordingTransport``."""
+    def __init__(self, path: str):
+        self.path = path
+        self._map = None
+        self._fp = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._fp.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._fp.close()
+            raise ValueError('{} is not a recorded archive.'.format(path)) from None
+        size = len(self._map)
+        if size < len(MAGIC) + _TRAILER.size or self._map[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError('{} is not a recorded archive.'.format(path))
+        index_size, magic = _TRAILER.unpack_from(self._map, size - _TRAILER.size)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError('{} is incomplete (recording was not closed).'.format(path))
+        start = size - _TRAILER.size - index_size
+        index = json.loads(self._map[start:start + index_size].decode('utf-8'))
+        self.productline = index['productline']
+        self.exchanges = index['exchanges']  # type: List[dict]
+        self._keys = defaultdict(list)  # type: Dict[str, List[int]]
+        for position, exchange in enumerate(self.exchanges):
+            self._keys[exchange_key(exchange['url'], exchange['params'])].append(position)
+
+    def __repr__(self):
+        return '{}({}, exchanges={})'.format(self.__class__.__name__, self.path, len(self))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return len(self.exchanges)
+
+    def __iter__(self) -> Iterator[dict]:
+        return iter(self.exchanges)
+
+    @property
+    def duration(self) -> float:
+        """Seconds from the first call's start to the last call's response."""
+        return max((exchange['start'] + exchange['elapsed'] for exchange in self.exchanges), default=0.0)
+
+    def positions(self, key: str) -> List[int]:
+        """Positions of the exchanges recorded for a call key, in recorded order."""
+        return self._keys.get(key, [])
+
+    def body(self, position: int) -> Xml:
+        """The response body of an exchange, as str or bytes as it was recorded."""
+        exchange = self.exchanges[position]
+        data = zlib.decompress(self._map[exchange['offset']:exchange['offset'] + exchange['size']])
+        return data.decode('utf-8') if exchange['text'] else data
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._fp.close()
+
+
+class ReplayTransport(Transport):
+    """Answer calls from an archive instead of the server.
+
+    Each response is delayed by its recorded response time divided by ``speed`` (0 for no delay), with at most
+    ``max_concurrency`` threads replaying at once, to stand in for the server's capacity. Calls recorded
+    several times are answered with their recordings in turn. A call that was never recorded raises
+    IosDataError.
+    """
+    def __init__(self, archive: Archive, speed: float = 1.0, max_concurrency: int = None):
+        self.archive = archive
+        self.speed = speed
+        self.max_concurrency = max_concurrency
+        self.replayed = 0
+        self._turns = defaultdict(int)  # type: Dict[str, int]
+        self._lock = Lock()
+        self._slots = BoundedSemaphore(max_concurrency) if max_concurrency else None
+
+    def __repr__(self):
+        return '{}({}, speed={}, max_concurrency={})'.format(self.__class__.__name__, self.archive.path,
+                                                             self.speed, self.max_concurrency)
+
+    def _lookup(self, url: str, call_data: dict) -> tuple:
+        key = exchange_key(url, call_data)
+        positions = self.archive.positions(key)
+        if not positions:
+            msg = 'No recorded response for {}.'.format(key)
+            logger.error(msg=msg)
+            raise IosDataError(msg)
+        with self._lock:
+            position = positions[self._turns[key] % len(positions)]
+            self._turns[key] += 1
+            self.replayed += 1
+        delay = self.archive.exchanges[position]['elapsed'] / self.speed if self.speed else 0
+        return position, delay
+
+    def send(self, url: str, call_data: dict, transmit: Callable[[], Xml] = None) -> Xml:
+        position, delay = self._lookup(url, call_data)
+        if self._slots is None:
+            time.sleep(delay)
+            return self.archive.body(position)
+        with self._slots:
+            time.sleep(delay)
+            return self.archive.body(position)
+
+    async def send_async(self, url: str, call_data: dict, transmit: Callable = None) -> Xml:
+        """Replay for asyncio sessions; max_concurrency does not apply (use session.throttle to limit)."""
+        import asyncio
+        position, delay = self._lookup(url, call_data)
+        await asyncio.sleep(delay)
+        return self.archive.body(position)
+
+    def close(self):
+        self.archive.close()
+
+
+class ReplaySession(IosSession):
+    """Session answering every call from a recorded archive; no server or login is needed."""
+    def __init__(self, path: str, speed: float = 1.0, max_concurrency: int = None):
+        super().__init__()
+        self.transport = ReplayTransport(Archive(path), speed=speed, max_concurrency=max_concurrency)
+        self._profile.productline = self.transport.archive.productline
+
+    def __repr__(self):
+        return '{}({})'.format(self.__class__.__name__, self.transport.archive.path)
+
+    def __bool__(self):
+        return True
+
+    def _transmit(self, url: str, call_data: dict) -> Xml:
+        msg = 'ReplaySession cannot reach a server ({}).'.format(url)
+        logger.error(msg=msg)
+        raise IosDataError(msg)
+
+    def close(self):
+        self.transport.close()
+        logger.info(msg='Closed replay session.')
+
+
+def replay_load(archive: Archive, session: IosSession, workers: int = 8, speed: float = 1.0,
+                writes: bool = False, handler: Callable[[dict, Xml], None] = None) -> dict:
+    """Re-issue an archive's calls through ``session`` from ``workers`` threads at their recorded start times.
+
+    Start offsets are divided by ``speed`` (0 sends every call at once, as fast as the workers allow). The
+    session may be a ``ReplaySession``, to load-test parsing and client-side layers offline, or a live one;
+    transactions are skipped unless ``writes`` is True. ``handler(exchange, response)``, if given, runs on
+    each response in its worker thread, e.g. to parse it. Returns call, error and throughput counts.
+    """
+    exchanges = []
+    for exchange in archive:
+        endpoint = endpoint_name(exchange['url'])
+        if endpoint in METHODS and (writes or endpoint not in WRITE_ENDPOINTS):
+            exchanges.append(exchange)
+    exchanges.sort(key=lambda exchange: exchange['start'])
+    session.set_pool_size(workers)
+    started = time.perf_counter()
+    errors = []
+
+    def issue(exchange: dict):
+        if speed:
+            wait = started + exchange['start'] / speed - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+        try:
+            response = getattr(session, METHODS[endpoint_name(exchange['url'])])(data=exchange['params'])
+            if handler is not None:
+                handler(exchange, response)
+        except Exception as e:
+            errors.append(e)
+            logger.warning('Replayed call to {} failed: {}'.format(exchange['url'], e))
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for _ in executor.map(issue, exchanges):
+            pass
+    seconds = time.perf_counter() - started
+    logger.info('Replayed {} calls in {:.3f}s ({} errors).'.format(len(exchanges), seconds, len(errors)))
+    return {'calls': len(exchanges), 'errors': len(errors), 'seconds': seconds,
+            'calls_per_second': len(exchanges) / seconds if seconds else 0.0, 'recorded_seconds': archive.duration}
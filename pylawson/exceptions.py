@@ -7,8 +7,26 @@ class IosAuthenticationError(IosError, ConnectionRefusedError):
 
 
 class IosConnectionError(IosError, ConnectionError):
-    """Exception occurred during IOS connection process."""
+    """Exception occurred during IOS connection process; ``status`` is the HTTP status if the server answered."""
+    def __init__(self, *args, status: int = None):
+        super().__init__(*args)
+        self.status = status
 
 
 class IosDataError(IosError, ValueError):
     """Received an error response from the IOS server."""
+
+
+class IosValidationError(IosDataError):
+    """Transaction failed local pre-flight validation and was not sent."""
+
+
+class IosDrillError(IosDataError):
+    """Some requests of a drill_many batch failed; the others were still resolved.
+
+    ``results`` holds the resolved requests (drill key -> lines) and ``errors`` the exception of each failed one.
+    """
+    def __init__(self, msg: str, results: dict = None, errors: dict = None):
+        super().__init__(msg)
+        self.results = results if results is not None else {}
+        self.errors = errors if errors is not None else {}
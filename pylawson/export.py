@@ -0,0 +1,282 @@
+"""Streaming export of Data servlet query results to CSV, JSON Lines or a binary columnar file.
+
+Pages are written as they are parsed, so only one page is held in memory however large the extract. CSV and
+JSON Lines are compressed with gzip, bz2 or xz when asked to or when the path ends in ``.gz``, ``.bz2`` or
+``.xz``. The columnar format stores each page column-wise (int64/float64 numbers, UTF-8 strings) followed
+by a JSON footer, and ``ColumnarReader`` memory-maps it::
+
+    with ColumnarReader('gltrans.plc') as reader:
+        amounts = reader.column('TRAN-AMOUNT')
+"""
+from array import array
+import bz2
+import csv
+import gzip
+import io
+import json
+from logging import getLogger
+import lzma
+import mmap
+import struct
+import sys
+from typing import Dict, Iterator, List, Optional
+from .pylawson import LawsonBase
+from .records import ColumnBatch, numpy
+
+logger = getLogger(__name__)
+
+COMPRESSION = {'gzip': gzip.open, 'bz2': bz2.open, 'xz': lzma.open}
+_EXTENSIONS = {'.gz': 'gzip', '.bz2': 'bz2', '.xz': 'xz'}
+
+MAGIC = b'PLCOL1\x00\x00'
+_TRAILER = struct.Struct('<Q8s')  # footer length, magic
+_TYPES = {'q': 'int64', 'd': 'float64'}
+_CODES = {name: code for code, name in _TYPES.items()}
+
+
+def _open_text(path: str, compression: Optional[str]):
+    if compression is None:
+        compression = next((name for ext, name in _EXTENSIONS.items() if path.endswith(ext)), None)
+    if compression is None:
+        return open(path, 'w', newline='', encoding='utf-8')
+    try:
+        opener = COMPRESSION[compression]
+    except KeyError:
+        raise ValueError('Unknown compression: {}.'.format(compression)) from None
+    return opener(path, 'wt', newline='', encoding='utf-8')
+
+
+def export_csv(query: LawsonBase, path: str, page_size: int = 10000, compression: str = None, **fmtparams) -> int:
+    """Write the query's records to a CSV file with a header row; return the number of records."""
+    rows = 0
+    with _open_text(path, compression) as fp:
+        writer = csv.writer(fp, **fmtparams)
+        header = False
+        for page in query.iter_pages(page_size=page_size):
+            for values in page:
+                if not header:
+                    writer.writerow(page.columns)
+                    header = True
+                writer.writerow(values)
+            rows += page.count
+            if not header and page.columns:
+                writer.writerow(page.columns)
+                header = True
+    logger.info('Exported {} records to {}.'.format(rows, path))
+    return rows
+
+
+def export_jsonl(query: LawsonBase, path: str, page_size: int = 10000, compression: str = None) -> int:
+    """Write the query's records to a JSON Lines file, one object per record; return the number of records."""
+    rows = 0
+    with _open_text(path, compression) as fp:
+        for page in query.iter_pages(page_size=page_size):
+            columns = page.columns
+            for values in page:
+                fp.write(json.dumps(dict(zip(columns, values)), ensure_ascii=False))
+                fp.write('\n')
+            rows += page.count
+    logger.info('Exported {} records to {}.'.format(rows, path))
+    return rows
+
+
+class ColumnarWriter:
+    """Append ``ColumnBatch`` pages to a columnar file; the footer is written by ``close()``."""
+    def __init__(self, path: str):
+        self.path = path
+        self.file = None
+        self.columns = None  # type: Optional[List[dict]]
+        self.chunks = []
+        self.rows = 0
+        self._fp = open(path, 'wb')
+        self._fp.write(MAGIC)
+
+    def __repr__(self):
+        return '{}({}, rows={})'.format(self.__class__.__name__, self.path, self.rows)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *args):
+        if exc_type is None:
+            self.close()
+        else:
+            self._fp.close()  # leave the file without a footer, so readers reject it as incomplete
+
+    def _write_buffer(self, data: bytes) -> list:
+        offset = self._fp.tell()
+        self._fp.write(data)
+        self._fp.write(b'\x00' * (-len(data) % 8))  # keep every buffer 8-byte aligned
+        return [offset, len(data)]
+
+    def _write_numeric(self, data: array) -> list:
+        if sys.byteorder != 'little':
+            data = array(data.typecode, data)
+            data.byteswap()
+        return [self._write_buffer(data.tobytes())]
+
+    def _write_strings(self, values: List[str]) -> list:
+        offsets = array('q', [0])
+        blob = io.BytesIO()
+        for value in values:
+            blob.write(value.encode('utf-8'))
+            offsets.append(blob.tell())
+        return self._write_numeric(offsets) + [self._write_buffer(blob.getvalue())]
+
+    def write(self, batch: ColumnBatch):
+        if self.columns is None:
+            self.file = batch.file
+            self.columns = []
+            for name in batch.names:
+                data = batch.array(name)
+                self.columns.append({'name': name, 'type': _TYPES.get(getattr(data, 'typecode', None), 'utf8')})
+        elif tuple(column['name'] for column in self.columns) != batch.names:
+            raise ValueError('Cannot write batches with different columns to one file.')
+        buffers = []
+        for column in self.columns:
+            data = batch.array(column['name'])
+            buffers.append(self._write_strings(data) if column['type'] == 'utf8' else self._write_numeric(data))
+        self.chunks.append({'rows': len(batch), 'buffers': buffers})
+        self.rows += len(batch)
+
+    def close(self):
+        if self._fp.closed:
+            return
+        footer = json.dumps({'file': self.file, 'columns': self.columns or [], 'chunks': self.chunks}).encode('utf-8')
+        self._fp.write(footer)
+        self._fp.write(_TRAILER.pack(len(footer), MAGIC))
+        self._fp.close()
+
+
+def export_columnar(query: LawsonBase, path: str, page_size: int = 10000) -> int:
+    """Write the query's records to a binary columnar file; return the number of records."""
+    with ColumnarWriter(path) as writer:
+        for batch in query.iter_batches(page_size=page_size):
+            writer.write(batch)
+    logger.info('Exported {} records to {}.'.format(writer.rows, path))
+    return writer.rows
+
+
+class ColumnarReader:
+    """Memory-mapped reader for files written by ``ColumnarWriter``/``export_columnar``.
+
+    Numeric columns are returned without copying, as NumPy arrays when NumPy is installed or ``memoryview``
+    objects otherwise; string columns are decoded on access.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._map = None
+        self._view = None
+        self._fp = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._fp.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._fp.close()
+            raise ValueError('{} is not a columnar export.'.format(path)) from None
+        size = len(self._map)
+        if size < len(MAGIC) + _TRAILER.size or self._map[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError('{} is not a columnar export.'.format(path))
+        footer_size, magic = _TRAILER.unpack_from(self._map, size - _TRAILER.size)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError('{} is incomplete (no footer).'.format(path))
+        start = size - _TRAILER.size - footer_size
+        footer = json.loads(self._map[start:start + footer_size].decode('utf-8'))
+        self.file = footer['file']
+        self._columns = footer['columns']
+        self._chunks = footer['chunks']
+        self._view = memoryview(self._map)
+
+    def __repr__(self):
+        return '{}({}, rows={})'.format(self.__class__.__name__, self.path, len(self))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return sum(chunk['rows'] for chunk in self._chunks)
+
+    @property
+    def columns(self) -> List[str]:
+        return [column['name'] for column in self._columns]
+
+    @property
+    def types(self) -> Dict[str, str]:
+        return {column['name']: column['type'] for column in self._columns}
+
+    @property
+    def chunks(self) -> int:
+        return len(self._chunks)
+
+    def close(self):
+        if self._view is not None:
+            self._view.release()
+            self._view = None
+        if self._map is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                # Columns returned by the reader still use the map; it is unmapped once they are released.
+                pass
+            self._map = None
+        self._fp.close()
+
+    def _numeric(self, buffer: list, code: str):
+        offset, length = buffer
+        view = self._view[offset:offset + length]
+        np = numpy()
+        if np is not None:
+            return np.frombuffer(view, dtype='<i8' if code == 'q' else '<f8')
+        if sys.byteorder != 'little':
+            data = array(code, view.tobytes())
+            data.byteswap()
+            return data
+        return view.cast(code)
+
+    def _strings(self, buffers: list) -> List[str]:
+        offsets = self._numeric(buffers[0], 'q')
+        offset, length = buffers[1]
+        blob = self._view[offset:offset + length]
+        return [bytes(blob[offsets[i]:offsets[i + 1]]).decode('utf-8') for i in range(len(offsets) - 1)]
+
+    def _chunk_column(self, chunk: dict, index: int):
+        column = self._columns[index]
+        buffers = chunk['buffers'][index]
+        if column['type'] == 'utf8':
+            return self._strings(buffers)
+        return self._numeric(buffers[0], _CODES[column['type']])
+
+    def chunk(self, index: int) -> Dict[str, object]:
+        """Column name -> values of one chunk (one Data page)."""
+        chunk = self._chunks[index]
+        return {column['name']: self._chunk_column(chunk, i) for i, column in enumerate(self._columns)}
+
+    def iter_column(self, name: str) -> Iterator:
+        """Yield a column's values chunk by chunk, without materializing the whole column."""
+        index = self.columns.index(name)
+        for chunk in self._chunks:
+            yield self._chunk_column(chunk, index)
+
+    def column(self, name: str):
+        """A whole column: a NumPy array (or array.array) for numeric columns, else a list of str."""
+        parts = list(self.iter_column(name))
+        kind = self.types[name]
+        if kind == 'utf8':
+            return [value for part in parts for value in part]
+        np = numpy()
+        if np is not None:
+            return np.concatenate(parts) if parts else np.empty(0, dtype='<i8' if kind == 'int64' else '<f8')
+        result = array(_CODES[kind])
+        for part in parts:
+            result.extend(part)
+        return result
+
+    def rows(self) -> Iterator[tuple]:
+        """Yield each record as a tuple, chunk by chunk."""
+        for index in range(len(self._chunks)):
+            chunk = self.chunk(index)
+            yield from zip(*(chunk[name] for name in self.columns))
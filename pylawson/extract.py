@@ -0,0 +1,69 @@
+"""Parallel, key-range-partitioned extraction of Data servlet files."""
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import product
+from logging import getLogger
+from typing import Iterable, Iterator, List, Type
+from .client import IosSession as Session
+from .pylawson import JournalLine, LawsonBase
+from .query import partition_query
+
+logger = getLogger(__name__)
+
+
+def partitions(**keys: Iterable) -> List[dict]:
+    """Return disjoint key partitions as the product of the given key values, in key order.
+
+    Keyword names are Lawson key fields with '_' for '-', e.g.
+    ``partitions(COMPANY=[100, 200], FISCAL_YEAR=[2024], ACCT_PERIOD=range(1, 13))``.
+    """
+    names = [name.replace('_', '-') for name in keys]
+    return [dict(zip(names, (str(value) for value in values))) for values in product(*keys.values())]
+
+
+class ParallelExtractor:
+    """Run one query per key partition concurrently over a shared session, yielding results in partition order.
+
+    Each partition is a dict of field -> value; fields on the leading keys of the file's index go in KEY and
+    any others in SELECT (see ``pylawson.query.partition_query``).
+
+    At most ``max_workers`` partitions are in flight or buffered at a time, so memory is bounded by the
+    size of that many partitions rather than the whole extract.
+    """
+    def __init__(self, session: Session, cls: Type[LawsonBase] = JournalLine, max_workers: int = 4,
+                 page_size: int = 10000, **params):
+        self.session = session
+        self.cls = cls
+        self.max_workers = max_workers
+        self.page_size = page_size
+        self.params = params
+        self.session.set_pool_size(max_workers)
+
+    def __repr__(self):
+        return '{}({}, max_workers={})'.format(self.__class__.__name__, self.cls.__name__, self.max_workers)
+
+    def _extract(self, partition: dict, typed: bool) -> list:
+        query = partition_query(self.cls(self.session, **self.params), partition)
+        records = list(query.iter_records(page_size=self.page_size, typed=typed))
+        logger.debug('Extracted {} records for partition {}.'.format(len(records), partition))
+        return records
+
+    def iter_records(self, key_partitions: Iterable[dict], typed: bool = False) -> Iterator:
+        """Yield the records of every partition, partitions in the order given."""
+        pending = iter(key_partitions)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = deque()
+            for partition in pending:
+                futures.append(executor.submit(self._extract, partition, typed))
+                if len(futures) >= self.max_workers:
+                    break
+            try:
+                while futures:
+                    records = futures.popleft().result()
+                    partition = next(pending, None)
+                    if partition is not None:
+                        futures.append(executor.submit(self._extract, partition, typed))
+                    yield from records
+            finally:
+                for future in futures:
+                    future.cancel()
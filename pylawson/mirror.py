@@ -0,0 +1,194 @@
+"""Local mirror of Lawson master data (accounts and activities) for fast existence and description lookups.
+
+``MasterIndex`` bulk-loads one Data servlet file into an in-memory hash index keyed on its key columns and
+picks up new records incrementally on a watermark column. Pass ``path`` to back it with a SQLite store (through
+``pylawson.sync.IncrementalSync``) so later processes start from the local copy and only fetch the delta.
+"""
+from contextlib import closing
+from logging import getLogger
+from threading import Lock, RLock
+from typing import Dict, Iterable, Iterator, Optional, Sequence, Type
+from .client import IosSession as Session
+from .pylawson import Account, Activity, LawsonBase
+from .sync import IncrementalSync, _quote
+
+logger = getLogger(__name__)
+
+ACCOUNT_KEY = ('COMPANY', 'ACCT-UNIT', 'ACCOUNT', 'SUB-ACCOUNT')
+ACTIVITY_KEY = ('ACTIVITY',)
+
+
+def _normalize(values: Iterable) -> tuple:
+    """Index key for lookup values, so 100, '100' and ' 100 ' all match."""
+    return tuple(str(value).strip() for value in values)
+
+
+class MasterIndex:
+    """In-memory hash index of one master file: key tuple -> record dict.
+
+    ``refresh()`` fetches records at or above the last ``watermark`` value (or everything when watermark is
+    None) and upserts them into the index. The default watermark, OBJ-ID, only grows when a record is added,
+    so changes to existing records (descriptions, status) and deletions are only picked up by ``reload()``,
+    unless ``watermark`` names a column the site updates on every change.
+
+    Lookups and refreshes may come from several threads: the first lookup loads the index once, under a lock.
+    """
+    def __init__(self, session: Session, cls: Type[LawsonBase], key: Sequence[str], description: str = 'DESCRIPTION',
+                 watermark: Optional[str] = 'OBJ-ID', path: str = None, page_size: int = 10000, **params):
+        self.session = session
+        self.cls = cls
+        self.file = cls.data_params['FILE']
+        self.key = tuple(key)
+        self.description_column = description
+        self.watermark = watermark
+        self.path = path
+        self.page_size = page_size
+        self.params = params
+        self.high = None
+        self.loaded = False
+        self._records = {}  # type: Dict[tuple, dict]
+        self._lock = Lock()
+        self._refresh_lock = RLock()
+        self._sync = None
+        if path:
+            self._sync = IncrementalSync(session, path, cls=cls, watermark=watermark or self.key[0],
+                                         primary_key=self.key, indexes=(), page_size=page_size, **params)
+
+    def __repr__(self):
+        return '{}({}, records={})'.format(self.__class__.__name__, self.file, len(self))
+
+    def __len__(self):
+        return len(self._records)
+
+    def __contains__(self, key) -> bool:
+        return self.exists(*(key if isinstance(key, tuple) else (key,)))
+
+    def __iter__(self) -> Iterator[dict]:
+        return iter(list(self._records.values()))
+
+    def close(self):
+        if self._sync is not None:
+            with self._refresh_lock:
+                self._sync.close()
+
+    def _ensure_loaded(self):
+        if not self.loaded:
+            with self._refresh_lock:
+                if not self.loaded:
+                    self.refresh()
+
+    def get(self, *key) -> Optional[dict]:
+        """Record dict for the key values (in ``key`` column order), or None if it does not exist."""
+        self._ensure_loaded()
+        return self._records.get(_normalize(key))
+
+    def exists(self, *key) -> bool:
+        return self.get(*key) is not None
+
+    def description(self, *key) -> Optional[str]:
+        record = self.get(*key)
+        return None if record is None else record.get(self.description_column)
+
+    def _fetch(self, since: Optional[str]) -> Iterator[dict]:
+        params = dict(self.params)
+        if since is not None and self.watermark:
+            condition = '{}>={}'.format(self.watermark, since)
+            params['SELECT'] = '{}&{}'.format(params['SELECT'], condition) if params.get('SELECT') else condition
+        for record in self.cls(self.session, **params).iter_records(page_size=self.page_size, typed=True):
+            yield record.as_dict()
+
+    def _stored(self, since: Optional[str]) -> Iterator[dict]:
+        """Records in the SQLite store, optionally only those at or above a watermark."""
+        if not self._sync._columns:
+            return
+        sql = 'SELECT * FROM {}'.format(_quote(self._sync.table))
+        args = ()
+        if since is not None and self.watermark:
+            sql += ' WHERE {} >= ?'.format(_quote(self.watermark))
+            args = (since,)
+        with closing(self._sync.connection.execute(sql, args)) as cursor:
+            columns = [column[0] for column in cursor.description]
+            for row in cursor:
+                yield dict(zip(columns, row))
+
+    def _upsert(self, records: Iterable[dict]) -> int:
+        count = 0
+        with self._lock:
+            for record in records:
+                self._records[_normalize(record.get(column) for column in self.key)] = record
+                value = record.get(self.watermark) if self.watermark else None
+                if value is not None and (self.high is None or value > self.high):
+                    self.high = value
+                count += 1
+        return count
+
+    def refresh(self) -> int:
+        """Fetch records at or above the watermark since the last refresh into the index; return how many."""
+        with self._refresh_lock:
+            if self._sync is not None:
+                with self._sync.lock:
+                    previous = self._sync.watermarks().get('') if self.loaded else None
+                    self._sync.sync_partition(full=not self.watermark)
+                    count = self._upsert(self._stored(previous))
+            else:
+                count = self._upsert(self._fetch(self.high if self.loaded else None))
+            self.loaded = True
+        logger.debug('Refreshed {}: {} records applied, {} indexed.'.format(self.file, count, len(self)))
+        return count
+
+    def reload(self) -> int:
+        """Drop the index (and the SQLite copy) and load the file again from scratch."""
+        with self._refresh_lock:
+            with self._lock:
+                self._records = {}
+                self.high = None
+                self.loaded = False
+            if self._sync is not None:
+                self._sync.reset()
+            return self.refresh()
+
+
+class MasterDataMirror:
+    """Account (GLMASTER) and activity (ACACTIVITY) indexes behind one object.
+
+    Both are loaded lazily on first lookup; call ``refresh()`` periodically to pick up new records and
+    ``reload()`` to apply changes to existing ones.
+    """
+    def __init__(self, session: Session, path: str = None, account_params: dict = None,
+                 activity_params: dict = None, page_size: int = 10000):
+        self.accounts = MasterIndex(session, Account, ACCOUNT_KEY, path=path, page_size=page_size,
+                                    **(account_params or {}))
+        self.activities = MasterIndex(session, Activity, ACTIVITY_KEY, path=path, page_size=page_size,
+                                      **(activity_params or {}))
+
+    def __repr__(self):
+        return '{}(accounts={}, activities={})'.format(self.__class__.__name__, len(self.accounts),
+                                                       len(self.activities))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self.accounts.close()
+        self.activities.close()
+
+    def refresh(self) -> Dict[str, int]:
+        return {'accounts': self.accounts.refresh(), 'activities': self.activities.refresh()}
+
+    def reload(self) -> Dict[str, int]:
+        return {'accounts': self.accounts.reload(), 'activities': self.activities.reload()}
+
+    def account_exists(self, company, acct_unit, account, sub_account=0) -> bool:
+        return self.accounts.exists(company, acct_unit, account, sub_account)
+
+    def account_description(self, company, acct_unit, account, sub_account=0) -> Optional[str]:
+        return self.accounts.description(company, acct_unit, account, sub_account)
+
+    def activity_exists(self, activity) -> bool:
+        return self.activities.exists(activity)
+
+    def activity_description(self, activity) -> Optional[str]:
+        return self.activities.description(activity)
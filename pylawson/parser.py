@@ -0,0 +1,277 @@
+"""Parser engines for IOS XML responses.
+
+``EventParser`` streams the raw response through an incremental (expat) parser and keeps only the
+element being read; ``SoupParser`` is the original BeautifulSoup ``html.parser`` path, which is also
+used as the fallback whenever a response is not well-formed XML.
+"""
+from logging import getLogger
+import re
+import time
+from typing import Iterator, List, Optional, Union
+from xml.etree.ElementTree import ParseError, XMLPullParser
+from .exceptions import IosDataError
+
+logger = getLogger(__name__)
+
+Xml = Union[str, bytes]
+
+# Prolog before the root element: BOM, whitespace, XML declaration, comments and DOCTYPE.
+_PROLOG = re.compile(rb'(?:\xef\xbb\xbf)?(?:\s+|<\?.*?\?>|<!--.*?-->|<!DOCTYPE[^>]*>)*', re.S)
+_ROOT = re.compile(rb'<([A-Za-z_][\w.-]*)')
+_SNIFF_SIZE = 1024
+
+
+def sniff_root(xml: Xml) -> Optional[str]:
+    """Upper-cased name of a response's root element, judged from its first bytes without parsing it."""
+    head = xml[:_SNIFF_SIZE]
+    if isinstance(head, str):
+        head = head.encode('utf-8', errors='replace')
+    match = _ROOT.match(head, _PROLOG.match(head).end())
+    return match.group(1).decode('ascii', errors='replace').upper() if match else None
+
+
+def sniff_error(xml: Xml) -> bool:
+    """True if the root element of a response is ERROR, judged from its first bytes without parsing it."""
+    return sniff_root(xml) == 'ERROR'
+
+
+class DataPage:
+    """One page of a Data servlet response.
+
+    Iterate to get each record as a list of column values; ``columns`` is populated before the first
+    record is yielded and ``next_call`` once iteration is complete. Set ``timed`` before iterating to
+    accumulate the time spent parsing (excluding the consumer) in ``parse_seconds``.
+    """
+    def __init__(self, records: Iterator[List[str]]):
+        self.columns = []  # type: List[str]
+        self.next_call = None  # type: Optional[str]
+        self.count = 0
+        self.timed = False
+        self.parse_seconds = 0.0
+        self._records = records
+
+    def __repr__(self):
+        return '{}(columns={}, count={})'.format(self.__class__.__name__, len(self.columns), self.count)
+
+    def __iter__(self):
+        if self.timed:
+            yield from self._timed()
+            return
+        for values in self._records:
+            self.count += 1
+            yield values
+
+    def _timed(self):
+        records = iter(self._records)
+        while True:
+            start = time.perf_counter()
+            values = next(records, None)
+            self.parse_seconds += time.perf_counter() - start
+            if values is None:
+                return
+            self.count += 1
+            yield values
+
+
+class Parser:
+    """Base class for a response parser engine."""
+    name = None
+
+    def __repr__(self):
+        return self.__class__.__name__
+
+    def error(self, xml: Xml) -> Optional[tuple]:
+        """Return (key, message) if the response root element is ERROR, else None (see ``sniff_error``)."""
+        raise NotImplementedError
+
+    def data_page(self, xml: Xml) -> DataPage:
+        """Return a DataPage over the records of a Data servlet response."""
+        raise NotImplementedError
+
+    def drill_lines(self, xml: Xml) -> List[List[str]]:
+        """Return the COL values of each LINE of a Drill (IDA) response."""
+        raise NotImplementedError
+
+    def fields(self, xml: Xml, *names: str) -> dict:
+        """Return the text of the first element with each of the given (case-insensitive) tag names."""
+        raise NotImplementedError
+
+    def attributes(self, xml: Xml) -> dict:
+        """Return profile ``attr`` elements as a dict of lowercase name to value."""
+        raise NotImplementedError
+
+
+class SoupParser(Parser):
+    """BeautifulSoup html.parser engine; builds the full tree (tag names are lowercased)."""
+    name = 'soup'
+
+    @staticmethod
+    def soup(xml: Xml):
+        # noinspection PyPackageRequirements
+        from bs4 import BeautifulSoup  # imported on first use to keep `import pylawson` fast
+        return BeautifulSoup(xml, 'html.parser')
+
+    def error(self, xml: Xml) -> Optional[tuple]:
+        if not sniff_error(xml):
+            return None
+        root = self.soup(xml).find(True)
+        if root is None or root.name != 'error':
+            return None
+        msg = root.find('msg')
+        return root.attrs.get('key'), msg.get_text() if msg is not None else ''
+
+    def data_page(self, xml: Xml) -> DataPage:
+        # noinspection PyPackageRequirements
+        from bs4 import NavigableString
+        soup = self.soup(xml)
+
+        def records():
+            page.columns[:] = [element.get('name') for element in soup.find_all('column')]
+            for record in soup.find_all('record'):
+                # html.parser treats COL as a void element, so each value is the string following its COL tag.
+                yield [str(col.next_sibling) if isinstance(col.next_sibling, NavigableString) else ''
+                       for col in record.find_all('col')]
+            element = soup.find('nextcall')
+            page.next_call = (element.get_text().strip() or None) if element is not None else None
+
+        page = DataPage(records())
+        return page
+
+    def drill_lines(self, xml: Xml) -> List[List[str]]:
+        # noinspection PyPackageRequirements
+        from bs4 import NavigableString
+        return [[str(col.next_sibling) if isinstance(col.next_sibling, NavigableString) else ''
+                 for col in line.find_all('col')] for line in self.soup(xml).find_all('line')]
+
+    def fields(self, xml: Xml, *names: str) -> dict:
+        soup = self.soup(xml)
+        result = {}
+        for name in names:
+            element = soup.find(name.lower())
+            result[name] = element.get_text() if element is not None else None
+        return result
+
+    def attributes(self, xml: Xml) -> dict:
+        return {element.attrs['name'].lower(): element.attrs['value'] for element in self.soup(xml).find_all('attr')}
+
+
+class EventParser(Parser):
+    """Incremental expat engine; reads the response in chunks and discards each record once yielded."""
+    name = 'event'
+    chunk_size = 65536
+
+    def __init__(self, fallback: Parser = None):
+        self.fallback = fallback or SoupParser()
+
+    def _events(self, xml: Xml, events: tuple = ('start', 'end')):
+        parser = XMLPullParser(events=events)
+        for start in range(0, len(xml), self.chunk_size):
+            parser.feed(xml[start:start + self.chunk_size])
+            yield from parser.read_events()
+        parser.close()
+        yield from parser.read_events()
+
+    def error(self, xml: Xml) -> Optional[tuple]:
+        if not sniff_error(xml):
+            return None
+        key = None
+        try:
+            for event, element in self._events(xml):
+                if key is None:
+                    if event != 'start' or element.tag.upper() != 'ERROR':
+                        return None
+                    key = element.get('key')
+                elif event == 'end' and element.tag.upper() == 'MSG':
+                    return key, element.text or ''
+        except ParseError:
+            return self.fallback.error(xml)
+        return (key, '') if key is not None else None
+
+    def data_page(self, xml: Xml) -> DataPage:
+        def records():
+            parent = None
+            for event, element in self._events(xml):
+                tag = element.tag.upper()
+                if event == 'start':
+                    if tag == 'RECORDS':
+                        parent = element
+                    continue
+                if tag == 'RECORD':
+                    yield [col.text or '' for col in element.iter() if col.tag.upper() == 'COL']
+                    element.clear()
+                    if parent is not None:
+                        parent.remove(element)
+                elif tag == 'COLUMN':
+                    page.columns.append(element.get('name'))
+                elif tag == 'NEXTCALL':
+                    page.next_call = (element.text or '').strip() or None
+
+        page = DataPage(records())
+        remaining = page._records
+        try:
+            # Parse up to the first record so malformed responses fall back before any record is yielded.
+            first = next(remaining, None)
+        except ParseError:
+            logger.debug('Response is not well-formed XML; falling back to {}.'.format(self.fallback))
+            return self.fallback.data_page(xml)
+
+        def resume():
+            if first is None:
+                return
+            yield first
+            try:
+                yield from remaining
+            except ParseError as e:
+                msg = 'Malformed Data response after {} records: {}'.format(page.count, e)
+                logger.error(msg=msg)
+                raise IosDataError(msg) from e
+
+        page._records = resume()
+        return page
+
+    def drill_lines(self, xml: Xml) -> List[List[str]]:
+        lines = []
+        try:
+            for _, element in self._events(xml, events=('end',)):
+                if element.tag.upper() == 'LINE':
+                    lines.append([col.text or '' for col in element.iter() if col.tag.upper() == 'COL'])
+                    element.clear()
+        except ParseError:
+            return self.fallback.drill_lines(xml)
+        return lines
+
+    def fields(self, xml: Xml, *names: str) -> dict:
+        wanted = {name.upper(): name for name in names}
+        result = dict.fromkeys(names)
+        try:
+            for _, element in self._events(xml, events=('end',)):
+                name = wanted.pop(element.tag.upper(), None)
+                if name is not None:
+                    result[name] = element.text or ''
+                    if not wanted:
+                        break
+        except ParseError:
+            return self.fallback.fields(xml, *names)
+        return result
+
+    def attributes(self, xml: Xml) -> dict:
+        result = {}
+        try:
+            for _, element in self._events(xml, events=('end',)):
+                if element.tag.upper() == 'ATTR':
+                    result[element.get('name').lower()] = element.get('value')
+                element.clear()
+        except ParseError:
+            return self.fallback.attributes(xml)
+        return result
+
+
+PARSERS = {SoupParser.name: SoupParser, EventParser.name: EventParser}
+
+
+def get_parser(name: str = EventParser.name) -> Parser:
+    """Return a new parser engine by name ('event' or 'soup')."""
+    try:
+        return PARSERS[name]()
+    except KeyError:
+        raise ValueError('Unknown parser engine: {}.'.format(name)) from None
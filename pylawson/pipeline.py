@@ -0,0 +1,163 @@
+"""Pipelined Data servlet extraction: fetch the next page while earlier pages are parsed in worker processes.
+
+The NEXTCALL of each response is found with a cheap scan, starting at its tail, so a fetcher thread can request page
+N+1 as soon as page N arrives, while page N is parsed into compact rows or ``ColumnBatch`` objects in a
+process pool. Bounded queues on both sides apply back-pressure, so at most ``prefetch`` raw responses and
+``max_pending`` parsed pages are held at a time::
+
+    for batch in PipelinedQuery(JournalLine(session, KEY='100'), workers=4).iter_batches():
+        ...
+"""
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from logging import getLogger
+from queue import Empty, Full, Queue
+import re
+from threading import Event, Thread
+from typing import Iterator, List, Optional, Tuple, Union
+from xml.sax.saxutils import unescape
+from .parser import Xml, get_parser
+from .pylawson import LawsonBase
+from .records import ColumnBatch, Record, record_type
+
+logger = getLogger(__name__)
+
+_NEXT_CALL = re.compile(r'<NEXTCALL[^>]*>\s*(?:<!\[CDATA\[(.*?)\]\]>|([^<]*))\s*</NEXTCALL>', re.I | re.S)
+_NEXT_CALL_BYTES = re.compile(_NEXT_CALL.pattern.encode('ascii'), re.I | re.S)
+_TAIL = 8192
+_DONE = object()
+
+
+def scan_next_call(xml: Xml) -> Optional[str]:
+    """The NEXTCALL of a Data response, found without parsing the records before it.
+
+    The tail of the response is scanned first, where the servlet writes NEXTCALL; if it is not there (e.g. a
+    long NEXTCALL, or trailing content) the whole response is scanned.
+    """
+    pattern = _NEXT_CALL_BYTES if isinstance(xml, bytes) else _NEXT_CALL
+    match = pattern.search(xml, max(0, len(xml) - _TAIL))
+    if match is None and len(xml) > _TAIL:
+        match = pattern.search(xml)
+    if match is None:
+        return None
+    value = match.group(1) if match.group(1) is not None else match.group(2)
+    if isinstance(value, bytes):
+        value = value.decode('utf-8', errors='replace')
+    value = value if match.group(1) is not None else unescape(value)
+    return value.strip() or None
+
+
+def parse_rows(xml: Xml, parser: str = 'event') -> Tuple[List[str], List[tuple]]:
+    """Parse a Data response into (columns, row tuples); runs in a worker process."""
+    page = get_parser(parser).data_page(xml)
+    rows = [tuple(values) for values in page]
+    return page.columns, rows
+
+
+def parse_batch(xml: Xml, file: str, parser: str = 'event') -> Optional[ColumnBatch]:
+    """Parse a Data response into a ColumnBatch (numeric columns converted); runs in a worker process."""
+    batch = None
+    page = get_parser(parser).data_page(xml)
+    for values in page:
+        if batch is None:
+            batch = ColumnBatch(file, page.columns)
+        batch.append(values)
+    return batch
+
+
+class PipelinedQuery:
+    """Overlap fetching and parsing of a multi-page Data servlet query.
+
+    ``workers`` processes parse pages (pass ``executor`` to use another ``concurrent.futures.Executor``);
+    results are yielded in page order. Stopping iteration early stops the fetcher and cancels queued parses.
+    """
+    def __init__(self, query: LawsonBase, page_size: int = 10000, workers: int = None, prefetch: int = 2,
+                 max_pending: int = None, executor: Executor = None):
+        if 'FILE' not in query.data_params:
+            raise NotImplementedError
+        self.query = query
+        self.session = query.session
+        self.file = query.data_params['FILE']
+        self.page_size = page_size
+        self.workers = workers
+        self.prefetch = prefetch
+        self.max_pending = max_pending or (workers or 4) + 1
+        self.executor = executor
+        self.pages = 0
+
+    def __repr__(self):
+        return '{}({}, workers={}, prefetch={})'.format(self.__class__.__name__, self.file, self.workers,
+                                                         self.prefetch)
+
+    def _put(self, responses: Queue, stop: Event, item) -> bool:
+        while not stop.is_set():
+            try:
+                responses.put(item, timeout=0.1)
+                return True
+            except Full:
+                continue
+        return False
+
+    def _fetch(self, responses: Queue, stop: Event):
+        """Fetcher thread: put each raw response on the queue, then _DONE (or the exception raised)."""
+        params = self.query._data_call_params(OUT='XML', NEXT='TRUE', MAX=str(self.page_size), keyUsage='PARAM')
+        try:
+            while params and not stop.is_set():
+                xml = self.session.data(data=params)
+                self.query._data_check(xml)
+                if not self._put(responses, stop, xml):
+                    return
+                params = self.query._next_call(scan_next_call(xml))
+            self._put(responses, stop, _DONE)
+        except BaseException as e:
+            self._put(responses, stop, e)
+
+    def _results(self, parse, *args) -> Iterator:
+        responses = Queue(maxsize=self.prefetch)
+        stop = Event()
+        fetcher = Thread(target=self._fetch, args=(responses, stop), name='PipelinedQueryFetch', daemon=True)
+        executor = self.executor or ProcessPoolExecutor(max_workers=self.workers)
+        pending = deque()
+        fetcher.start()
+        try:
+            done = False
+            while not done or pending:
+                while not done and len(pending) < self.max_pending:
+                    try:
+                        item = responses.get(timeout=0.05 if pending else None)
+                    except Empty:
+                        break
+                    if item is _DONE:
+                        done = True
+                    elif isinstance(item, BaseException):
+                        raise item
+                    else:
+                        pending.append(executor.submit(parse, item, *args))
+                        self.pages += 1
+                if pending:
+                    yield pending.popleft().result()
+        finally:
+            stop.set()
+            for future in pending:
+                future.cancel()
+            if self.executor is None:
+                executor.shutdown(wait=True)
+            fetcher.join()
+            logger.debug('Pipelined {} pages of {}.'.format(self.pages, self.file))
+
+    def iter_batches(self) -> Iterator[ColumnBatch]:
+        """Yield one ColumnBatch per page, parsed and converted in the worker processes."""
+        for batch in self._results(parse_batch, self.file, self.session.parser.name):
+            if batch is not None:
+                yield batch
+
+    def iter_records(self, typed: bool = False) -> Iterator[Union[dict, Record]]:
+        """Yield records as dicts, or as ``pylawson.records.Record`` objects if ``typed``, as iter_records does."""
+        for columns, rows in self._results(parse_rows, self.session.parser.name):
+            if typed:
+                cls = record_type(self.file, columns)
+                for values in rows:
+                    yield cls(values)
+            else:
+                for values in rows:
+                    yield dict(zip(columns, values))
@@ -1,14 +1,21 @@
 from logging import getLogger
-# noinspection PyPackageRequirements
-from bs4 import BeautifulSoup
+import time
+from typing import Iterator, Optional, Union
+from urllib.parse import parse_qsl
 from .client import IosSession as Session
 from .exceptions import IosDataError
+from .parser import DataPage, SoupParser, Xml, sniff_root
+from .query import DataQuery
+from .records import ColumnBatch, Record, record_type
 
 logger = getLogger(__name__)
 
 
 class LawsonBase:
     """Base class for Lawson data objects."""
+    # Data servlet parameters identifying the file (and index) this object is read from.
+    data_params = {}
+
     def __init__(self, session: Session, **kwargs):
         self.session = session
         self._soup = None
@@ -23,22 +30,126 @@ class LawsonBase:
         return self._xml
 
     @xml.setter
-    def xml(self, value: str):
+    def xml(self, value: Xml):
         self._soup = None
         self._xml = value
 
+    def release(self):
+        """Drop the raw response and its parsed tree once the needed values have been read from them."""
+        self.xml = None
+
     @property
     def soup(self):
         if not self._soup:
-            self._soup = BeautifulSoup(self.xml, 'html.parser')
+            start = time.perf_counter()
+            self._soup = SoupParser.soup(self.xml)
+            if self.session.metrics is not None:
+                self.session.metrics.record_parse('soup', self.data_params.get('FILE'), time.perf_counter() - start)
         return self._soup
 
-    def _error_check(self):
-        if self.soup.contents[0].name == 'ERROR':
-            msg = 'Infor error: [{}] {}'.format(self.soup.contents[0].attrs.get('key'), self.soup('MSG')[0].text)
+    def _validate(self):
+        """Check transaction parameters with session.validator, if one is set, before they are sent."""
+        validator = getattr(self.session, 'validator', None)
+        if validator is not None:
+            validator.check(self.params)
+
+    def _error_check(self, xml: str = None):
+        error = self.session.parser.error(self.xml if xml is None else xml)
+        if error:
+            msg = 'Infor error: [{}] {}'.format(*error)
+            logger.error(msg=msg)
+            raise IosDataError(msg)
+
+    def _transaction_check(self):
+        """Raise IosDataError for an ERROR response, or an AGS reply whose MsgNbr is not 000 (e.g. a field error)."""
+        self._error_check()
+        reply = self.session.parser.fields(self.xml, 'MsgNbr', 'Message')
+        number = (reply['MsgNbr'] or '').strip()
+        if number and number.strip('0'):
+            msg = 'Infor error: [{}] {}'.format(number, (reply['Message'] or '').strip())
+            logger.error(msg=msg)
+            raise IosDataError(msg)
+
+    def _data_check(self, xml: str = None):
+        """Raise IosDataError unless the response (``self.xml`` by default) is a Data servlet (DME) document, so no
+        page is lost silently."""
+        xml = self.xml if xml is None else xml
+        self._error_check(xml)
+        root = sniff_root(xml)
+        if root != 'DME':
+            msg = 'Unexpected {} response from the Data servlet for {}.'.format(root or 'non-XML',
+                                                                                self.data_params.get('FILE'))
             logger.error(msg=msg)
             raise IosDataError(msg)
 
+    def _data_call_params(self, **fixed) -> dict:
+        """Data servlet parameters: the class's data_params, overridden by the object's params, then ``fixed``."""
+        params = dict(self.data_params)
+        params.update(self.params)
+        params.update(fixed)
+        return params
+
+    @staticmethod
+    def _next_call(next_call: Optional[str]) -> Optional[dict]:
+        """Parameters for the next page of a Data servlet response, or None on the last page."""
+        if not next_call:
+            return None
+        return dict(parse_qsl(next_call.split('?', 1)[-1], keep_blank_values=True))
+
+    def iter_pages(self, page_size: int = 10000) -> Iterator[DataPage]:
+        """Yield each ``pylawson.parser.DataPage`` of the query, following NEXTCALL.
+
+        Pages iterate as rows of values with the names in ``columns``; each is released once consumed.
+        """
+        if 'FILE' not in self.data_params:
+            raise NotImplementedError
+        params = self._data_call_params(OUT='XML', NEXT='TRUE', MAX=str(page_size), keyUsage='PARAM')
+        page = 0
+        while params:
+            page += 1
+            self.xml = self.session.data(data=params)
+            self._data_check()
+            data_page = self.session.parser.data_page(self.xml)
+            data_page.timed = self.session.metrics is not None
+            yield data_page
+            if data_page.timed:
+                self.session.metrics.record_parse('Data', self.data_params['FILE'], data_page.parse_seconds,
+                                                  records=data_page.count)
+            logger.debug('Data page {} of {}: {} records.'.format(page, self.data_params['FILE'], data_page.count))
+            params = self._next_call(data_page.next_call)
+            self.xml = None
+
+    def iter_records(self, page_size: int = 10000, typed: bool = False) -> Iterator[Union[dict, Record]]:
+        """Yield Data servlet records, following NEXTCALL page by page.
+
+        Records are dicts of column name to value, or compact ``pylawson.records.Record`` objects with
+        numeric columns converted if ``typed`` is True. Only one page is held in memory at a time.
+        """
+        for data_page in self.iter_pages(page_size=page_size):
+            cls = None
+            for values in data_page:
+                if not typed:
+                    yield dict(zip(data_page.columns, values))
+                    continue
+                if cls is None:
+                    cls = record_type(self.data_params['FILE'], data_page.columns)
+                yield cls(values)
+
+    def iter_batches(self, page_size: int = 10000) -> Iterator[ColumnBatch]:
+        """Yield one column-oriented ``pylawson.records.ColumnBatch`` per Data servlet page."""
+        for data_page in self.iter_pages(page_size=page_size):
+            batch = None
+            for values in data_page:
+                if batch is None:
+                    batch = ColumnBatch(self.data_params['FILE'], data_page.columns)
+                batch.append(values)
+            if batch is not None:
+                yield batch
+
+    def select(self, *fields: str) -> DataQuery:
+        """Start a ``pylawson.query.DataQuery`` returning only ``fields`` (all if none are given)."""
+        return DataQuery(self, fields)
+
     def query(self, **kwargs):
         raise NotImplementedError
 
@@ -63,24 +174,32 @@ class What(LawsonBase):
 
 
 class Account(LawsonBase):
+    data_params = {'FILE': 'GLMASTER'}
+
     def query(self):
-        raise NotImplementedError
+        self.params = self._data_call_params(OUT='XML', NEXT='FALSE', keyUsage='PARAM')
+        self.xml = self.session.data(data=self.params)
+        self._data_check()
+        return self
 
     def upload(self):
         raise NotImplementedError
 
 
 class Activity(LawsonBase):
+    data_params = {'FILE': 'ACACTIVITY'}
+
     def query(self):
-        self.params.update({'FILE': 'ACACTIVITY', 'OUT': 'XML', 'NEXT': 'FALSE', 'keyUsage': 'PARAM'})
+        self.params = self._data_call_params(OUT='XML', NEXT='FALSE', keyUsage='PARAM')
         self.xml = self.session.data(data=self.params)
-        self._error_check()
+        self._data_check()
         return self
 
     def upload(self):
         self.params.update({'_TKN': 'AC10.1', '_RTN': 'DATA', '_TDS': 'IGNORE', '_OUT': 'XML', '_EOT': 'TRUE'})
+        self._validate()
         self.xml = self.session.transaction(data=self.params)
-        self._error_check()
+        self._transaction_check()
         return self
 
 
@@ -89,24 +208,27 @@ class Journal(LawsonBase):
 
     def upload(self):
         self.params.update({'_TKN': 'GL40.2', '_RTN': 'DATA', '_TDS': 'IGNORE', '_OUT': 'XML', '_EOT': 'TRUE'})
+        self._validate()
         self.xml = self.session.transaction(data=self.params)
-        self._error_check()
+        self._transaction_check()
         return self
 
 
 class JournalLine(LawsonBase):
+    data_params = {'FILE': 'GLTRANS', 'INDEX': 'GLTSET3'}
+
     def query(self):
-        self.params.update(
-            {'FILE': 'GLTRANS', 'INDEX': 'GLTSET3', 'OUT': 'XML', 'NEXT': 'FALSE', 'MAX': '10000', 'keyUsage': 'PARAM'})
+        self.params = self._data_call_params(OUT='XML', NEXT='FALSE', MAX='10000', keyUsage='PARAM')
         self.xml = self.session.data(data=self.params)
-        self._error_check()
+        self._data_check()
         return self
 
     def upload(self):
         self.params.update(
             {'_TKN': 'GL40.1', '_RTN': 'DATA', '_TDS': 'IGNORE', '_OUT': 'XML', '_EOT': 'TRUE', '_INITDTL': 'TRUE'})
+        self._validate()
         self.xml = self.session.transaction(data=self.params)
-        self._error_check()
+        self._transaction_check()
         return self
 
 
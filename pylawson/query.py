@@ -0,0 +1,196 @@
+"""Data servlet query builder with field projection and index selection.
+
+``LawsonBase.select()`` starts a ``DataQuery``; key filters pick the file's index whose leading keys they
+cover best, and become the KEY parameter, while filters on other fields and free-form criteria go in SELECT::
+
+    lines = (JournalLine(session).select('ACCOUNT', 'SUB-ACCOUNT', 'TRAN-AMOUNT')
+             .filter(COMPANY=100, FISCAL_YEAR=2024, ACCT_PERIOD=3).where('TRAN-AMOUNT>1000'))
+    for record in lines.iter_records():
+        ...
+
+Indexes of the standard files are listed in ``INDEXES``; add site-specific ones with ``register_index()``.
+"""
+from logging import getLogger
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+from .records import ColumnBatch, Record
+
+logger = getLogger(__name__)
+
+
+class Index:
+    """A Data servlet index: its name and key fields in order."""
+    __slots__ = ('name', 'keys')
+
+    def __init__(self, name: str, keys: Sequence[str]):
+        self.name = name
+        self.keys = tuple(keys)
+
+    def __repr__(self):
+        return '{}({!r}, {})'.format(self.__class__.__name__, self.name, self.keys)
+
+    def prefix(self, fields: Iterable[str]) -> Tuple[str, ...]:
+        """The leading keys of this index that are all among ``fields``."""
+        fields = set(fields)
+        matched = []
+        for key in self.keys:
+            if key not in fields:
+                break
+            matched.append(key)
+        return tuple(matched)
+
+
+# Known indexes per FILE, in order of preference when several match equally well.
+INDEXES = {
+    'GLTRANS': [
+        Index('GLTSET3', ('COMPANY', 'FISCAL-YEAR', 'ACCT-PERIOD', 'ACCT-UNIT', 'ACCOUNT', 'SUB-ACCOUNT')),
+        Index('GLTSET1', ('COMPANY', 'FISCAL-YEAR', 'ACCT-PERIOD', 'CONTROL-GROUP', 'SYSTEM', 'JE-TYPE',
+                          'JE-SEQUENCE', 'LINE-NBR')),
+        Index('GLTSET2', ('COMPANY', 'ACCT-UNIT', 'ACCOUNT', 'SUB-ACCOUNT', 'FISCAL-YEAR', 'ACCT-PERIOD')),
+        Index('GLTSET4', ('COMPANY', 'ACCOUNT', 'SUB-ACCOUNT', 'ACCT-UNIT', 'FISCAL-YEAR', 'ACCT-PERIOD')),
+        Index('GLTSET5', ('ACTIVITY', 'ACCT-CATEGORY', 'COMPANY', 'FISCAL-YEAR', 'ACCT-PERIOD')),
+    ],
+    'GLMASTER': [
+        Index('GLMSET1', ('COMPANY', 'ACCT-UNIT', 'ACCOUNT', 'SUB-ACCOUNT')),
+        Index('GLMSET2', ('COMPANY', 'ACCOUNT', 'SUB-ACCOUNT', 'ACCT-UNIT')),
+    ],
+    'ACACTIVITY': [
+        Index('ACVSET1', ('ACTIVITY',)),
+        Index('ACVSET2', ('ACTIVITY-GRP', 'ACTIVITY')),
+    ],
+}  # type: Dict[str, List[Index]]
+
+
+def register_index(file: str, name: str, keys: Sequence[str]):
+    """Add an index for a FILE, or replace the one with the same name."""
+    indexes = [index for index in INDEXES.get(file, []) if index.name != name]
+    indexes.append(Index(name, keys))
+    INDEXES[file] = indexes
+
+
+def choose_index(file: str, fields: Iterable[str], preferred: str = None) -> Tuple[Optional[Index], Tuple[str, ...]]:
+    """The index of a FILE whose leading keys cover the most of ``fields``, and those keys.
+
+    Ties go to ``preferred`` (the object's default INDEX), then to the order in ``INDEXES``. Returns
+    (None, ()) if no index of the file starts with one of the fields.
+    """
+    fields = set(fields)
+    best, best_keys = None, ()
+    for index in INDEXES.get(file, ()):
+        keys = index.prefix(fields)
+        if len(keys) > len(best_keys) or (keys and len(keys) == len(best_keys) and index.name == preferred):
+            best, best_keys = index, keys
+    return best, best_keys
+
+
+def _field_name(name: str) -> str:
+    return name.replace('_', '-').upper()
+
+
+class DataQuery:
+    """Build the FIELD, INDEX, KEY and SELECT parameters of a Data servlet query on a LawsonBase object.
+
+    Methods return the query, so they chain. ``filter()`` takes equality filters (keyword names with '_' for
+    '-'); those on the leading keys of the chosen index go in KEY and the rest in SELECT, together with any
+    ``where()`` criteria such as ``'TRAN-AMOUNT>1000'``. ``using()`` fixes the index instead.
+    """
+    def __init__(self, obj, fields: Iterable[str] = ()):
+        if 'FILE' not in obj.data_params:
+            raise NotImplementedError
+        self.obj = obj
+        self.file = obj.data_params['FILE']
+        self.fields = []  # type: List[str]
+        self.filters = {}  # type: Dict[str, str]
+        self.criteria = []  # type: List[str]
+        self.index = None  # type: Optional[str]
+        self.select(*fields)
+
+    def __repr__(self):
+        return '{}({}, {})'.format(self.__class__.__name__, self.obj, self.params())
+
+    def select(self, *fields: str) -> 'DataQuery':
+        """Return only these columns (all columns if none are ever given)."""
+        self.fields.extend(field for field in (_field_name(field) for field in fields) if field not in self.fields)
+        return self
+
+    def filter(self, **values) -> 'DataQuery':
+        """Keep records whose fields equal the given values."""
+        self.filters.update((_field_name(name), str(value)) for name, value in values.items())
+        return self
+
+    def where(self, *criteria: str) -> 'DataQuery':
+        """Add SELECT criteria in Data servlet syntax, e.g. ``'ACCT-PERIOD>=3'``; all must hold."""
+        self.criteria.extend(criteria)
+        return self
+
+    def using(self, index: str) -> 'DataQuery':
+        """Read through this index rather than choosing one from the filters."""
+        self.index = index
+        return self
+
+    def plan(self) -> Tuple[Optional[str], Tuple[str, ...]]:
+        """The index to read through and the filtered fields that go in its KEY."""
+        preferred = self.obj.params.get('INDEX', self.obj.data_params.get('INDEX'))
+        if self.index is not None:
+            indexes = {index.name: index for index in INDEXES.get(self.file, ())}
+            index = indexes.get(self.index)
+            return self.index, index.prefix(self.filters) if index is not None else ()
+        index, keys = choose_index(self.file, self.filters, preferred=preferred)
+        if index is None:
+            return preferred, ()
+        return index.name, keys
+
+    def params(self) -> dict:
+        """The Data servlet parameters this query adds to the object's own."""
+        index, keys = self.plan()
+        params = {}
+        if self.fields:
+            params['FIELD'] = ';'.join(self.fields)
+        if index:
+            params['INDEX'] = index
+        if keys:
+            params['KEY'] = '='.join(self.filters[key] for key in keys)
+        criteria = ['{}={}'.format(name, value) for name, value in self.filters.items() if name not in keys]
+        criteria.extend(self.criteria)
+        if criteria:
+            params['SELECT'] = '&'.join(criteria)
+        return params
+
+    def build(self):
+        """A new object of the same class with this query's parameters, for ``query()`` or ``PipelinedQuery``.
+
+        The object's own KEY is dropped if the query reads through another index without key values of its own.
+        """
+        params = dict(self.obj.params)
+        own_index = params.get('INDEX', self.obj.data_params.get('INDEX'))
+        query = self.params()
+        if params.get('SELECT') and 'SELECT' in query:
+            query['SELECT'] = '{}&{}'.format(params['SELECT'], query['SELECT'])
+        if 'KEY' not in query and query.get('INDEX', own_index) != own_index:
+            params.pop('KEY', None)  # the object's KEY is for its own index, not the one the query reads through
+        params.update(query)
+        logger.debug('{} query parameters: {}'.format(self.file, params))
+        return self.obj.__class__(self.obj.session, **params)
+
+    def iter_records(self, page_size: int = 10000, typed: bool = False) -> Iterator[Union[dict, Record]]:
+        return self.build().iter_records(page_size=page_size, typed=typed)
+
+    def iter_batches(self, page_size: int = 10000) -> Iterator[ColumnBatch]:
+        return self.build().iter_batches(page_size=page_size)
+
+    def iter_pages(self, page_size: int = 10000) -> Iterator:
+        return self.build().iter_pages(page_size=page_size)
+
+
+def partition_query(obj, partition: dict) -> DataQuery:
+    """A query on ``obj`` for one key partition (field -> value), as run by parallel extracts and syncs.
+
+    Fields on the leading keys of the file's best index go in KEY, in index order, and the others in SELECT,
+    so a partition given in any order, skipping a key or including a non-key field still reads its own rows.
+    """
+    return DataQuery(obj).filter(**partition)
+
+
+def partition_label(query: DataQuery) -> str:
+    """Label of a partition query: its KEY, followed by '&' and its SELECT criteria if it has any."""
+    params = query.params()
+    return '&'.join(params[name] for name in ('KEY', 'SELECT') if params.get(name))
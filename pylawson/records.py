@@ -0,0 +1,204 @@
+"""Compact typed records and columnar batches for Data servlet results.
+
+``record_type`` builds a ``__slots__`` class per FILE and column list, converting known numeric columns
+(see ``SCHEMAS``); ``ColumnBatch`` stores a page of results column-wise, with numeric columns held in
+``array`` buffers (returned as NumPy arrays when NumPy is installed). Batches hold amount columns as float64,
+so use typed records where the exact ``Decimal`` value matters.
+"""
+from array import array
+from decimal import Decimal, InvalidOperation
+from logging import getLogger
+import re
+from typing import Dict, Iterable, List, Sequence
+from .exceptions import IosDataError
+
+logger = getLogger(__name__)
+
+
+def _invalid(value: str, kind: str) -> IosDataError:
+    msg = 'Invalid {} value {!r} in Data response.'.format(kind, value)
+    logger.error(msg=msg)
+    return IosDataError(msg)
+
+
+def _integer(value: str) -> int:
+    value = value.strip()
+    if value.endswith('-'):
+        value = '-' + value[:-1]
+    try:
+        return int(value) if value else 0
+    except ValueError:
+        pass
+    try:
+        return int(Decimal(value))
+    except (InvalidOperation, ValueError, OverflowError):
+        raise _invalid(value, 'integer') from None
+
+
+def _decimal(value: str) -> Decimal:
+    value = value.strip().replace(',', '')
+    if value.endswith('-'):
+        value = '-' + value[:-1]
+    try:
+        amount = Decimal(value) if value else Decimal(0)
+    except InvalidOperation:
+        raise _invalid(value, 'numeric') from None
+    if not amount.is_finite():
+        raise _invalid(value, 'numeric')
+    return amount
+
+
+# Known column types per FILE; unlisted columns are kept as str.
+SCHEMAS = {
+    'GLTRANS': {
+        'COMPANY': int, 'FISCAL-YEAR': int, 'ACCT-PERIOD': int, 'CONTROL-GROUP': int, 'JE-SEQUENCE': int,
+        'LINE-NBR': int, 'ACCOUNT': int, 'SUB-ACCOUNT': int, 'OBJ-ID': int, 'TO-COMPANY': int,
+        'TRAN-AMOUNT': Decimal, 'BASE-AMOUNT': Decimal, 'UNITS-AMOUNT': Decimal, 'BASERATE': Decimal,
+    },
+    'ACACTIVITY': {
+        'BUDGET-NBR': int, 'CURRENT-EST': Decimal, 'ORIGINAL-EST': Decimal, 'OBJ-ID': int,
+    },
+    'GLMASTER': {
+        'COMPANY': int, 'ACCOUNT': int, 'SUB-ACCOUNT': int, 'OBJ-ID': int,
+    },
+}
+_CONVERTERS = {int: _integer, Decimal: _decimal}
+_ARRAY_CODES = {int: 'q', Decimal: 'd'}
+
+
+_numpy = []
+
+
+def numpy():
+    """The numpy module, or None if it is not installed (optional; imported on first use)."""
+    if not _numpy:
+        try:
+            import numpy as module
+        except ImportError:
+            module = None
+        _numpy.append(module)
+    return _numpy[0]
+
+
+def attribute_name(column: str) -> str:
+    """Python attribute name for a Lawson column, e.g. 'FISCAL-YEAR' -> 'fiscal_year'."""
+    name = re.sub(r'\W', '_', column.lower())
+    return '_' + name if name[:1].isdigit() else name
+
+
+class Record:
+    """Base class for typed Data servlet records; subclasses are built by ``record_type``."""
+    __slots__ = ()
+    # Class attributes are underscored so they cannot collide with slot names derived from columns.
+    _file = None
+    _columns = ()  # type: Sequence[str]
+    _converters = ()
+
+    def __init__(self, values: Sequence[str]):
+        for name, convert, value in zip(self.__slots__, self._converters, values):
+            setattr(self, name, convert(value))
+
+    def __repr__(self):
+        return '{}({})'.format(self.__class__.__name__, ', '.join(
+            '{}={!r}'.format(name, getattr(self, name, None)) for name in self.__slots__))
+
+    def __eq__(self, other):
+        if not isinstance(other, Record):
+            return NotImplemented
+        return self._file == other._file and self.as_dict() == other.as_dict()
+
+    def as_dict(self) -> dict:
+        """Return the record as a dict keyed by Lawson column name."""
+        return {column: getattr(self, name, None) for column, name in zip(self._columns, self.__slots__)}
+
+
+_record_types = {}  # type: Dict[tuple, type]
+
+
+def record_type(file: str, columns: Sequence[str]) -> type:
+    """Return the (cached) Record subclass for a FILE and its column list."""
+    key = (file, tuple(columns))
+    cls = _record_types.get(key)
+    if cls is None:
+        schema = SCHEMAS.get(file, {})
+        cls = type('{}Record'.format(file.title().replace('-', '')), (Record,), {
+            '__slots__': tuple(attribute_name(column) for column in columns),
+            '_file': file,
+            '_columns': tuple(columns),
+            '_converters': tuple(_CONVERTERS.get(schema.get(column), str) for column in columns),
+        })
+        _record_types[key] = cls
+    return cls
+
+
+class ColumnBatch:
+    """Column-oriented batch of records; numeric columns are stored in contiguous typed arrays.
+
+    Integer columns are int64 and amount (Decimal) columns float64, which rounds amounts beyond about 15
+    significant digits; typed records keep them as Decimal.
+    """
+    def __init__(self, file: str, columns: Sequence[str]):
+        self.file = file
+        self.names = tuple(columns)
+        schema = SCHEMAS.get(file, {})
+        self._types = tuple(schema.get(column, str) for column in columns)
+        self._data = [array(_ARRAY_CODES[kind]) if kind in _ARRAY_CODES else [] for kind in self._types]
+        self._length = 0
+
+    def __repr__(self):
+        return '{}(file={}, columns={}, rows={})'.format(self.__class__.__name__, self.file, len(self.names), len(self))
+
+    def __len__(self):
+        return self._length
+
+    def __contains__(self, column: str):
+        return column in self.names
+
+    def __getitem__(self, column: str):
+        """Return a copy of a column: a NumPy array (or array.array without NumPy) for numeric columns, else a list.
+
+        The copy does not share the batch's buffers, so the batch can still be appended to while it is in use.
+        """
+        data = self._data[self.names.index(column)]
+        if not isinstance(data, array):
+            return list(data)
+        np = numpy()
+        if np is not None:
+            return np.array(data, dtype=np.int64 if data.typecode == 'q' else np.float64)
+        return array(data.typecode, data)
+
+    def array(self, column: str):
+        """Return a column's own storage: an ``array.array`` for numeric columns, else a list of str."""
+        return self._data[self.names.index(column)]
+
+    def append(self, values: Sequence[str]):
+        for kind, data, value in zip(self._types, self._data, values):
+            if kind is int:
+                data.append(_integer(value))
+            elif kind is Decimal:
+                data.append(float(_decimal(value)))
+            else:
+                data.append(value)
+        self._length += 1
+
+    def extend(self, rows: Iterable[Sequence[str]]):
+        for values in rows:
+            self.append(values)
+
+    def rows(self) -> List[tuple]:
+        """Return the batch as a list of row tuples."""
+        return list(zip(*self._data))
+
+    @classmethod
+    def concat(cls, batches: Iterable['ColumnBatch']) -> 'ColumnBatch':
+        """Concatenate batches with identical FILE and columns into a single batch."""
+        result = None
+        for batch in batches:
+            if result is None:
+                result = cls(batch.file, batch.names)
+            elif batch.names != result.names or batch.file != result.file:
+                raise ValueError('Cannot concatenate batches with different columns.')
+            for target, data in zip(result._data, batch._data):
+                target.extend(data)
+            result._length += len(batch)
+        return result
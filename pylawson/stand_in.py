@@ -0,0 +1,292 @@
+"""Local stand-in for a Lawson IOS server and its ADFS identity provider, for offline testing and benchmarks.
+
+Emulates the SAML redirect chain followed by ``SamlSession._auth``, the SSOServlet PING, LOGOUT and
+GET_XFER_SESSION actions, the Profile servlet and the Data, Drill, Transaction, ListTokens,
+ListAttachments and What endpoints, with configurable payload sizes and latency::
+
+    with StandInServer(rows=50000, latency=0.02) as server:
+        session = SamlSession(**server.session_params)
+"""
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from logging import getLogger
+import re
+import secrets
+from threading import Lock, Thread
+import time
+from typing import Optional, Sequence
+from urllib.parse import parse_qsl, urlencode, urlparse
+
+logger = getLogger(__name__)
+
+GLTRANS_COLUMNS = ('COMPANY', 'FISCAL-YEAR', 'ACCT-PERIOD', 'SYSTEM', 'ACCT-UNIT', 'ACCOUNT', 'SUB-ACCOUNT',
+                   'TRAN-AMOUNT', 'UNITS-AMOUNT', 'DESCRIPTION', 'POSTING-DATE', 'OBJ-ID')
+
+FORM = '<html><body><form method="post" action="{action}">{inputs}</form></body></html>'
+USERNAME_FIELD = 'ctl00$ContentPlaceHolder1$UsernameTextBox'
+PASSWORD_FIELD = 'ctl00$ContentPlaceHolder1$PasswordTextBox'
+
+
+def synthetic_record(i: int) -> tuple:
+    """Values of the i-th synthetic GLTRANS record."""
+    return (100, 2024, i % 12 + 1, 'GL', 'A{:05d}'.format(i % 500), 10000 + i % 900, 0,
+            '{:.2f}'.format(i * 1.37 - 5000), '0.00', 'Line {} & more'.format(i), '20240131', i)
+
+
+def synthetic_data(rows: int, start: int = 0, next_call: str = None, fields: Sequence[str] = None) -> str:
+    """Return a GLTRANS-like Data servlet XML response with records start..start+rows-1 (only ``fields``, if given)."""
+    columns = [name for name in fields if name in GLTRANS_COLUMNS] if fields else GLTRANS_COLUMNS
+    positions = [GLTRANS_COLUMNS.index(name) for name in columns]
+    parts = ['<?xml version="1.0" encoding="ISO-8859-1"?><DME productline="PROD" filename="GLTRANS"><COLUMNS>']
+    parts.extend('<COLUMN name="{}"/>'.format(name) for name in columns)
+    parts.append('</COLUMNS><RECORDS count="{}">'.format(rows))
+    for i in range(start, start + rows):
+        record = synthetic_record(i)
+        parts.append('<RECORD><COLS>')
+        parts.extend('<COL><![CDATA[{}]]></COL>'.format(record[position]) for position in positions)
+        parts.append('</COLS></RECORD>')
+    parts.append('</RECORDS>')
+    if next_call:
+        parts.append('<NEXTCALL><![CDATA[{}]]></NEXTCALL>'.format(next_call))
+    parts.append('</DME>')
+    return ''.join(parts)
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    @property
+    def stand_in(self) -> 'StandInServer':
+        return self.server.stand_in
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def do_GET(self):
+        self._route('GET', {})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        self._route('POST', dict(parse_qsl(self.rfile.read(length).decode('utf-8'), keep_blank_values=True)))
+
+    def _send(self, status: int, body: str = '', headers: dict = None, cookies: dict = None):
+        content = body.encode('ISO-8859-1', errors='replace')
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/xml' if body.startswith('<?xml') else 'text/html')
+        for name, value in (headers or {}).items():
+            if name == 'Location':
+                value = 'http://{}{}'.format(self.headers['Host'], value)
+            self.send_header(name, value)
+        for name, value in (cookies or {}).items():
+            self.send_header('Set-Cookie', '{}={}; Path=/'.format(name, value))
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def _cookie(self, name: str):
+        for part in self.headers.get('Cookie', '').split(';'):
+            key, _, value = part.strip().partition('=')
+            if key == name:
+                return value
+        return None
+
+    def _route(self, method: str, form: dict):
+        url = urlparse(self.path)
+        query = dict(parse_qsl(url.query, keep_blank_values=True))
+        params = dict(query, **form)
+        self.stand_in.count(url.path)
+        if url.path.startswith('/adfs/ls'):
+            return self._identity_provider(query, form)
+        if url.path == '/sso/acs':
+            return self._send(200, FORM.format(action='/sso/SSOServlet?_action=TARGET',
+                                               inputs='<input type="hidden" name="wresult" value="token"/>'),
+                              cookies={'MSISSignOut': 'signout'})
+        if url.path == '/sso/SSOServlet':
+            return self._sso_servlet(method, query)
+        if not self.stand_in.is_valid(self._cookie('C.LWSN')):
+            # Expired or missing session: redirect to sign in as the real SSO servlet does.
+            return self._send(302, headers={'Location': '/adfs/ls/?wa=wsignin1.0'})
+        time.sleep(self.stand_in.latency)
+        status = self.stand_in.failure(url.path)
+        if status:
+            return self._send(status, '<html><body>HTTP {} from stand-in</body></html>'.format(status))
+        if url.path == '/servlet/Profile':
+            return self._send(200, '<?xml version="1.0"?><PROFILE><ATTRIBUTES>'
+                                   '<ATTR name="ProductLine" value="PROD"/><ATTR name="Id" value="{}"/>'
+                                   '</ATTRIBUTES></PROFILE>'.format(self.stand_in.username))
+        if url.path == '/servlet/Router/Data/erp':
+            return self._data(params)
+        if url.path == '/servlet/Router/Transaction/erp':
+            if self.stand_in.error_field and params.get(self.stand_in.error_field):
+                return self._send(200, '<?xml version="1.0"?><ERROR key="{}"><MSG>Rejected by stand-in</MSG>'
+                                       '</ERROR>'.format(params.get('_TKN')))
+            if self.stand_in.message_field and params.get(self.stand_in.message_field):
+                return self._send(200, '<?xml version="1.0"?><{0}><_f0>{0}</_f0><Message>Account does not exist'
+                                       '</Message><MsgNbr>052</MsgNbr></{0}>'.format(params.get('_TKN', 'XX00.1')))
+            return self._send(200, '<?xml version="1.0"?><{0}><_f0>{0}</_f0><Message>Add Complete - Continue'
+                                   '</Message><MsgNbr>000</MsgNbr></{0}>'.format(params.get('_TKN', 'XX00.1')))
+        if url.path == '/servlet/Router/Drill/erp':
+            lines = ''.join('<LINE><COLS><COL><![CDATA[{}]]></COL><COL><![CDATA[Drill line {}]]></COL></COLS>'
+                            '</LINE>'.format(i, i) for i in range(self.stand_in.drill_lines))
+            return self._send(200, '<?xml version="1.0"?><IDARESPONSE><LINES>{}</LINES></IDARESPONSE>'.format(lines))
+        if url.path == '/lawson-ios/action/ListTokens':
+            tokens = ''.join('<TOKEN name="{}{:02d}.1" title="Token {}"/>'.format(params.get('systemCode', 'GL'), i, i)
+                             for i in range(self.stand_in.tokens))
+            return self._send(200, '<?xml version="1.0"?><TOKENS>{}</TOKENS>'.format(tokens))
+        if url.path == '/lawson-ios/action/ListAttachments':
+            return self._send(200, '<?xml version="1.0"?><ATTACHMENTS/>')
+        if url.path == '/servlet/What':
+            return self._send(200, '<?xml version="1.0"?><WHAT laversion="10.0.5.0"><JAR name="{}"/></WHAT>'.format(
+                params.get('_JAR', 'IOS.jar')))
+        return self._send(404, '<html>Not found</html>')
+
+    def _identity_provider(self, query: dict, form: dict):
+        if 'signin' in query:
+            inputs = ('<input type="text" name="{}"/><input type="password" name="{}"/>'
+                      '<input type="hidden" name="AuthMethod" value="FormsAuthentication"/>').format(
+                USERNAME_FIELD, PASSWORD_FIELD)
+            return self._send(200, FORM.format(action='/adfs/ls/?wa=wsignin1.0&auth=1', inputs=inputs))
+        if 'auth' in query:
+            if form.get(USERNAME_FIELD) != self.stand_in.username or form.get(PASSWORD_FIELD) != self.stand_in.password:
+                return self._send(200, FORM.format(action='/adfs/ls/?wa=wsignin1.0&auth=1', inputs=''))
+            return self._send(302, headers={'Location': '/adfs/ls/?wa=wsignin1.0&xhtml=1'}, cookies={'MSISAuth': 'a'})
+        if 'xhtml' in query:
+            return self._send(200, FORM.format(action='/sso/acs', inputs='<input type="hidden" name="wa" value="1"/>'),
+                              cookies={'MSISAuthenticated': 'a'})
+        return self._send(302, headers={'Location': '/adfs/ls/?wa=wsignin1.0&signin=1'},
+                          cookies={'MSISIPSelectionSession': 'ip'})
+
+    def _sso_servlet(self, method: str, query: dict):
+        action = query.get('_action')
+        if action == 'TARGET':
+            return self._send(302, headers={'Location': '/sso/SSOServlet?_action=LOGINCOMPLETE_PAGE',
+                                            'SSO_STATUS': 'LoginSuccessful',
+                                            'SSO_TIMEOUT_REMAINING': str(self.stand_in.timeout_ms)},
+                              cookies={'C.LWSN': self.stand_in.new_session()})
+        if action == 'LOGINCOMPLETE_PAGE':
+            return self._send(200, '<html><script>location="?_action=LOGINCOMPLETE"</script></html>')
+        session = self._cookie('C.LWSN')
+        if action == 'PING':
+            valid = self.stand_in.is_valid(session)
+            return self._send(200, '<?xml version="1.0"?><PING><SESSIONSTATUS>{}</SESSIONSTATUS><USERNAME>{}'
+                                   '</USERNAME><TIME_REMAINING>{}</TIME_REMAINING></PING>'.format(
+                                    'true' if valid else 'false', self.stand_in.username, 0))
+        if action == 'GET_XFER_SESSION':
+            return self._send(200, 'http://{}/sso/SSOServlet?_action=XFER_SESSION'.format(self.headers['Host']))
+        if action == 'XFER_SESSION':
+            return self._send(200, 'OK')
+        if action == 'LOGOUT':
+            self.stand_in.expire(session)
+            return self._send(200, '<html>Logged out</html>')
+        return self._send(302, headers={'Location': '/adfs/ls/?wa=wsignin1.0'})
+
+    def _data(self, params: dict):
+        page_size = int(params.get('MAX') or self.stand_in.rows)
+        start = int(params.get('BEGIN', 0))
+        # Only 'OBJ-ID>=n' selections are understood (KEY is ignored); record i has OBJ-ID i.
+        match = re.search(r'OBJ-ID>=(\d+)', params.get('SELECT', ''))
+        if match:
+            start = max(start, int(match.group(1)))
+        rows = max(min(page_size, self.stand_in.rows - start), 0)
+        next_call = None
+        if params.get('NEXT', 'FALSE').upper() == 'TRUE' and start + rows < self.stand_in.rows:
+            next_params = {key: value for key, value in params.items() if key != 'BEGIN'}
+            next_params['BEGIN'] = start + rows
+            next_call = urlencode(next_params)
+        fields = params['FIELD'].split(';') if params.get('FIELD') else None
+        return self._send(200, synthetic_data(rows, start=start, next_call=next_call, fields=fields))
+
+
+class StandInServer:
+    """Threaded local IOS + ADFS stand-in; use as a context manager or call start() and stop()."""
+    def __init__(self, rows: int = 1000, latency: float = 0.0, username: str = 'user', password: str = 'password',
+                 host: str = '127.0.0.1', port: int = 0, timeout_ms: int = 3600000, tokens: int = 50,
+                 drill_lines: int = 20, error_field: str = None, message_field: str = None):
+        self.rows = rows
+        self.latency = latency
+        self.username = username
+        self.password = password
+        self.timeout_ms = timeout_ms
+        self.tokens = tokens
+        self.drill_lines = drill_lines
+        self.error_field = error_field  # Transaction calls with this parameter set are answered with ERROR.
+        self.message_field = message_field  # ... or with a field error (MsgNbr other than 000).
+        self.requests = Counter()
+        self._failures = {}  # path -> [status, calls to let through first, failures left]
+        self._sessions = set()
+        self._lock = Lock()
+        self._server = ThreadingHTTPServer((host, port), StandInHandler)
+        self._server.daemon_threads = True
+        self._server.stand_in = self
+        self._thread = None
+
+    def __repr__(self):
+        return '{}({})'.format(self.__class__.__name__, self.url)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return 'http://{}:{}'.format(host, port)
+
+    @property
+    def session_params(self) -> dict:
+        """Keyword arguments for a SamlSession connecting to this stand-in."""
+        return {'lawson_server': self.url + '/sso/SSOServlet', 'ident_server': self.url + '/adfs',
+                'username': self.username, 'password': self.password}
+
+    def start(self) -> 'StandInServer':
+        self._thread = Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        logger.debug('Stand-in server listening on {}.'.format(self.url))
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def count(self, path: str):
+        with self._lock:
+            self.requests[path] += 1
+
+    def fail(self, path: str, status: int = 500, times: int = 1, after: int = 0):
+        """Answer the next ``times`` calls to an IOS path with an HTTP error page, after letting ``after`` through."""
+        with self._lock:
+            self._failures[path] = [status, after, times]
+
+    def failure(self, path: str) -> Optional[int]:
+        """Status of the error page to answer a call with, or None to answer it normally."""
+        with self._lock:
+            failure = self._failures.get(path)
+            if failure is None:
+                return None
+            if failure[1]:
+                failure[1] -= 1
+                return None
+            failure[2] -= 1
+            if not failure[2]:
+                del self._failures[path]
+            return failure[0]
+
+    def new_session(self) -> str:
+        token = secrets.token_hex(16)
+        with self._lock:
+            self._sessions.add(token)
+        return token
+
+    def is_valid(self, token: str) -> bool:
+        return token in self._sessions
+
+    def expire(self, token: str = None):
+        """Expire one session, or all sessions if no token is given."""
+        with self._lock:
+            if token is None:
+                self._sessions.clear()
+            else:
+                self._sessions.discard(token)
@@ -0,0 +1,207 @@
+"""Local pre-flight validation of transactions before they are sent.
+
+Assign a ``Validator`` to ``session.validator`` and ``Activity``, ``Journal`` and ``JournalLine`` uploads are
+checked first: the token must be one listed by ListTokens, fields must satisfy their ``FieldSpec`` (required,
+length, numeric format) and key references must exist in a ``pylawson.mirror.MasterDataMirror``. A failing
+transaction raises ``IosValidationError`` without any request being sent.
+"""
+from decimal import Decimal, InvalidOperation
+from logging import getLogger
+import re
+from threading import Lock
+import time
+from typing import Dict, Iterable, List, Optional, Sequence
+from xml.etree.ElementTree import ParseError, fromstring
+from .client import IosSession as Session
+from .client.singleflight import SingleFlight
+from .exceptions import IosValidationError
+
+logger = getLogger(__name__)
+
+KINDS = ('alpha', 'numeric', 'signed', 'date')
+_DATE = re.compile(r'^\d{8}$')
+
+
+class FieldSpec:
+    """Constraints on one transaction field.
+
+    ``kind`` is 'alpha', 'numeric' (unsigned), 'signed' or 'date' (YYYYMMDD). ``size`` is the maximum length;
+    for numbers it counts all digits, including up to ``decimals`` decimal places.
+    """
+    __slots__ = ('name', 'kind', 'size', 'decimals', 'required')
+
+    def __init__(self, name: str, kind: str = 'alpha', size: int = None, decimals: int = 0, required: bool = False):
+        if kind not in KINDS:
+            raise ValueError('Unknown field kind: {}.'.format(kind))
+        self.name = name
+        self.kind = kind
+        self.size = size
+        self.decimals = decimals
+        self.required = required
+
+    def __repr__(self):
+        return '{}({!r}, kind={!r}, size={}, decimals={}, required={})'.format(
+            self.__class__.__name__, self.name, self.kind, self.size, self.decimals, self.required)
+
+    def check(self, value) -> Optional[str]:
+        """Problem with a value, or None if it is valid."""
+        text = '' if value is None else str(value).strip()
+        if not text:
+            return '{} is required'.format(self.name) if self.required else None
+        if self.kind == 'alpha':
+            if self.size and len(text) > self.size:
+                return '{} is longer than {} characters'.format(self.name, self.size)
+            return None
+        if self.kind == 'date':
+            return None if _DATE.match(text) else '{} is not a YYYYMMDD date'.format(self.name)
+        number = text[:-1] if text.endswith('-') else text
+        try:
+            amount = Decimal(number)
+        except InvalidOperation:
+            return '{} is not numeric'.format(self.name)
+        if not amount.is_finite():
+            return '{} is not numeric'.format(self.name)
+        if (amount < 0 or number != text) and self.kind != 'signed':
+            return '{} must not be negative'.format(self.name)
+        if -amount.normalize().as_tuple().exponent > self.decimals:
+            return '{} has more than {} decimal places'.format(self.name, self.decimals)
+        integer = int(abs(amount))
+        if self.size and integer and len(str(integer)) > self.size - self.decimals:
+            return '{} has more than {} digits'.format(self.name, self.size)
+        return None
+
+
+class Reference:
+    """A key reference checked against one index of a MasterDataMirror, e.g. accounts or activities."""
+    __slots__ = ('index', 'fields')
+
+    def __init__(self, index: str, fields: Sequence[str]):
+        self.index = index
+        self.fields = tuple(fields)
+
+    def __repr__(self):
+        return '{}({!r}, {})'.format(self.__class__.__name__, self.index, self.fields)
+
+
+class Validator:
+    """Check transaction parameters against cached token and field metadata before they are sent.
+
+    Field specs come from ``register()`` and from FIELD elements in ListTokens responses, which are fetched once
+    per system code (and also cached by ``session.cache`` when one is set); the request is sent outside the
+    validator's lock, so threads checking other system codes are not held up by it. If ListTokens fails or its response
+    is unreadable, token names are not checked for that system code until ``retry_seconds`` have passed.
+    References are only checked when a ``mirror`` is given and all of their fields are present.
+    """
+    def __init__(self, session: Session, mirror=None, forms: Dict[str, Iterable[FieldSpec]] = None,
+                 references: Dict[str, Iterable[Reference]] = None, check_tokens: bool = True,
+                 retry_seconds: float = 300.0):
+        self.session = session
+        self.mirror = mirror
+        self.check_tokens = check_tokens
+        self.retry_seconds = retry_seconds
+        self.forms = {}  # type: Dict[str, Dict[str, FieldSpec]]
+        self.references = {}  # type: Dict[str, List[Reference]]
+        self._tokens = {}  # system code -> set of token names, or None if ListTokens failed
+        self._retry_at = {}  # system code -> time.monotonic() after which a failed ListTokens is sent again
+        self._lock = Lock()  # guards forms, _tokens and _retry_at
+        self._flight = SingleFlight()  # one ListTokens request per system code at a time
+        for token, specs in (forms or {}).items():
+            self.register(token, specs)
+        for token, refs in (references or {}).items():
+            self.references[token] = list(refs)
+
+    def __repr__(self):
+        return '{}(forms={})'.format(self.__class__.__name__, sorted(self.forms))
+
+    def register(self, token: str, specs: Iterable[FieldSpec]):
+        """Add or replace field specs for a token, e.g. ``register('GL40.1', [FieldSpec('FC', size=1)])``."""
+        specs = [(spec.name, spec) for spec in specs]
+        with self._lock:
+            self.forms.setdefault(token, {}).update(specs)
+
+    def _cached_tokens(self, system_code: str) -> tuple:
+        """(True, token names) if ListTokens need not be sent for a system code, else (False, None)."""
+        with self._lock:
+            if system_code in self._tokens and time.monotonic() < self._retry_at.get(system_code, float('inf')):
+                return True, self._tokens[system_code]
+        return False, None
+
+    def _load_tokens(self, system_code: str) -> Optional[set]:
+        cached, names = self._cached_tokens(system_code)
+        if cached:
+            return names
+        return self._flight.do(system_code, lambda: self._fetch_tokens(system_code))
+
+    def _fetch_tokens(self, system_code: str) -> Optional[set]:
+        cached, names = self._cached_tokens(system_code)  # another thread may have just loaded them
+        if cached:
+            return names
+        xml = self.session.tokens(data={'systemCode': system_code})
+        error = self.session.parser.error(xml)
+        names = set()
+        fields = []
+        if error:
+            logger.warning('ListTokens failed for {} ([{}] {}); token names not checked.'.format(
+                system_code, *error))
+            names = None
+        else:
+            try:
+                root = fromstring(xml)
+            except ParseError:
+                logger.warning('Unreadable ListTokens response for {}; token names not checked.'.format(
+                    system_code))
+                names = None
+        if names is not None:
+            for token in root.iter('TOKEN'):
+                name = token.get('name')
+                names.add(name)
+                fields.extend((name, self._field_spec(field)) for field in token.iter('FIELD') if field.get('name'))
+        with self._lock:
+            if names is None:
+                self._retry_at[system_code] = time.monotonic() + self.retry_seconds
+            else:
+                self._retry_at.pop(system_code, None)
+                for name, spec in fields:
+                    self.forms.setdefault(name, {}).setdefault(spec.name, spec)
+            self._tokens[system_code] = names
+        return names
+
+    @staticmethod
+    def _field_spec(element) -> FieldSpec:
+        kind = (element.get('type') or 'alpha').lower()
+        return FieldSpec(element.get('name'), kind=kind if kind in KINDS else 'alpha',
+                         size=int(element.get('size') or 0) or None, decimals=int(element.get('decimals') or 0),
+                         required=(element.get('required') or '').lower() in ('true', 'y', '1'))
+
+    def errors(self, params: dict) -> List[str]:
+        """All problems found with a transaction's parameters; an empty list if it may be sent."""
+        token = params.get('_TKN')
+        if not token:
+            return ['_TKN is required']
+        problems = []
+        if self.check_tokens:
+            names = self._load_tokens(re.match(r'[A-Za-z]*', token).group(0).upper())
+            if names is not None and token not in names:
+                problems.append('Unknown token {}'.format(token))
+        with self._lock:
+            specs = list(self.forms.get(token, {}).values())
+        for spec in specs:
+            problem = spec.check(params.get(spec.name))
+            if problem:
+                problems.append(problem)
+        if self.mirror is not None:
+            for reference in self.references.get(token, ()):
+                values = [params.get(field) for field in reference.fields]
+                if all(value not in (None, '') for value in values) \
+                        and not getattr(self.mirror, reference.index).exists(*values):
+                    problems.append('{} {} not found'.format(
+                        reference.index, '/'.join(str(value) for value in values)))
+        return problems
+
+    def check(self, params: dict):
+        """Raise IosValidationError if the transaction parameters are invalid."""
+        problems = self.errors(params)
+        if problems:
+            msg = 'Validation failed for {}: {}.'.format(params.get('_TKN'), '; '.join(problems))
+            logger.error(msg=msg)
+            raise IosValidationError(msg)
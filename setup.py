@@ -13,7 +13,9 @@ setup(
     packages=['pylawson', 'pylawson.client'],
     install_requires=['beautifulsoup4', 'requests'],
     extras_require={
-        'sec_api': ['clr']
+        'sec_api': ['clr'],
+        'numpy': ['numpy'],
+        'async': ['aiohttp']
     },
     zip_safe=False
 )
@@ -0,0 +1,42 @@
+"""Fixtures running pylawson against a local StandInServer."""
+import pytest
+from pylawson.client import IosSession, SamlSession
+from pylawson.stand_in import StandInServer
+
+DATA = '/servlet/Router/Data/erp'
+TRANSACTION = '/servlet/Router/Transaction/erp'
+
+
+def pytest_configure(config):
+    # SoupParser reads IOS XML with html.parser, as the library always has.
+    config.addinivalue_line('filterwarnings', 'ignore::bs4.XMLParsedAsHTMLWarning')
+
+
+@pytest.fixture
+def server():
+    """Stand-in with 2500 GLTRANS records; transactions with REJECT set get an ERROR, with NO-ACCOUNT a MsgNbr."""
+    with StandInServer(rows=2500, error_field='REJECT', message_field='NO-ACCOUNT') as server:
+        yield server
+
+
+@pytest.fixture
+def session(server):
+    session = SamlSession(**server.session_params)
+    yield session
+    session.close()
+
+
+class FakeSession(IosSession):
+    """Session answering calls from ``answer(url, data)`` instead of a server, recording each call's data."""
+    def __init__(self, answer):
+        super().__init__()
+        self._profile.productline = 'PROD'
+        self.answer = answer
+        self.sent = []
+
+    def __bool__(self):
+        return True
+
+    def post(self, url, data):
+        self.sent.append(dict(data))
+        return self.answer(url, data)
@@ -0,0 +1,56 @@
+import asyncio
+import pytest
+from pylawson import IosConnectionError, IosDrillError
+from pylawson.parser import EventParser
+from conftest import DATA
+
+pytest.importorskip('aiohttp')
+
+
+def run(server, test):
+    """Run ``test(session)`` on a logged-in AsyncSamlSession."""
+    from pylawson.client.async_session import AsyncSamlSession
+
+    async def main():
+        session = await AsyncSamlSession.create(**server.session_params)
+        try:
+            return await test(session)
+        finally:
+            await session.close()
+
+    return asyncio.run(main())
+
+
+def test_concurrent_calls(server):
+    async def test(session):
+        assert await session.ping()
+        pages = await asyncio.gather(*(session.data(data={'FILE': 'GLTRANS', 'MAX': '10', 'BEGIN': str(begin)})
+                                       for begin in (0, 10, 20)))
+        starts = [int(next(iter(EventParser().data_page(xml)))[-1]) for xml in pages]
+        assert starts == [0, 10, 20]
+        transaction = await session.transaction(data={'_TKN': 'GL40.1'})
+        assert '<MsgNbr>000</MsgNbr>' in transaction
+
+    run(server, test)
+    assert server.requests[DATA] == 3
+
+
+def test_http_error_raises(server):
+    async def test(session):
+        server.fail(DATA, status=503)
+        with pytest.raises(IosConnectionError):
+            await session.data(data={'FILE': 'GLTRANS'})
+        assert EventParser().data_page(await session.data(data={'FILE': 'GLTRANS', 'MAX': '3'})).columns
+
+    run(server, test)
+
+
+
+def test_drill_many_keeps_other_results(server):
+    async def test(session):
+        server.fail('/servlet/Router/Drill/erp', status=500, after=1)
+        with pytest.raises(IosDrillError) as raised:
+            await session.drill_many([{'_FILE': 'GLTRANS', 'KEY': str(i)} for i in range(3)], max_workers=1)
+        assert len(raised.value.results) == 2 and len(raised.value.errors) == 1
+
+    run(server, test)
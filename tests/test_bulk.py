@@ -0,0 +1,44 @@
+from pylawson.bulk import FAILED, OK, UNKNOWN, upload_journals
+from conftest import TRANSACTION
+
+
+def lines(count):
+    return [{'COMPANY': '100', 'JE-SEQUENCE': str(i // 10), 'LINE-NBR': str(i)} for i in range(count)]
+
+
+def test_upload_reports_every_line(server, session):
+    report = upload_journals(session, lines(20), header_fields=('COMPANY', 'JE-SEQUENCE'), max_workers=4)
+    assert report
+    assert len(report.journals) == 2
+    assert [result.index for result in report.lines] == list(range(20))
+    assert len(report.succeeded) == 20
+    assert server.requests[TRANSACTION] == 22
+
+
+def test_upload_collects_line_errors(server, session):
+    batch = lines(20)
+    batch[3]['REJECT'] = 'Y'
+    batch[5]['NO-ACCOUNT'] = 'Y'
+    report = upload_journals(session, batch, header_fields=('COMPANY', 'JE-SEQUENCE'), max_workers=1)
+    assert not report
+    outcomes = {result.index: result.outcome for result in report.errors}
+    assert outcomes == {3: FAILED, 5: FAILED}
+    assert 'Rejected' in report.lines[3].error
+    assert report.lines[5].error == 'Infor error: [052] Account does not exist'
+    assert all(result.outcome == OK for result in report.succeeded)
+
+
+def test_transport_failure_is_unknown(server, session):
+    server.fail(TRANSACTION, status=503, after=5)  # both headers and three lines go through
+    report = upload_journals(session, lines(20), header_fields=('COMPANY', 'JE-SEQUENCE'), max_workers=1)
+    assert [result.outcome for result in report.unknown] == [UNKNOWN]
+    assert len(report.succeeded) == 19
+    assert 'unknown' in report.summary()
+
+
+def test_failed_header_fails_its_lines(server, session):
+    report = upload_journals(session, lines(20), header_fields=('COMPANY', 'JE-SEQUENCE'), max_workers=2,
+                             header_params={'REJECT': 'Y'})
+    assert all(error is not None for error in report.journals.values())
+    assert len(report.errors) == 20
+    assert server.requests[TRANSACTION] == 2
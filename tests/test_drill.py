@@ -0,0 +1,29 @@
+import pytest
+from pylawson import IosConnectionError, IosDrillError
+from conftest import FakeSession
+
+ERROR = '<?xml version="1.0"?><ERROR key="1"><MSG>Rejected</MSG></ERROR>'
+
+
+def drill_answer(url, data):
+    if data['KEY'] == 'bad':
+        return ERROR
+    if data['KEY'] == 'down':
+        raise IosConnectionError('HTTP 503', status=503)
+    return '<IDARESPONSE><LINES><LINE><COLS><COL>{}</COL></COLS></LINE></LINES></IDARESPONSE>'.format(data['KEY'])
+
+
+def test_drill_many_keeps_results_of_other_requests():
+    session = FakeSession(drill_answer)
+    requests = [{'KEY': key} for key in ('a', 'bad', 'b', 'down', 'a')]
+    with pytest.raises(IosDrillError) as raised:
+        session.drill_many(requests, max_workers=2)
+    error = raised.value
+    assert [lines for lines in error.results.values()] == [(('a',),), (('b',),)]
+    assert sorted(dict(key)['KEY'] for key in error.errors) == ['bad', 'down']
+    assert len(session.sent) == 4  # the repeated request is only sent once
+
+
+def test_drill_many_returns_results_in_request_order():
+    session = FakeSession(drill_answer)
+    assert list(session.drill_many([{'KEY': 'b'}, {'KEY': 'a'}]).values()) == [(('b',),), (('a',),)]
@@ -0,0 +1,68 @@
+import csv
+import gzip
+import json
+import pytest
+from pylawson import JournalLine
+from pylawson.export import ColumnarReader, ColumnarWriter, export_columnar, export_csv, export_jsonl
+
+
+@pytest.fixture
+def pages(session):
+    """(columns, rows) of the whole file, read page by page."""
+    columns, rows = None, []
+    for page in JournalLine(session).iter_pages(page_size=1000):
+        columns = tuple(page.columns)
+        rows.extend(tuple(values) for values in page)
+    return columns, rows
+
+
+def test_iter_pages_and_batches(session):
+    counts = []
+    for page in JournalLine(session).iter_pages(page_size=1000):
+        assert sum(1 for _ in page) == page.count
+        counts.append(page.count)
+    assert counts == [1000, 1000, 500]
+    assert [len(batch) for batch in JournalLine(session).iter_batches(page_size=1000)] == [1000, 1000, 500]
+
+
+def test_csv_round_trip(session, pages, tmp_path):
+    path = str(tmp_path / 'gltrans.csv.gz')
+    assert export_csv(JournalLine(session), path, page_size=1000) == 2500
+    with gzip.open(path, 'rt', newline='', encoding='utf-8') as fp:
+        rows = list(csv.reader(fp))
+    assert (tuple(rows[0]), [tuple(row) for row in rows[1:]]) == pages
+
+
+def test_jsonl_round_trip(session, pages, tmp_path):
+    path = str(tmp_path / 'gltrans.jsonl')
+    assert export_jsonl(JournalLine(session), path, page_size=1000) == 2500
+    with open(path, encoding='utf-8') as fp:
+        objects = [json.loads(line) for line in fp]
+    columns, rows = pages
+    assert [tuple(obj[name] for name in columns) for obj in objects] == rows
+
+
+def test_columnar_round_trip(session, pages, tmp_path):
+    path = str(tmp_path / 'gltrans.plc')
+    assert export_columnar(JournalLine(session), path, page_size=1000) == 2500
+    columns, rows = pages
+    with ColumnarReader(path) as reader:
+        assert (reader.file, reader.columns, len(reader), reader.chunks) == ('GLTRANS', list(columns), 2500, 3)
+        assert reader.types['OBJ-ID'] == 'int64' and reader.types['TRAN-AMOUNT'] == 'float64'
+        for name in columns:
+            index = columns.index(name)
+            column = list(reader.column(name))
+            if reader.types[name] == 'utf8':
+                assert column == [row[index] for row in rows]
+            else:
+                assert column == [float(row[index]) for row in rows]
+
+
+def test_columnar_file_without_footer_is_rejected(session, tmp_path):
+    path = str(tmp_path / 'gltrans.plc')
+    with pytest.raises(RuntimeError):
+        with ColumnarWriter(path) as writer:
+            writer.write(next(JournalLine(session).iter_batches(page_size=1000)))
+            raise RuntimeError('interrupted')
+    with pytest.raises(ValueError, match='no footer'):
+        ColumnarReader(path)
@@ -0,0 +1,51 @@
+from pylawson.extract import ParallelExtractor, partitions
+from pylawson.stand_in import synthetic_data
+from conftest import DATA, FakeSession
+
+
+def by_company(url, data):
+    """Five records per partition, numbered from 100 x the COMPANY at the start of the KEY."""
+    return synthetic_data(5, start=int(data['KEY'].split('=')[0]) * 100)
+
+
+def test_partitions():
+    assert partitions(COMPANY=[100, 200], FISCAL_YEAR=[2024]) == [
+        {'COMPANY': '100', 'FISCAL-YEAR': '2024'}, {'COMPANY': '200', 'FISCAL-YEAR': '2024'}]
+
+
+def test_records_come_in_partition_order():
+    session = FakeSession(by_company)
+    extractor = ParallelExtractor(session, max_workers=2)
+    records = list(extractor.iter_records(partitions(COMPANY=[3, 1, 2, 5])))
+    assert [int(record['OBJ-ID']) for record in records] == [
+        start + i for start in (300, 100, 200, 500) for i in range(5)]
+
+
+def test_partition_keys_follow_the_index():
+    session = FakeSession(by_company)
+    partition = {'ACCT-PERIOD': '3', 'SYSTEM': 'GL', 'COMPANY': '1', 'FISCAL-YEAR': '2024'}
+    list(ParallelExtractor(session, max_workers=1).iter_records([partition]))
+    sent = session.sent[0]
+    assert (sent['INDEX'], sent['KEY'], sent['SELECT']) == ('GLTSET3', '1=2024=3', 'SYSTEM=GL')
+
+
+def test_skipped_leading_key_goes_in_select():
+    session = FakeSession(by_company)
+    list(ParallelExtractor(session, max_workers=1).iter_records([{'COMPANY': '1', 'ACCT-PERIOD': '3'}]))
+    assert (session.sent[0]['KEY'], session.sent[0]['SELECT']) == ('1', 'ACCT-PERIOD=3')
+
+
+def test_extract_against_stand_in(server, session):
+    records = list(ParallelExtractor(session, max_workers=2, page_size=1000).iter_records(
+        partitions(COMPANY=[100, 200])))
+    assert len(records) == 5000
+    assert server.requests[DATA] == 6
+
+
+def test_resizing_the_pool_closes_the_old_adapter(session):
+    previous = session.session.adapters['http://']
+    assert len(previous.poolmanager.pools) == 1  # the login's connections
+    session.set_pool_size(32)
+    assert session.session.adapters['http://'] is not previous
+    assert len(previous.poolmanager.pools) == 0
+    assert session.ping()
@@ -0,0 +1,34 @@
+import os
+import subprocess
+import sys
+import pytest
+import pylawson
+import pylawson.client
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ('bs4', 'requests', 'numpy', 'aiohttp', 'sqlite3', 'pylawson.client.ms_samlpr', 'pylawson.pylawson')
+
+
+def loaded_after(code: str) -> list:
+    """Heavy modules loaded after running code in a fresh interpreter."""
+    check = '{}\nimport sys\nprint(" ".join(m for m in {!r} if m in sys.modules))'.format(code, HEAVY)
+    result = subprocess.run([sys.executable, '-c', check], cwd=ROOT, stdout=subprocess.PIPE,
+                            universal_newlines=True, check=True)
+    return result.stdout.split()
+
+
+def test_package_import_loads_no_heavy_modules():
+    assert loaded_after('import pylawson, pylawson.client') == []
+
+
+def test_backends_load_on_first_use():
+    assert loaded_after('import pylawson.client\npylawson.client.SamlSession') == [
+        'bs4', 'requests', 'pylawson.client.ms_samlpr']
+    assert loaded_after('import pylawson\npylawson.JournalLine') == ['pylawson.pylawson']
+
+
+def test_lazy_names():
+    assert 'JournalLine' in dir(pylawson) and 'SessionPool' in dir(pylawson.client)
+    assert pylawson.JournalLine is pylawson.pylawson.JournalLine
+    with pytest.raises(AttributeError):
+        pylawson.client.NoSuchSession
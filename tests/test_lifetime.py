@@ -0,0 +1,49 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event
+from pylawson.client.lifetime import SessionLifetime
+from conftest import DATA
+
+SSO = '/sso/SSOServlet'
+
+
+def test_lifetime_tracks_the_deadline():
+    lifetime = SessionLifetime()
+    assert not lifetime and lifetime.remaining == 0
+    lifetime.expires_in(60, authenticated=True)
+    assert lifetime.active and 59 < lifetime.remaining <= 60 and lifetime.generation == 1
+    lifetime.expires_in(30)
+    assert lifetime.generation == 1
+    lifetime.expire()
+    assert not lifetime.active
+
+
+def test_refresh_runs_before_the_deadline():
+    refreshed = Event()
+    lifetime = SessionLifetime(refresh=refreshed.set, margin=60)
+    lifetime.expires_in(61)
+    assert refreshed.wait(5)
+    lifetime.stop()
+
+
+def test_truthiness_does_not_ping(server, session):
+    calls = server.requests[SSO]
+    assert all(bool(session) for _ in range(20))
+    assert server.requests[SSO] == calls
+    assert session.ping() and server.requests[SSO] == calls + 1
+
+
+def test_expired_session_is_replayed_after_one_login(server, session):
+    generation = session._lifetime.generation
+    server.expire()
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        pages = list(executor.map(lambda i: session.data(data={'FILE': 'GLTRANS', 'MAX': '5'}), range(8)))
+    assert all('<DME' in page for page in pages)
+    assert session._lifetime.generation == generation + 1
+    assert server.requests[DATA] >= 8
+
+
+def test_refresh_logs_in_again_when_the_session_lapsed(server, session):
+    generation = session._lifetime.generation
+    server.expire()
+    session.refresh()
+    assert session._lifetime.generation == generation + 1 and session.ping()
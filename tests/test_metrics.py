@@ -0,0 +1,52 @@
+import json
+import pytest
+from pylawson import IosConnectionError, JournalLine
+from pylawson.client.metrics import Metrics, body_size
+from conftest import DATA, FakeSession
+
+
+def test_body_size_counts_bytes():
+    assert body_size('abc') == 3 and body_size(b'abc') == 3
+    assert body_size('café') == 5
+
+
+def test_session_records_calls_and_parsing(session):
+    events = []
+    session.metrics = Metrics(hooks=[events.append])
+    records = list(JournalLine(session).iter_records(page_size=1000))
+    data = session.metrics.snapshot()['Data']['GLTRANS']
+    assert data['requests'] == 3 and data['errors'] == 0
+    assert data['records'] == len(records) == 2500
+    assert data['bytes_received'] > 0 and data['bytes_sent'] > 0
+    assert data['request_seconds']['count'] == 3 and data['parse_seconds']['count'] == 3
+    assert [event['event'] for event in events].count('call') == 3
+
+
+def test_failed_and_error_calls_are_counted(server, session):
+    session.metrics = Metrics()
+    server.fail(DATA, status=500)
+    with pytest.raises(IosConnectionError):
+        session.data(data={'FILE': 'GLTRANS'})
+    session.transaction(data={'_TKN': 'GL40.1', 'REJECT': 'Y'})
+    snapshot = session.metrics.snapshot()
+    assert snapshot['Data']['GLTRANS']['errors'] == 1
+    transaction = snapshot['Transaction']['GL40.1']
+    assert (transaction['requests'], transaction['errors']) == (1, 1)
+
+
+def test_retries_and_exports():
+    metrics = Metrics()
+    metrics.record_call('Data', 'GLTRANS', 0.02, bytes_sent=10, bytes_received=100)
+    metrics.record_retry('Data', 'GLTRANS')
+    assert json.loads(metrics.to_json())['Data']['GLTRANS']['retries'] == 1
+    text = metrics.to_prometheus()
+    assert 'pylawson_requests_total{endpoint="Data",target="GLTRANS"} 1' in text
+    assert 'pylawson_request_seconds_count{endpoint="Data",target="GLTRANS"} 1' in text
+    metrics.reset()
+    assert metrics.snapshot() == {}
+
+
+def test_metrics_off_by_default():
+    session = FakeSession(lambda url, data: '<WHAT/>')
+    assert session.metrics is None
+    session.what(data={'_JAR': 'IOS.jar'})
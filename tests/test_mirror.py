@@ -0,0 +1,39 @@
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from pylawson import JournalLine
+from pylawson.mirror import MasterIndex
+from conftest import DATA
+
+
+@pytest.fixture(params=[False, True], ids=['memory', 'sqlite'])
+def index(request, session, tmp_path):
+    path = str(tmp_path / 'mirror.db') if request.param else None
+    index = MasterIndex(session, JournalLine, ('OBJ-ID',), path=path, page_size=1000)
+    yield index
+    index.close()
+
+
+def test_concurrent_lookups_load_once(server, index):
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        found = list(executor.map(lambda i: index.exists(i * 73), range(32)))
+    assert all(found)
+    assert len(index) == 2500
+    assert server.requests[DATA] == 3
+    assert index.description(5) == 'Line 5 & more'
+    assert not index.exists(99999)
+
+
+def test_refresh_picks_up_new_records(server, index):
+    assert not index.exists(2600)
+    server.rows = 2700
+    assert index.refresh() >= 200
+    assert index.exists(2600)
+    assert len(index) == 2700
+
+
+def test_concurrent_refreshes(server, index):
+    index.refresh()
+    server.rows = 3000
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(lambda i: index.refresh(), range(4)))
+    assert len(index) == 3000
@@ -0,0 +1,57 @@
+import pytest
+from pylawson import IosConnectionError, IosDataError, JournalLine
+from pylawson.pipeline import PipelinedQuery, scan_next_call
+from pylawson.stand_in import synthetic_data
+from conftest import DATA
+
+
+def test_iter_records_follows_next_call(server, session):
+    records = list(JournalLine(session).iter_records(page_size=1000))
+    assert len(records) == 2500
+    assert [int(record['OBJ-ID']) for record in records] == list(range(2500))
+    assert server.requests[DATA] == 3
+
+
+def test_http_error_mid_paging_raises(server, session):
+    server.fail(DATA, status=500, after=1)
+    records = []
+    with pytest.raises(IosConnectionError):
+        for record in JournalLine(session).iter_records(page_size=1000):
+            records.append(record)
+    assert len(records) == 1000
+
+
+def test_non_dme_page_raises(server, session):
+    server.fail(DATA, status=200, after=1)  # an HTML page with a 200 status
+    with pytest.raises(IosDataError):
+        list(JournalLine(session).iter_records(page_size=1000))
+
+
+def test_pipelined_query_pages_all_records(session):
+    rows = list(PipelinedQuery(JournalLine(session), page_size=1000, workers=1).iter_records())
+    assert sorted(int(record['OBJ-ID']) for record in rows) == list(range(2500))
+
+
+def test_pipelined_query_non_dme_page_raises(server, session):
+    server.fail(DATA, status=200, after=1)
+    records = []
+    with pytest.raises(IosDataError, match='Unexpected'):
+        for record in PipelinedQuery(JournalLine(session), page_size=1000, workers=1).iter_records():
+            records.append(record)
+    assert len(records) <= 1000
+
+
+@pytest.mark.parametrize('encode', [False, True], ids=['str', 'bytes'])
+def test_scan_next_call_outside_the_tail(encode):
+    next_call = 'PROD=PROD&FILE=GLTRANS&BEGIN=500&' + 'X' * 10000
+    xml = synthetic_data(500, next_call=next_call)
+    xml = xml.encode('ISO-8859-1') if encode else xml
+    assert scan_next_call(xml) == next_call
+    assert scan_next_call(synthetic_data(500)) is None
+
+
+def test_raw_responses_page_the_same(session):
+    expected = list(JournalLine(session).iter_records(page_size=1000))
+    session.raw_responses = True
+    assert isinstance(session.data(data={'FILE': 'GLTRANS', 'MAX': '1'}), bytes)
+    assert list(JournalLine(session).iter_records(page_size=1000)) == expected
@@ -0,0 +1,50 @@
+import pytest
+from pylawson.parser import EventParser, SoupParser, sniff_error, sniff_root
+from pylawson.stand_in import GLTRANS_COLUMNS, synthetic_data
+
+DRILL = ('<?xml version="1.0"?><IDARESPONSE><LINES><LINE><COLS><COL><![CDATA[1]]></COL><COL>A &amp; B</COL></COLS>'
+         '</LINE><LINE><COLS><COL>2</COL><COL/></COLS></LINE></LINES></IDARESPONSE>')
+TRANSACTION = ('<?xml version="1.0"?><GL40.1><_f0>GL40.1</_f0><Message>Add Complete - Continue</Message>'
+               '<MsgNbr>000</MsgNbr></GL40.1>')
+ERROR = '<?xml version="1.0"?><ERROR key="GL40.1"><MSG>Rejected</MSG></ERROR>'
+PROFILE = ('<?xml version="1.0"?><PROFILE><ATTRIBUTES><ATTR name="ProductLine" value="PROD"/>'
+           '<ATTR name="Id" value="user"/></ATTRIBUTES></PROFILE>')
+
+
+def page(parser, xml):
+    data_page = parser.data_page(xml)
+    rows = [list(values) for values in data_page]
+    return data_page.columns, rows, data_page.next_call, data_page.count
+
+
+@pytest.mark.parametrize('encode', [False, True], ids=['str', 'bytes'])
+def test_data_page_matches_soup_parser(encode):
+    xml = synthetic_data(25, start=10, next_call='PROD=PROD&FILE=GLTRANS&BEGIN=35')
+    xml = xml.encode('ISO-8859-1') if encode else xml
+    event = page(EventParser(), xml)
+    assert event == page(SoupParser(), xml)
+    columns, rows, next_call, count = event
+    assert columns == list(GLTRANS_COLUMNS)
+    assert count == len(rows) == 25
+    assert rows[0][GLTRANS_COLUMNS.index('DESCRIPTION')] == 'Line 10 & more'
+    assert next_call == 'PROD=PROD&FILE=GLTRANS&BEGIN=35'
+
+
+def test_last_page_has_no_next_call():
+    assert page(EventParser(), synthetic_data(3))[2] is None
+    assert page(SoupParser(), synthetic_data(3))[2] is None
+
+
+def test_other_responses_match_soup_parser():
+    event, soup = EventParser(), SoupParser()
+    assert event.drill_lines(DRILL) == soup.drill_lines(DRILL) == [['1', 'A & B'], ['2', '']]
+    assert event.fields(TRANSACTION, 'MsgNbr', 'Message') == soup.fields(TRANSACTION, 'MsgNbr', 'Message')
+    assert event.error(ERROR) == soup.error(ERROR) == ('GL40.1', 'Rejected')
+    assert event.error(TRANSACTION) is None and soup.error(TRANSACTION) is None
+    assert event.attributes(PROFILE) == soup.attributes(PROFILE)
+
+
+def test_sniff_root():
+    assert sniff_root(synthetic_data(1)) == 'DME'
+    assert sniff_root(ERROR.encode('utf-8')) == 'ERROR'
+    assert sniff_error(ERROR) and not sniff_error(TRANSACTION)
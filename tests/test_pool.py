@@ -0,0 +1,109 @@
+from concurrent.futures import ThreadPoolExecutor
+import time
+import pytest
+from pylawson import IosConnectionError, IosError, JournalLine
+from pylawson.client import SamlSession, SessionPool
+from pylawson.client.metrics import Metrics
+from pylawson.stand_in import StandInServer
+from conftest import DATA
+
+ONE = {'FILE': 'GLTRANS', 'MAX': '1'}
+
+
+@pytest.fixture
+def pool(server):
+    pool = SessionPool([dict(server.session_params, sessions=2)], recovery_seconds=0.2)
+    yield pool
+    pool.close()
+
+
+def test_records_through_the_pool(pool):
+    pool.metrics = Metrics()
+    assert all(member.session.metrics is pool.metrics for member in pool.members)
+    assert sum(1 for _ in JournalLine(pool).iter_records(page_size=1000)) == 2500
+    assert pool.metrics.snapshot()['Data']['GLTRANS']['requests'] == 3
+
+
+def test_calls_go_to_the_least_loaded_member(pool):
+    with pool.lease() as busy:
+        with pool.lease() as other:
+            assert other is not busy
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(lambda _: pool.data(ONE), range(8)))
+    assert [member.in_flight for member in pool.members] == [0, 0]
+    assert all(member.calls >= 4 for member in pool.members)
+
+
+def test_routing_by_product_line(server):
+    configs = [dict(server.session_params, productline='PROD'), dict(server.session_params, productline='TEST')]
+    with SessionPool(configs) as pool:
+        assert pool.productlines == {'PROD', 'TEST'}
+        pool.data(ONE, productline='TEST')
+        assert [member.calls for member in pool.members] == [0, 1]
+        with pytest.raises(IosConnectionError):
+            pool.data(ONE, productline='OTHER')
+
+
+def test_failed_read_is_retried_on_another_member(server, pool):
+    server.fail(DATA, status=503)
+    assert 'filename="GLTRANS"' in pool.data(ONE)
+    assert server.requests[DATA] == 2
+    assert [member.healthy for member in pool.members].count(False) == 1
+
+
+def test_transactions_are_not_retried(server, pool):
+    server.fail('/servlet/Router/Transaction/erp', status=503)
+    with pytest.raises(IosConnectionError):
+        pool.transaction({'_PDL': 'PROD', '_TKN': 'GL40.1'})
+    assert server.requests['/servlet/Router/Transaction/erp'] == 1
+
+
+def test_client_errors_do_not_mark_members_unhealthy(server, pool):
+    server.fail(DATA, status=404)
+    with pytest.raises(IosConnectionError) as raised:
+        pool.data(ONE)
+    assert raised.value.status == 404
+    assert server.requests[DATA] == 1
+    assert all(member.healthy for member in pool.members)
+
+
+def test_unhealthy_member_recovers(pool):
+    member = pool.members[0]
+    pool._mark_unhealthy(member)
+    pool.data(ONE)
+    assert not member.healthy and member.calls == 0
+    time.sleep(0.25)
+    pool.data(ONE)
+    assert member.healthy and member.calls == 1
+
+
+def test_health_check_restores_members(pool):
+    pool._mark_unhealthy(pool.members[1])
+    assert pool.health_check() == {0: True, 1: True}
+
+
+def test_config_keys_outside_the_session_signature_go_to_the_json_section(server):
+    with SessionPool([dict(server.session_params, ident_host=None)]) as pool:
+        assert len(pool) == 1 and pool.members[0].session
+
+
+def test_sessions_are_closed_when_a_login_fails():
+    closed = []
+
+    class Failing(SamlSession):
+        opened = 0
+
+        def __init__(self, **kwargs):
+            Failing.opened += 1
+            if Failing.opened == 3:
+                raise IosError('login failed')
+            super().__init__(**kwargs)
+
+        def close(self):
+            closed.append(self)
+            super().close()
+
+    with StandInServer(rows=10) as server:
+        with pytest.raises(IosError):
+            SessionPool([dict(server.session_params, sessions=3)], session_class=Failing, max_workers=1)
+    assert len(closed) == 2
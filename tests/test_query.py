@@ -0,0 +1,39 @@
+from pylawson import JournalLine
+from pylawson.client import IosSession
+
+
+def built(query):
+    return query.build().params
+
+
+def test_filters_on_leading_keys_become_key():
+    query = JournalLine(IosSession()).select('ACCOUNT', 'tran_amount').filter(COMPANY=100, FISCAL_YEAR=2024,
+                                                                              ACCT_PERIOD=3)
+    params = query.where('TRAN-AMOUNT>1000').params()
+    assert params == {'FIELD': 'ACCOUNT;TRAN-AMOUNT', 'INDEX': 'GLTSET3', 'KEY': '100=2024=3',
+                      'SELECT': 'TRAN-AMOUNT>1000'}
+
+
+def test_other_filters_go_in_select():
+    params = JournalLine(IosSession()).select().filter(ACTIVITY='A1', SYSTEM='GL').params()
+    assert params == {'INDEX': 'GLTSET5', 'KEY': 'A1', 'SELECT': 'SYSTEM=GL'}
+
+
+def test_select_is_combined_with_the_objects_own():
+    params = built(JournalLine(IosSession(), SELECT='OBJ-ID>=5').select().where('ACCT-PERIOD>=3'))
+    assert params['SELECT'] == 'OBJ-ID>=5&ACCT-PERIOD>=3'
+
+
+def test_objects_key_is_dropped_for_another_index():
+    session = IosSession()
+    assert 'KEY' not in built(JournalLine(session, KEY='100=2024').select('ACCOUNT').using('GLTSET5'))
+    assert built(JournalLine(session, KEY='100=2024').select('ACCOUNT'))['KEY'] == '100=2024'
+    params = built(JournalLine(session, KEY='100=X', INDEX='GLTSET1').select('ACCOUNT'))
+    assert (params['INDEX'], params['KEY']) == ('GLTSET1', '100=X')
+    assert built(JournalLine(session, KEY='100').select().filter(COMPANY=200))['KEY'] == '200'
+
+
+def test_query_pages_against_stand_in(session):
+    query = JournalLine(session).select('OBJ-ID', 'TRAN-AMOUNT').where('OBJ-ID>=2000')
+    records = list(query.iter_records(page_size=200))
+    assert [int(record['OBJ-ID']) for record in records] == list(range(2000, 2500))
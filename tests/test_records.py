@@ -0,0 +1,62 @@
+from array import array
+from decimal import Decimal
+import pytest
+from pylawson import IosDataError
+from pylawson.records import ColumnBatch, numpy, record_type
+
+COLUMNS = ('COMPANY', 'ACCOUNT', 'TRAN-AMOUNT', 'DESCRIPTION')
+ROWS = [('100', '10001', '1234.56', 'Rent'), ('100', '10002', '78.90-', 'Power'), ('200', '', '', 'Blank')]
+
+
+def test_typed_records_convert_numeric_columns():
+    cls = record_type('GLTRANS', COLUMNS)
+    records = [cls(values) for values in ROWS]
+    assert records[0].company == 100 and records[0].tran_amount == Decimal('1234.56')
+    assert records[1].tran_amount == Decimal('-78.90')
+    assert records[2].account == 0 and records[2].tran_amount == 0
+    assert records[0].as_dict() == {'COMPANY': 100, 'ACCOUNT': 10001, 'TRAN-AMOUNT': Decimal('1234.56'),
+                                    'DESCRIPTION': 'Rent'}
+    assert record_type('GLTRANS', COLUMNS) is cls
+
+
+@pytest.mark.parametrize('value', ['12x', 'NaN', 'inf'])
+def test_invalid_numbers_raise(value):
+    cls = record_type('GLTRANS', COLUMNS)
+    with pytest.raises(IosDataError):
+        cls(('100', '1', value, ''))
+    with pytest.raises(IosDataError):
+        ColumnBatch('GLTRANS', COLUMNS).append(('100', '1', value, ''))
+
+
+def test_column_batch():
+    batch = ColumnBatch('GLTRANS', COLUMNS)
+    batch.extend(ROWS)
+    assert len(batch) == 3 and 'ACCOUNT' in batch
+    assert isinstance(batch.array('COMPANY'), array) and batch.array('COMPANY').typecode == 'q'
+    assert list(batch['COMPANY']) == [100, 100, 200]
+    assert list(batch['TRAN-AMOUNT']) == [1234.56, -78.9, 0.0]
+    assert batch['DESCRIPTION'] == ['Rent', 'Power', 'Blank']
+    assert batch.rows()[1] == (100, 10002, -78.9, 'Power')
+
+
+def test_columns_are_copies_so_the_batch_can_grow():
+    batch = ColumnBatch('GLTRANS', COLUMNS)
+    batch.extend(ROWS)
+    companies = batch['COMPANY']
+    batch.append(('300', '1', '1', 'More'))  # would raise BufferError with a view of the live buffer held
+    batch['DESCRIPTION'].append('not stored')
+    assert list(companies) == [100, 100, 200]
+    assert list(batch['COMPANY']) == [100, 100, 200, 300] and len(batch['DESCRIPTION']) == 4
+    if numpy() is not None:
+        assert companies.dtype == numpy().int64
+
+
+def test_concat():
+    first, second = ColumnBatch('GLTRANS', COLUMNS), ColumnBatch('GLTRANS', COLUMNS)
+    first.extend(ROWS[:2])
+    second.extend(ROWS[2:])
+    view = first['COMPANY']
+    combined = ColumnBatch.concat([first, second])
+    assert len(combined) == 3 and list(combined['COMPANY']) == [100, 100, 200] and len(view) == 2
+    with pytest.raises(ValueError):
+        ColumnBatch.concat([first, ColumnBatch('GLTRANS', COLUMNS[:2])])
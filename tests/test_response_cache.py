@@ -0,0 +1,40 @@
+from pylawson.client.response_cache import ResponseCache
+from conftest import FakeSession
+
+
+def test_ttl_and_lru():
+    cache = ResponseCache(ttls={'Data': 60}, max_entries=2)
+    for key in ('a', 'b', 'c'):
+        cache.put(key, key, ttl=60)
+    assert cache.get('a') is None and cache.get('c') == 'c'
+    assert cache.evictions == 1
+    cache.put('d', 'd', ttl=-1)
+    assert cache.get('d') is None
+    assert cache.ttl('Data', {'FILE': 'GLTRANS'}) == 60 and cache.ttl('Transaction', {}) == 0
+
+
+def test_file_specific_ttl():
+    cache = ResponseCache(ttls={'Data': 0, 'Data:ACACTIVITY': 600})
+    assert cache.ttl('Data', {'FILE': 'ACACTIVITY'}) == 600 and cache.ttl('Data', {'FILE': 'GLTRANS'}) == 0
+
+
+def test_session_answers_repeated_reads_from_the_cache():
+    session = FakeSession(lambda url, data: '<DME/>')
+    session.cache = ResponseCache(ttls={'Data': 60})
+    for _ in range(3):
+        session.data(data={'FILE': 'GLTRANS'})
+    session.transaction(data={'_TKN': 'GL40.1'})
+    session.transaction(data={'_TKN': 'GL40.1'})
+    assert len(session.sent) == 3 and session.cache.hits == 2
+
+
+def test_save_and_load(tmp_path):
+    path = str(tmp_path / 'responses.json')
+    cache = ResponseCache(path=path)
+    cache.put('text', '<WHAT/>', ttl=60)
+    cache.put('bytes', b'<WHAT>\xe9</WHAT>', ttl=60)
+    cache.put('stale', '<WHAT/>', ttl=-1)
+    cache.save()
+    loaded = ResponseCache(path=path)
+    assert len(loaded) == 2
+    assert loaded.get('text') == '<WHAT/>' and loaded.get('bytes') == b'<WHAT>\xe9</WHAT>'
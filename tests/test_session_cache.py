@@ -0,0 +1,51 @@
+import os
+import stat
+import time
+from pylawson.client import SamlSession
+from pylawson.client.session_cache import SessionCache
+from conftest import DATA
+
+ADFS = '/adfs/ls/'
+
+
+def test_second_session_reuses_the_cached_login(server, tmp_path):
+    path = str(tmp_path / 'sessions.json')
+    first = SamlSession(session_cache=path, **server.session_params)
+    logins = server.requests[ADFS]
+    assert logins and first
+    first.close()  # kept, not logged out, since it is cached
+    second = SamlSession(session_cache=path, **server.session_params)
+    assert server.requests[ADFS] == logins
+    assert second and second.profile.productline == 'PROD'
+    assert second.data(data={'FILE': 'GLTRANS', 'MAX': '1'})
+    second.close(logout=True)
+    assert SessionCache(path).load(second._cache_key) is None
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+
+
+def test_expired_server_session_logs_in_again(server, tmp_path):
+    path = str(tmp_path / 'sessions.json')
+    SamlSession(session_cache=path, **server.session_params).close()
+    logins = server.requests[ADFS]
+    server.expire()
+    session = SamlSession(session_cache=path, **server.session_params)
+    assert server.requests[ADFS] > logins
+    assert session.data(data={'FILE': 'GLTRANS', 'MAX': '1'})
+    assert server.requests[DATA] == 1
+    session.close(logout=True)
+
+
+def test_cache_entries_expire(tmp_path):
+    cache = SessionCache(str(tmp_path / 'sessions.json'))
+    cache.save('a', {'xfer_url': 'x'}, lifetime=60)
+    cache.save('b', {'xfer_url': 'y'}, lifetime=-1)
+    assert cache.load('a')['xfer_url'] == 'x' and cache.load('a')['expires'] > time.time()
+    assert cache.load('b') is None and cache.load('c') is None
+    cache.clear('a')
+    assert cache.load('a') is None
+
+
+def test_unreadable_cache_is_ignored(tmp_path):
+    path = tmp_path / 'sessions.json'
+    path.write_text('not json')
+    assert SessionCache(str(path)).load('a') is None
@@ -0,0 +1,72 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event
+import time
+import pytest
+from pylawson import JournalLine
+from pylawson.client.singleflight import SingleFlight
+from conftest import DATA, FakeSession
+
+
+def test_single_flight_shares_overlapping_calls():
+    flight, release = SingleFlight(), Event()
+
+    def slow():
+        release.wait(5)
+        return 'body'
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [executor.submit(flight.do, 'key', slow) for _ in range(4)]
+        while flight.shared < 3:
+            time.sleep(0.001)
+        release.set()
+        assert [future.result() for future in futures] == ['body'] * 4
+    assert flight.stats == {'in_flight': 0, 'sent': 1, 'shared': 3}
+
+
+def test_single_flight_shares_errors_and_keeps_nothing():
+    flight, release = SingleFlight(), Event()
+
+    def failing():
+        release.wait(5)
+        raise ValueError('down')
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [executor.submit(flight.do, 'key', failing) for _ in range(2)]
+        while flight.shared < 1:
+            time.sleep(0.001)
+        release.set()
+        for future in futures:
+            with pytest.raises(ValueError):
+                future.result()
+    assert flight.do('key', lambda: 'body') == 'body' and flight.sent == 2
+
+
+def test_single_flight_async():
+    flight = SingleFlight()
+
+    async def slow():
+        await asyncio.sleep(0.01)
+        return 'body'
+
+    async def main():
+        return await asyncio.gather(*(flight.do_async('key', slow) for _ in range(3)))
+
+    assert asyncio.run(main()) == ['body'] * 3
+    assert flight.stats == {'in_flight': 0, 'sent': 1, 'shared': 2}
+
+
+def test_single_flight_is_opt_in():
+    session = FakeSession(lambda url, data: '<WHAT/>')
+    assert session.single_flight is None
+    session.single_flight = SingleFlight()
+    session.what(data={'_JAR': 'IOS.jar'})
+    assert session.single_flight.sent == 1
+
+
+def test_session_coalesces_identical_queries(server, session):
+    session.single_flight = SingleFlight()
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        counts = list(executor.map(lambda _: len(list(JournalLine(session).iter_records(page_size=2500))), range(4)))
+    assert counts == [2500] * 4
+    assert server.requests[DATA] == session.single_flight.sent <= 4
@@ -0,0 +1,55 @@
+import sqlite3
+import pytest
+from pylawson import IosConnectionError
+from pylawson.sync import IncrementalSync
+from conftest import DATA
+
+
+@pytest.fixture
+def sync(session, tmp_path):
+    sync = IncrementalSync(session, str(tmp_path / 'gl.db'), page_size=1000)
+    yield sync
+    sync.close()
+
+
+def stored(sync) -> int:
+    return sync.connection.execute('SELECT COUNT(*) FROM gltrans').fetchone()[0]
+
+
+def test_sync_then_fetch_only_new_records(server, sync):
+    assert sync.sync() == {'': 2500}
+    assert sync.watermarks() == {'': '2499'}
+    server.rows = 2600
+    calls = server.requests[DATA]
+    assert sync.sync() == {'': 101}  # from the last watermark, inclusive
+    assert server.requests[DATA] == calls + 1
+    assert stored(sync) == 2600 and sync.watermarks() == {'': '2599'}
+
+
+def test_interrupted_sync_resumes_without_losing_rows(server, sync):
+    server.fail(DATA, status=500, after=1)
+    with pytest.raises(IosConnectionError):
+        sync.sync()
+    assert stored(sync) == 1000 and sync.watermarks() == {}  # the watermark only advances once complete
+    assert sync.sync() == {'': 2500}
+    assert stored(sync) == 2500 and sync.watermarks() == {'': '2499'}
+
+
+def test_store_survives_reopening(session, sync, tmp_path):
+    sync.sync()
+    sync.close()
+    again = IncrementalSync(session, str(tmp_path / 'gl.db'), page_size=1000)
+    assert again.watermarks() == {'': '2499'}
+    assert again.sync() == {'': 1}
+    again.close()
+    with sqlite3.connect(str(tmp_path / 'gl.db')) as connection:
+        assert connection.execute('SELECT "TRAN-AMOUNT" FROM gltrans WHERE "OBJ-ID" = 1').fetchone()[0] == -4998.63
+
+
+def test_partitions_are_labelled_by_their_key(sync):
+    results = sync.sync([{'FISCAL-YEAR': '2024', 'COMPANY': '100'}, {'COMPANY': '100', 'SYSTEM': 'GL'}])
+    assert list(results) == ['100=2024', '100&SYSTEM=GL']
+    assert set(sync.watermarks()) == {'100=2024', '100&SYSTEM=GL'}
+    sync.reset({'COMPANY': '100', 'FISCAL-YEAR': '2024'})
+    assert set(sync.watermarks()) == {'100&SYSTEM=GL'}
+    assert sync.sync([{'SYSTEM': 'GL', 'COMPANY': '100'}], full=True) == {'100&SYSTEM=GL': 2500}
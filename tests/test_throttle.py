@@ -0,0 +1,70 @@
+import time
+import pytest
+from pylawson import IosAuthenticationError, IosConnectionError, IosDataError
+from pylawson.client.throttle import AdaptiveLimiter, Throttle, is_transient
+from conftest import DATA
+
+
+def test_transient_errors():
+    assert is_transient(IosConnectionError('reset')) and is_transient(TimeoutError())
+    assert is_transient(IosConnectionError('busy', status=503)) and is_transient(IosConnectionError(status=500))
+    assert is_transient(IosConnectionError(status=429))
+    assert not is_transient(IosConnectionError('not found', status=404))
+    assert not is_transient(IosDataError('rejected')) and not is_transient(IosAuthenticationError('password'))
+    assert not is_transient(ValueError())
+
+
+def test_limiter_decreases_once_per_round_trip():
+    limiter = AdaptiveLimiter(initial=16, maximum=16)
+    start = time.perf_counter()
+    for _ in range(8):
+        limiter.acquire()
+    for _ in range(8):
+        limiter.release(overloaded=True, started=start)
+    assert limiter.decreases == 1 and limiter.limit == 8
+    limiter.acquire()
+    limiter.release(overloaded=True, started=time.perf_counter())
+    assert limiter.decreases == 2
+
+
+def test_limiter_grows_on_success():
+    limiter = AdaptiveLimiter(initial=2, maximum=3)
+    for _ in range(20):
+        limiter.acquire()
+        limiter.release(latency=0.001)
+    assert limiter.limit == 3 and limiter.stats['successes'] == 20
+
+
+def test_throttle_retries_reads_but_not_writes():
+    throttle = Throttle(retries=2, backoff=0)
+    failures = iter([IosConnectionError('busy')])
+
+    def flaky():
+        error = next(failures, None)
+        if error is not None:
+            raise error
+        return 'ok'
+
+    assert throttle.call('Data', flaky) == 'ok' and throttle.retried == 1
+    with pytest.raises(IosConnectionError):
+        throttle.call('Transaction', lambda: (_ for _ in ()).throw(IosConnectionError('busy')))
+    assert throttle.retried == 1
+
+
+def test_busy_server_is_retried(server, session):
+    session.throttle = Throttle(backoff=0)
+    server.fail(DATA, status=503)
+    assert '<DME' in session.data(data={'FILE': 'GLTRANS', 'MAX': '1'})
+    assert server.requests[DATA] == 2
+    assert session.throttle.retried == 1 and session.throttle.read.decreases == 1
+
+
+def test_client_error_is_sent_once_and_keeps_the_limit(server, session):
+    session.throttle = Throttle(backoff=0)
+    server.fail(DATA, status=404)
+    with pytest.raises(IosConnectionError) as raised:
+        session.data(data={'FILE': 'GLTRANS', 'MAX': '1'})
+    assert raised.value.status == 404
+    assert server.requests[DATA] == 1
+    assert session.throttle.retried == 0
+    assert session.throttle.read.limit == 4 and session.throttle.read.decreases == 0
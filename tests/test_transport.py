@@ -0,0 +1,51 @@
+import pytest
+from pylawson import IosDataError, JournalLine
+from pylawson.client.transport import SCRUBBED, Archive, RecordingTransport, ReplaySession, replay_load
+from conftest import DATA
+
+
+@pytest.fixture
+def recording(server, session, tmp_path):
+    """Path of an archive recorded from a paged GLTRANS query and one call carrying a credential."""
+    path = str(tmp_path / 'gl.plrec')
+    session.transport = RecordingTransport(path)
+    records = list(JournalLine(session).iter_records(page_size=1000))
+    session.data(data={'FILE': 'GLTRANS', 'MAX': '1', 'authToken': 'hunter2'})
+    session.transport.close()
+    session.transport = None
+    return path, records
+
+
+def test_replay_gives_the_recorded_records(server, recording):
+    path, records = recording
+    calls = server.requests[DATA]
+    with ReplaySession(path, speed=0) as replay:
+        assert replay.profile.productline == 'PROD'
+        assert list(JournalLine(replay).iter_records(page_size=1000)) == records
+        assert replay.transport.replayed == 3
+    assert server.requests[DATA] == calls  # nothing reached the server
+
+
+def test_credentials_are_scrubbed(recording):
+    path, _ = recording
+    with open(path, 'rb') as fp:
+        assert b'hunter2' not in fp.read()
+    with Archive(path) as archive:
+        assert len(archive) == 4
+        assert archive.exchanges[-1]['params']['authToken'] == SCRUBBED
+        assert archive.exchanges[0]['params']['FILE'] == 'GLTRANS'
+
+
+def test_unrecorded_call_raises(recording):
+    with ReplaySession(recording[0], speed=0) as replay:
+        with pytest.raises(IosDataError):
+            replay.data(data={'FILE': 'GLMASTER'})
+
+
+def test_replay_load(recording):
+    path, _ = recording
+    with Archive(path) as archive, ReplaySession(path, speed=0) as replay:
+        parsed = []
+        result = replay_load(archive, replay, workers=2, speed=0,
+                             handler=lambda exchange, response: parsed.append(len(response)))
+    assert (result['calls'], result['errors'], len(parsed)) == (4, 0, 4)
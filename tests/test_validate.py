@@ -0,0 +1,70 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event
+import time
+import pytest
+from pylawson import IosValidationError
+from pylawson.validate import FieldSpec, Validator
+from conftest import FakeSession
+
+ERROR = '<?xml version="1.0"?><ERROR key="1"><MSG>Rejected</MSG></ERROR>'
+TOKENS = ('<?xml version="1.0"?><TOKENS><TOKEN name="{0}40.1"><FIELD name="FC" size="1" required="true"/>'
+          '<FIELD name="AMOUNT" type="signed" size="15" decimals="2"/></TOKEN></TOKENS>')
+
+
+def list_tokens(url, data):
+    return TOKENS.format(data['systemCode'])
+
+
+def test_field_specs():
+    assert FieldSpec('FC', size=1, required=True).check('') == 'FC is required'
+    assert FieldSpec('FC', size=1).check('AB') == 'FC is longer than 1 characters'
+    assert FieldSpec('DATE', kind='date').check('2024-01-31') == 'DATE is not a YYYYMMDD date'
+    assert FieldSpec('AMOUNT', kind='numeric').check('12-') == 'AMOUNT must not be negative'
+    assert FieldSpec('AMOUNT', kind='signed', size=5, decimals=2).check('-123.45') is None
+    assert FieldSpec('AMOUNT', kind='signed', size=5, decimals=2).check('1.234') == \
+        'AMOUNT has more than 2 decimal places'
+    assert FieldSpec('AMOUNT', kind='signed', size=5, decimals=2).check('1234') == 'AMOUNT has more than 5 digits'
+    with pytest.raises(ValueError):
+        FieldSpec('FC', kind='binary')
+
+
+def test_tokens_and_fields_come_from_list_tokens():
+    session = FakeSession(list_tokens)
+    validator = Validator(session)
+    assert validator.errors({'_TKN': 'GL40.1', 'FC': 'A', 'AMOUNT': '10.00-'}) == []
+    assert validator.errors({'_TKN': 'GL40.1', 'AMOUNT': '1.001'}) == [
+        'FC is required', 'AMOUNT has more than 2 decimal places']
+    assert validator.errors({'_TKN': 'GL99.1'}) == ['Unknown token GL99.1']
+    with pytest.raises(IosValidationError):
+        validator.check({'_TKN': 'GL40.1'})
+    assert len(session.sent) == 1
+
+
+def test_validator_caches_failed_token_lists():
+    session = FakeSession(lambda url, data: ERROR)
+    validator = Validator(session, retry_seconds=60)
+    for _ in range(3):
+        assert validator.errors({'_TKN': 'GL40.1'}) == []
+    assert len(session.sent) == 1
+
+
+def test_slow_list_tokens_does_not_hold_up_other_system_codes():
+    release = Event()
+
+    def answer(url, data):
+        if data['systemCode'] == 'AP':
+            release.wait(5)
+        return list_tokens(url, data)
+
+    session = FakeSession(answer)
+    validator = Validator(session)
+    assert validator.errors({'_TKN': 'GL40.1', 'FC': 'A'}) == []
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        slow = [executor.submit(validator.errors, {'_TKN': 'AP40.1', 'FC': 'A'}) for _ in range(2)]
+        while len(session.sent) < 2:
+            time.sleep(0.001)
+        fast = executor.submit(validator.errors, {'_TKN': 'GL40.1'})
+        assert fast.result(timeout=1) == ['FC is required']
+        release.set()
+        assert [future.result() for future in slow] == [[], []]
+    assert [data['systemCode'] for data in session.sent] == ['GL', 'AP']  # the AP lookup was shared